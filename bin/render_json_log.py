@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Render a JSON lines log file written with COCOTB_LOG_JSON as plain text,
+in the same column format cocotb uses for its console output.
+"""
+
+import sys
+import argparse
+
+from cocotb.log import render_json_log
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("filename", type=str,
+                        help="JSON lines log file to render")
+    parser.add_argument("--colour", dest="colour", action='store_const', required=False,
+                        const=True, default=False,
+                        help="Colour the output with ANSI escape codes")
+
+    return parser
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+
+    render_json_log(args.filename, stream=sys.stdout, colour=args.colour)
+
+
+if __name__ == "__main__":
+    main()
@@ -66,7 +66,7 @@ if "COCOTB_SIM" in os.environ:
     log.setLevel(_default_log)
     loggpi = SimLog('cocotb.gpi')
     # Notify GPI of log level
-    simulator.log_level(_default_log)
+    simulator.log_level(loggpi.getEffectiveLevel())
 
     # If stdout/stderr are not TTYs, Python may not have opened them with line
     # buffering. In that case, try to reopen them with line buffering
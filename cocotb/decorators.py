@@ -35,6 +35,7 @@ import functools
 import threading
 import inspect
 import textwrap
+import collections
 
 from io import StringIO, BytesIO
 
@@ -42,7 +43,7 @@ import cocotb
 from cocotb.log import SimLog
 from cocotb.result import (TestComplete, TestError, TestFailure, TestSuccess,
                            ReturnValue, raise_error, ExternalException)
-from cocotb.utils import get_sim_time, with_metaclass, exec_
+from cocotb.utils import get_sim_time, get_context_times, with_metaclass, exec_
 from cocotb import outcomes
 
 
@@ -209,6 +210,9 @@ class RunningCoroutine(object):
 class RunningTest(RunningCoroutine):
     """Add some useful Test functionality to a RunningCoroutine."""
 
+    #: Number of most recent log messages kept for the test report
+    max_error_messages = 1000
+
     class ErrorLogHandler(logging.Handler):
         def __init__(self, fn):
             self.fn = fn
@@ -218,28 +222,35 @@ class RunningTest(RunningCoroutine):
             self.fn(self.format(record))
 
     def __init__(self, inst, parent):
-        self.error_messages = []
+        self.error_messages = collections.deque(maxlen=self.max_error_messages)
         RunningCoroutine.__init__(self, inst, parent)
         self.log = SimLog("cocotb.test.%s" % self.__name__, id(self))
         self.started = False
         self.start_time = 0
         self.start_sim_time = 0
+        self.start_context_times = (0.0, 0.0, 0.0)
         self.expect_fail = parent.expect_fail
         self.expect_error = parent.expect_error
         self.skip = parent.skip
         self.stage = parent.stage
+        self.timeout = parent.timeout
+        self.timeout_unit = parent.timeout_unit
+        self.wall_timeout = parent.wall_timeout
 
+        # Only attached to the log while the test is running, see
+        # _start_log_capture() and _stop_log_capture()
         self.handler = RunningTest.ErrorLogHandler(self._handle_error_message)
-        cocotb.log.addHandler(self.handler)
 
     def _advance(self, outcome):
         if not self.started:
-            self.error_messages = []
+            self._start_log_capture()
             self.log.info("Starting test: \"%s\"\nDescription: %s" %
                           (self.funcname, self.__doc__))
             self.start_time = time.time()
             self.start_sim_time = get_sim_time('ns')
+            self.start_context_times = get_context_times()
             self.started = True
+            cocotb.scheduler._arm_test_timeouts(self)
         try:
             self.log.debug("Sending {}".format(outcome))
             return outcome.send(self._coro)
@@ -262,6 +273,13 @@ class RunningTest(RunningCoroutine):
     def _handle_error_message(self, msg):
         self.error_messages.append(msg)
 
+    def _start_log_capture(self):
+        self.error_messages.clear()
+        cocotb.log.addHandler(self.handler)
+
+    def _stop_log_capture(self):
+        cocotb.log.removeHandler(self.handler)
+
 
 class coroutine(object):
     """Decorator class that allows us to provide common coroutine mechanisms:
@@ -425,7 +443,17 @@ class test(with_metaclass(_decorator_helper, coroutine)):
 
     Args:
         timeout (int, optional):
-            value representing simulation timeout (not implemented).
+            Simulation time after which the test is failed with
+            :exc:`~cocotb.result.TestTimeout`, in units of *timeout_unit*.
+            Defaults to ``None``, meaning no simulation time limit.
+        timeout_unit (str, optional):
+            Units of *timeout* (one of ``'fs'``, ``'ps'``, ``'ns'``, ``'us'``,
+            ``'ms'``, ``'sec'``). ``None`` means simulation time steps.
+        wall_timeout (float, optional):
+            Real time in seconds after which the test is failed with
+            :exc:`~cocotb.result.TestTimeout`. The failure is raised at the
+            next callback from the simulator.
+            Defaults to ``None``, meaning no real time limit.
         expect_fail (bool, optional):
             Don't mark the result as a failure if the test fails.
         expect_error (bool, optional):
@@ -437,10 +465,12 @@ class test(with_metaclass(_decorator_helper, coroutine)):
             Order tests logically into stages, where multiple tests can share a stage.
     """
     def __init__(self, f, timeout=None, expect_fail=False, expect_error=False,
-                 skip=False, stage=None):
+                 skip=False, stage=None, timeout_unit=None, wall_timeout=None):
         super(test, self).__init__(f)
 
         self.timeout = timeout
+        self.timeout_unit = timeout_unit
+        self.wall_timeout = wall_timeout
         self.expect_fail = expect_fail
         self.expect_error = expect_error
         self.skip = skip
@@ -31,6 +31,7 @@
 
 import logging
 from collections import deque
+from itertools import islice
 
 import cocotb
 from cocotb.decorators import coroutine
@@ -38,19 +39,113 @@ from cocotb.triggers import (Event, RisingEdge, ReadOnly, Timer, NextTimeStep,
                              Edge)
 from cocotb.bus import Bus
 from cocotb.log import SimLog
-from cocotb.result import ReturnValue
-from cocotb.utils import reject_remaining_kwargs
+from cocotb.result import ReturnValue, TestError
+from cocotb.utils import reject_remaining_kwargs, get_sim_time
+
+
+class _RunLengthBuffer(object):
+    """Buffer of ``(on, off)`` cycle counts pulled *size* at a time from a
+    generator, merging runs where they can be.
+
+    Consecutive entries are merged when the first has no off cycles. An
+    entry with no on cycles is dropped if *skip_empty*, otherwise its off
+    cycles are added to the previous entry.
+    """
+    def __init__(self, generator, size=1024, skip_empty=False):
+        self._generator = generator
+        self._size = size
+        self._skip_empty = skip_empty
+        self._runs = deque()
+
+    def _fill(self):
+        runs = self._runs
+        for on, off in islice(self._generator, self._size):
+            if not on:
+                if self._skip_empty or not off:
+                    continue
+                if runs:
+                    runs[-1][1] += off
+                    continue
+            if runs and not runs[-1][1]:
+                runs[-1][0] += on
+                runs[-1][1] = off
+            else:
+                runs.append([on, off])
+
+    def pop(self):
+        """Return the next ``(on, off)`` pair, or ``None`` once the
+        generator is exhausted."""
+        if not self._runs:
+            self._fill()
+            if not self._runs:
+                return None
+        return tuple(self._runs.popleft())
+
+
+class _CycleWaiter(object):
+    """Waits for a number of rising edges of a clock.
+
+    In *timed* mode the clock period is measured from two consecutive edges,
+    after which a long wait only resumes Python three times: at the next
+    edge, with a :class:`~cocotb.triggers.Timer` in the middle of the last
+    cycle, and at the final edge. This assumes a free running clock with
+    a constant period, the time of the final edge is checked to catch a
+    clock which changed its period.
+    """
+    def __init__(self, clock, timed=False):
+        self._edge = RisingEdge(clock)
+        self._timed = timed
+        self.period = None
+
+    def triggers(self, cycles):
+        """Iterate over the triggers to yield in turn to wait for *cycles*
+        rising edges, from within the calling coroutine."""
+        edge = self._edge
+        period = self.period
+        if period is None or cycles < 3:
+            last = None
+            for i in range(cycles):
+                yield edge
+                if self._timed and period is None:
+                    now = get_sim_time()
+                    if last is not None and now - last >= 2:
+                        period = self.period = now - last
+                    last = now
+            return
+
+        yield edge
+        expected = get_sim_time() + (cycles - 1) * period
+        yield Timer((cycles - 1) * period - period // 2)
+        yield edge
+        if get_sim_time() != expected:
+            raise TestError("Clock %s changed its period from %d steps during "
+                            "a timed wait of %d cycles, which needs a free "
+                            "running clock" % (edge.signal._name, period,
+                                               cycles))
+
+    @coroutine
+    def wait(self, cycles):
+        for trigger in self.triggers(cycles):
+            yield trigger
 
 
 class BitDriver(object):
     """Drives a signal onto a single bit.
 
     Useful for exercising ready / valid.
+
+    With *playback*, the ``(on, off)`` tuples of the generator are read
+    ahead into a run-length buffer of *buffer_size* entries. Each run is
+    then held with a timed wait rather than by waking up on every clock
+    edge, see :class:`_CycleWaiter`.
     """
-    def __init__(self, signal, clk, generator=None):
+    def __init__(self, signal, clk, generator=None, playback=False,
+                 buffer_size=1024):
         self._signal = signal
         self._clk = clk
         self._generator = generator
+        self._playback = playback
+        self._buffer_size = buffer_size
 
     def start(self, generator=None):
         """Start generating data.
@@ -71,6 +166,24 @@ class BitDriver(object):
         if generator is not None:
             self._generator = generator
 
+        if self._playback:
+            # Run in this coroutine so that stop() kills the playback
+            runs = _RunLengthBuffer(self._generator, self._buffer_size)
+            cycles = _CycleWaiter(self._clk, timed=True)
+            while True:
+                run = runs.pop()
+                if run is None:
+                    return
+                on, off = run
+                if on:
+                    self._signal <= 1
+                    for trigger in cycles.triggers(on):
+                        yield trigger
+                if off:
+                    self._signal <= 0
+                    for trigger in cycles.triggers(off):
+                        yield trigger
+
         edge = RisingEdge(self._clk)
 
         # Actual thread
@@ -84,6 +197,37 @@ class BitDriver(object):
                 yield edge
 
 
+class _TransactionStream(object):
+    """Iterator over the transactions of :meth:`Driver.send_stream`.
+
+    Pulls up to *prefetch* transactions at a time from *iterable* and calls
+    the functions in :attr:`taps` with each transaction it returns.
+    """
+    def __init__(self, iterable, prefetch):
+        self._source = iter(iterable)
+        self._buffer = deque()
+        self._prefetch = prefetch
+        self.taps = []
+        self.sent = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        buffer = self._buffer
+        if not buffer:
+            buffer.extend(islice(self._source, self._prefetch))
+            if not buffer:
+                raise StopIteration
+        transaction = buffer.popleft()
+        for tap in self.taps:
+            tap(transaction)
+        self.sent += 1
+        return transaction
+
+    next = __next__  # python 2
+
+
 class Driver(object):
     """Class defining the standard interface for a driver within a testbench.
 
@@ -126,9 +270,49 @@ class Driver(object):
         self._sendQ.append((transaction, callback, event, kwargs))
         self._pending.set()
 
+    def send_stream(self, iterable, prefetch=16, **kwargs):
+        """Queue up a stream of transactions to be sent back to back.
+
+        The stream takes a single place in the queue. Its transactions are
+        pulled from *iterable* up to *prefetch* at a time while it is being
+        sent, so *iterable* can be a generator of any length.
+
+        Args:
+            iterable: The transactions to be sent.
+            prefetch (int, optional): Maximum number of transactions taken
+                from *iterable* ahead of the one being sent.
+            **kwargs: Any additional arguments used in child class'
+                :any:`_driver_send` method.
+
+        Returns:
+            A forked coroutine, which can be joined to wait until the last
+            transaction has been sent, or the stream is dropped by
+            :meth:`clear`, and returns the number sent.
+
+        Raises:
+            :any:`ValueError`: If *prefetch* is not positive.
+        """
+        if prefetch < 1:
+            raise ValueError("prefetch must be positive, got %r" % prefetch)
+        stream = _TransactionStream(iterable, prefetch)
+        done = Event(name="Driver.send_stream")
+        self.append(stream, event=done, **kwargs)
+        return cocotb.fork(self._wait_for_stream(stream, done))
+
+    @coroutine
+    def _wait_for_stream(self, stream, done):
+        yield done.wait()
+        raise ReturnValue(stream.sent)
+
     def clear(self):
-        """Clear any queued transactions without sending them onto the bus."""
-        self._sendQ = deque()
+        """Clear any queued transactions without sending them onto the bus.
+
+        Joining a cleared :meth:`send_stream` returns 0.
+        """
+        queue, self._sendQ = self._sendQ, deque()
+        for transaction, callback, event, kwargs in queue:
+            if isinstance(transaction, _TransactionStream) and event:
+                event.set()
 
     @coroutine
     def send(self, transaction, sync=True, **kwargs):
@@ -158,6 +342,23 @@ class Driver(object):
         raise NotImplementedError("Subclasses of Driver should define a "
                                   "_driver_send coroutine")
 
+    @coroutine
+    def _driver_send_stream(self, transactions, sync=True, **kwargs):
+        """Send the transactions of a :meth:`send_stream` back to back.
+
+        Calls :any:`_driver_send` for each transaction, only synchronising on
+        the first one. Subclasses can override this to drive the stream without
+        a coroutine per transaction where the protocol allows.
+
+        Args:
+            transactions (iterator): The transactions to be sent.
+            sync (boolean, optional): Synchronise the transfer by waiting for a rising edge.
+            **kwargs: Additional arguments if required for protocol implemented in subclass.
+        """
+        for transaction in transactions:
+            yield self._driver_send(transaction, sync=sync, **kwargs)
+            sync = False
+
     @coroutine
     def _send(self, transaction, callback, event, sync=True, **kwargs):
         """Send coroutine.
@@ -171,7 +372,10 @@ class Driver(object):
             **kwargs: Any additional arguments used in child class' 
                 :any:`_driver_send` method.
         """
-        yield self._driver_send(transaction, sync=sync, **kwargs)
+        if isinstance(transaction, _TransactionStream):
+            yield self._driver_send_stream(transaction, sync=sync, **kwargs)
+        else:
+            yield self._driver_send(transaction, sync=sync, **kwargs)
 
         # Notify the world that this transaction is complete
         if event:
@@ -290,13 +494,23 @@ class ValidatedBusDriver(BusDriver):
         clock (SimHandle): A handle to the clock associated with this bus.
         valid_generator (generator, optional): a generator that yields tuples  of
             (valid, invalid) cycles to insert.
+        playback (bool, optional): Read the tuples of *valid_generator*
+            ahead into a run-length buffer, and hold valid low with timed
+            waits rather than by waking up on every clock edge, see
+            :class:`_CycleWaiter`.
     """
 
     def __init__(self, entity, name, clock, **kwargs):
         valid_generator = kwargs.pop("valid_generator", None)
+        self._playback = kwargs.pop("playback", False)
         BusDriver.__init__(self, entity, name, clock, **kwargs)
+        self._invalid_cycles = _CycleWaiter(clock, timed=self._playback)
         self.set_valid_generator(valid_generator=valid_generator)
 
+    def _wait_invalid(self):
+        """Wait out the :attr:`off` cycles in which valid is low."""
+        return self._invalid_cycles.wait(self.off)
+
     def _next_valids(self):
         """Optionally insert invalid cycles every N cycles
         Generator should return a tuple with the number of cycles to be
@@ -305,7 +519,17 @@ class ValidatedBusDriver(BusDriver):
         """
         self.on = False
 
-        if self.valid_generator is not None:
+        if self._valid_runs is not None:
+            run = self._valid_runs.pop()
+            if run is None:
+                self.on = True
+                self.log.info("Valid generator exhausted, not inserting "
+                              "non-valid cycles anymore")
+                return
+            self.on, self.off = run
+            self.log.debug("Will be on for %d cycles, off for %s",
+                           self.on, self.off)
+        elif self.valid_generator is not None:
             while not self.on:
                 try:
                     self.on, self.off = next(self.valid_generator)
@@ -326,6 +550,10 @@ class ValidatedBusDriver(BusDriver):
     def set_valid_generator(self, valid_generator=None):
         """Set a new valid generator for this bus."""
         self.valid_generator = valid_generator
+        self._valid_runs = None
+        if self._playback and valid_generator is not None:
+            self._valid_runs = _RunLengthBuffer(valid_generator,
+                                                skip_empty=True)
         self._next_valids()
 
 
@@ -26,14 +26,18 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE. '''
 """
 Drivers for Advanced Microcontroller Bus Architecture
 """
+import random
+from collections import deque, OrderedDict
+
 import cocotb
-from cocotb.triggers import RisingEdge, ReadOnly, Lock
+from cocotb.triggers import RisingEdge, ReadOnly, Lock, Event
 from cocotb.drivers import BusDriver
 from cocotb.result import ReturnValue
 from cocotb.binary import BinaryValue
+from cocotb.memory import SparseMemory
+from cocotb.utils import byte_view, int_from_bytes, int_to_bytes
 
 import binascii
-import array
 
 
 class AXIProtocolError(Exception):
@@ -212,11 +216,304 @@ class AXI4LiteMaster(BusDriver):
     def __len__(self):
         return 2**len(self.bus.ARADDR)
 
+class AXI4Master(BusDriver):
+    """
+    AXI4 Master
+
+    Transfers buffers of bytes with INCR bursts of the full bus width. A
+    transfer is split into bursts which don't cross a 4KB boundary, and
+    up to *max_outstanding* bursts per direction are in flight at once.
+    The unaligned ends of a transfer are written with ``WSTRB``.
+
+    All bursts use ID 0, so the responses arrive in order.
+
+    Args:
+        entity, name, clock: As for :class:`~cocotb.drivers.BusDriver`.
+        max_outstanding (int, optional): Number of bursts issued in each
+            direction before waiting for a response.
+        max_burst (int, optional): Maximum number of beats in a burst, up to
+            256.
+
+    Example:
+
+    >>> master = AXI4Master(dut, "m_axi", dut.clk)
+    >>> yield master.write(0x1000, firmware)
+    >>> data = yield master.read(0x1000, len(firmware))
+    """
+    _signals = ["AWVALID", "AWREADY", "AWADDR",              # Write address channel
+                "AWLEN", "AWSIZE", "AWBURST",
+                "WVALID", "WREADY", "WDATA", "WSTRB", "WLAST",  # Write data channel
+                "BVALID", "BREADY", "BRESP",                 # Write response channel
+                "ARVALID", "ARREADY", "ARADDR",              # Read address channel
+                "ARLEN", "ARSIZE", "ARBURST",
+                "RVALID", "RREADY", "RDATA", "RRESP", "RLAST"]  # Read data channel
+
+    _optional_signals = ["AWID", "AWPROT", "AWLOCK", "AWCACHE", "AWQOS",
+                         "ARID", "ARPROT", "ARLOCK", "ARCACHE", "ARQOS",
+                         "BID", "RID"]
+
+    def __init__(self, entity, name, clock, max_outstanding=4, max_burst=256):
+        BusDriver.__init__(self, entity, name, clock)
+        if max_outstanding < 1 or not 1 <= max_burst <= 256:
+            raise ValueError("Need at least one outstanding burst of 1 to "
+                             "256 beats, got %r of %r" %
+                             (max_outstanding, max_burst))
+        self.max_outstanding = max_outstanding
+        self.max_burst = max_burst
+        self._bus_bytes = len(self.bus.WDATA) // 8
+        self._size = self._bus_bytes.bit_length() - 1
+
+        # Drive some sensible defaults (setimmediatevalue to avoid x asserts)
+        self.bus.AWVALID.setimmediatevalue(0)
+        self.bus.WVALID.setimmediatevalue(0)
+        self.bus.ARVALID.setimmediatevalue(0)
+        self.bus.BREADY.setimmediatevalue(1)
+        self.bus.RREADY.setimmediatevalue(1)
+        for signal in self._optional_signals:
+            if signal[0] == "A" and hasattr(self.bus, signal):
+                getattr(self.bus, signal).setimmediatevalue(0)
+
+        # Transfers in the same direction take turns, each keeps several
+        # bursts in flight
+        self.write_busy = Lock("%s_wbusy" % name)
+        self.read_busy = Lock("%s_rbusy" % name)
+        self._writes_in_flight = 0
+        self._reads_in_flight = 0
+        self._write_addresses_sent = 0
+        self._write_address_event = Event("%s_waddr" % name)
+        self._write_response_event = Event("%s_bresp" % name)
+        self._read_response_event = Event("%s_rlast" % name)
+
+    def _bursts(self, address, length):
+        """Split a transfer into ``(aligned address, first byte, end)`` tuples,
+        one per burst."""
+        bus_bytes = self._bus_bytes
+        end = address + length
+        while address < end:
+            aligned = address & ~(bus_bytes - 1)
+            limit = min(end, (aligned | 0xfff) + 1,
+                        aligned + self.max_burst * bus_bytes)
+            yield aligned, address, limit
+            address = limit
+
+    @cocotb.coroutine
+    def _handshake(self, ready):
+        """Wait for *ready* while valid is asserted, then for the clock edge."""
+        clkedge = RisingEdge(self.clock)
+        while True:
+            yield ReadOnly()
+            if ready.value:
+                break
+            yield clkedge
+        yield clkedge
+
+    @cocotb.coroutine
+    def _send_addresses(self, prefix, bursts, in_flight, response_event):
+        """Issue the bursts on the AW or AR channel."""
+        bus = self.bus
+        valid = getattr(bus, prefix + "VALID")
+        addr = getattr(bus, prefix + "ADDR")
+        length = getattr(bus, prefix + "LEN")
+        size = getattr(bus, prefix + "SIZE")
+        burst = getattr(bus, prefix + "BURST")
+        ready = getattr(bus, prefix + "READY")
+        for aligned, _, end in bursts:
+            while getattr(self, in_flight) >= self.max_outstanding:
+                valid <= 0
+                response_event.clear()
+                yield response_event.wait()
+            addr <= aligned
+            length <= (end - aligned - 1) // self._bus_bytes
+            size <= self._size
+            burst <= 1      # INCR
+            valid <= 1
+            setattr(self, in_flight, getattr(self, in_flight) + 1)
+            yield self._handshake(ready)
+            if prefix == "AW":
+                self._write_addresses_sent += 1
+                self._write_address_event.set()
+        valid <= 0
+
+    @cocotb.coroutine
+    def _send_write_data(self, bursts, address, data):
+        """Send the data beats of each burst once its address was issued."""
+        bus = self.bus
+        bus_bytes = self._bus_bytes
+        for n, (beat, first, end) in enumerate(bursts):
+            while self._write_addresses_sent <= n:
+                bus.WVALID <= 0
+                self._write_address_event.clear()
+                yield self._write_address_event.wait()
+            while beat < end:
+                start = max(beat, first)
+                stop = min(beat + bus_bytes, end)
+                lane = start - beat
+                bus.WDATA <= int_from_bytes(data[start - address:stop - address],
+                                            big_endian=False) << (8 * lane)
+                bus.WSTRB <= ((1 << (stop - start)) - 1) << lane
+                bus.WLAST <= int(stop == end)
+                bus.WVALID <= 1
+                yield self._handshake(bus.WREADY)
+                beat += bus_bytes
+        bus.WVALID <= 0
+
+    @cocotb.coroutine
+    def _write_responses(self, bursts):
+        """Collect a write response per burst.
+
+        Returns:
+            The index of the first burst which failed, or ``None``.
+        """
+        clkedge = RisingEdge(self.clock)
+        bus = self.bus
+        failed = None
+        n = 0
+        while n < len(bursts):
+            yield ReadOnly()
+            if bus.BVALID.value and bus.BREADY.value:
+                if bus.BRESP.value.integer and failed is None:
+                    failed = n
+                n += 1
+                yield clkedge
+                self._writes_in_flight -= 1
+                self._write_response_event.set()
+            else:
+                yield clkedge
+        raise ReturnValue(failed)
+
+    @cocotb.coroutine
+    def _read_responses(self, bursts, address, view):
+        """Collect the read data of every burst into *view*.
+
+        Returns:
+            The index of the first burst which failed, or ``None``.
+        """
+        clkedge = RisingEdge(self.clock)
+        bus = self.bus
+        bus_bytes = self._bus_bytes
+        failed = None
+        for n, (beat, first, end) in enumerate(bursts):
+            while beat < end:
+                yield ReadOnly()
+                if not (bus.RVALID.value and bus.RREADY.value):
+                    yield clkedge
+                    continue
+                start = max(beat, first)
+                stop = min(beat + bus_bytes, end)
+                word = bus.RDATA.value.integer >> (8 * (start - beat))
+                view[start - address:stop - address] = int_to_bytes(
+                    word & ((1 << (8 * (stop - start))) - 1), stop - start,
+                    big_endian=False)
+                if bus.RRESP.value.integer and failed is None:
+                    failed = n
+                beat += bus_bytes
+                yield clkedge
+            self._reads_in_flight -= 1
+            self._read_response_event.set()
+        raise ReturnValue(failed)
+
+    def _end_transfer(self, threads, lock, in_flight, valids):
+        """Stop the channel coroutines of a transfer, which are still running
+        if it failed, and let the next transfer start."""
+        for thread in threads:
+            thread.kill()
+        for valid in valids:
+            valid <= 0
+        setattr(self, in_flight, 0)
+        lock.release()
+
+    @cocotb.coroutine
+    def write(self, address, data, sync=True):
+        """
+        Write a buffer to consecutive addresses.
+
+        Args:
+            address (int): The address of the first byte.
+            data: A bytes-like object to write, e.g. ``bytes``, a
+                ``memoryview`` or an ``array.array``.
+            sync (bool, optional): Wait for rising edge on clock initially.
+                Defaults to True.
+
+        Raises:
+            AXIProtocolError: If a write response from AXI is not ``OKAY``
+        """
+        data = byte_view(data)
+        bursts = list(self._bursts(address, len(data)))
+
+        yield self.write_busy.acquire()
+        threads = []
+        try:
+            if sync:
+                yield RisingEdge(self.clock)
+
+            self._write_addresses_sent = 0
+            threads.append(cocotb.fork(self._send_addresses(
+                "AW", bursts, "_writes_in_flight",
+                self._write_response_event)))
+            threads.append(cocotb.fork(
+                self._send_write_data(bursts, address, data)))
+            failed = yield self._write_responses(bursts)
+            for thread in threads:
+                yield thread.join()
+        finally:
+            self._end_transfer(threads, self.write_busy, "_writes_in_flight",
+                               [self.bus.AWVALID, self.bus.WVALID])
+
+        if failed is not None:
+            raise AXIProtocolError("Write burst to address 0x%08x failed" %
+                                   bursts[failed][1])
+
+    @cocotb.coroutine
+    def read(self, address, length, sync=True):
+        """
+        Read a buffer from consecutive addresses.
+
+        Args:
+            address (int): The address of the first byte.
+            length (int): The number of bytes to read.
+            sync (bool, optional): Wait for rising edge on clock initially.
+                Defaults to True.
+
+        Returns:
+            bytes: The data read.
+
+        Raises:
+            AXIProtocolError: If a read response from AXI is not ``OKAY``
+        """
+        result = bytearray(length)
+        bursts = list(self._bursts(address, length))
+
+        yield self.read_busy.acquire()
+        threads = []
+        try:
+            if sync:
+                yield RisingEdge(self.clock)
+
+            threads.append(cocotb.fork(self._send_addresses(
+                "AR", bursts, "_reads_in_flight", self._read_response_event)))
+            failed = yield self._read_responses(bursts, address,
+                                                memoryview(result))
+            for thread in threads:
+                yield thread.join()
+        finally:
+            self._end_transfer(threads, self.read_busy, "_reads_in_flight",
+                               [self.bus.ARVALID])
+
+        if failed is not None:
+            raise AXIProtocolError("Read burst from address 0x%08x failed" %
+                                   bursts[failed][1])
+
+        raise ReturnValue(bytes(result))
+
+
 class AXI4Slave(BusDriver):
     '''
     AXI4 Slave
 
     Monitors an internal memory and handles read and write requests.
+
+    *memory* is a :class:`~cocotb.memory.SparseMemory`, or a writable buffer
+    such as an ``array.array`` which is then accessed in place.
     '''
     _signals = [
         "ARREADY", "ARVALID", "ARADDR",             # Read address channel
@@ -252,6 +549,10 @@ class AXI4Slave(BusDriver):
         self.bus.RVALID.setimmediatevalue(0)
         self.bus.RLAST.setimmediatevalue(0)
         self.bus.AWREADY.setimmediatevalue(1)
+        if not isinstance(memory, SparseMemory):
+            view = byte_view(memory)
+            memory = SparseMemory(size=len(view))
+            memory.map(0, view)
         self._memory = memory
 
         self.write_address_busy = Lock("%s_wabusy" % name)
@@ -288,8 +589,7 @@ class AXI4Slave(BusDriver):
 
             burst_length = _awlen + 1
             bytes_in_beat = self._size_to_bytes_in_beat(_awsize)
-
-            word = BinaryValue(n_bits=bytes_in_beat*8, bigEndian=self.big_endian)
+            beat_mask = (1 << (8 * bytes_in_beat)) - 1
 
             if __debug__:
                 self.log.debug(
@@ -306,12 +606,11 @@ class AXI4Slave(BusDriver):
 
             while True:
                 if self.bus.WVALID.value:
-                    word = self.bus.WDATA.value
-                    word.big_endian = self.big_endian
                     _burst_diff = burst_length - burst_count
                     _st = _awaddr + (_burst_diff * bytes_in_beat)  # start
-                    _end = _awaddr + ((_burst_diff + 1) * bytes_in_beat)  # end
-                    self._memory[_st:_end] = array.array('B', word.get_buff())
+                    data = self.bus.WDATA.value.integer & beat_mask
+                    self._memory.write_word(_st, data, bytes_in_beat,
+                                            big_endian=self.big_endian)
                     burst_count -= 1
                     if burst_count == 0:
                         break
@@ -338,8 +637,6 @@ class AXI4Slave(BusDriver):
             burst_length = _arlen + 1
             bytes_in_beat = self._size_to_bytes_in_beat(_arsize)
 
-            word = BinaryValue(n_bits=bytes_in_beat*8, bigEndian=self.big_endian)
-
             if __debug__:
                 self.log.debug(
                     "ARADDR  %d\n" % _araddr +
@@ -359,9 +656,8 @@ class AXI4Slave(BusDriver):
                 if self.bus.RREADY.value:
                     _burst_diff = burst_length - burst_count
                     _st = _araddr + (_burst_diff * bytes_in_beat)
-                    _end = _araddr + ((_burst_diff + 1) * bytes_in_beat)
-                    word.buff = self._memory[_st:_end].tostring()
-                    self.bus.RDATA <= word
+                    self.bus.RDATA <= self._memory.read_word(
+                        _st, bytes_in_beat, big_endian=self.big_endian)
                     if burst_count == 1:
                         self.bus.RLAST <= 1
                 yield clock_re
@@ -369,3 +665,279 @@ class AXI4Slave(BusDriver):
                 self.bus.RLAST <= 0
                 if burst_count == 0:
                     break
+
+
+class _AXIBurst(object):
+    """A burst accepted on an address channel."""
+    __slots__ = ("id", "addresses", "size", "beat", "due")
+
+    def __init__(self, id, addresses, size):
+        self.id = id
+        self.addresses = addresses
+        self.size = size
+        self.beat = 0
+        self.due = None
+
+
+class AXI4PipelinedSlave(AXI4Slave):
+    '''
+    AXI4 Slave accepting multiple outstanding transactions.
+
+    Each of the AW, W, B, AR and R channels is handled by its own coroutine,
+    so addresses are accepted while earlier bursts are still transferring
+    and data moves at one beat per clock. FIXED, INCR and WRAP bursts,
+    narrow transfers and ``WSTRB`` are supported.
+
+    Bursts are queued per ID. The response to a burst becomes available
+    *latency* clock cycles after its read address, or its last write data
+    beat, was accepted. Responses to one ID are always in order; with
+    *reorder* responses to different IDs are returned in a random order.
+    Read data of different IDs is not interleaved.
+
+    Args:
+        entity, name, clock, memory, big_endian: As for :class:`AXI4Slave`.
+        latency (int or tuple, optional): Response latency in clock cycles,
+            or a ``(min, max)`` range to pick from at random for each burst.
+        reorder (bool, optional): Return responses to different IDs in a
+            random order.
+        max_outstanding (int, optional): Deassert ``AWREADY`` or ``ARREADY``
+            while this many writes or reads are waiting for their response.
+            Without a ``BVALID`` signal a write counts until its last data
+            beat is stored. Defaults to ``None``, no limit.
+    '''
+
+    def __init__(self, entity, name, clock, memory, callback=None, event=None,
+                 big_endian=False, latency=1, reorder=False,
+                 max_outstanding=None):
+        if not isinstance(latency, tuple):
+            latency = (latency, latency)
+        self._latency = latency
+        self._reorder = reorder
+        self._max_outstanding = max_outstanding
+
+        # Handed over between the channel coroutines
+        self._writes = deque()
+        self._write_beats = deque()
+        self._new_reads = deque()
+        self._new_responses = deque()
+        self._writes_outstanding = 0
+        self._reads_outstanding = 0
+
+        AXI4Slave.__init__(self, entity, name, clock, memory,
+                           callback=callback, event=event,
+                           big_endian=big_endian)
+        self._bus_bytes = len(self.bus.RDATA) // 8
+
+    def _burst(self, prefix):
+        """Capture the burst on the AW or AR channel."""
+        bus = self.bus
+        addr = getattr(bus, prefix + "ADDR").value.integer
+        length = getattr(bus, prefix + "LEN").value.integer + 1
+        size = 1 << getattr(bus, prefix + "SIZE").value.integer
+        burst = getattr(bus, prefix + "BURST").value.integer
+        id = 0
+        if hasattr(bus, prefix + "ID"):
+            id = getattr(bus, prefix + "ID").value.integer
+
+        aligned = addr & ~(size - 1)
+        if burst == 0:      # FIXED
+            addresses = [aligned] * length
+        elif burst == 2:    # WRAP
+            total = size * length
+            base = aligned - aligned % total
+            addresses = [base + (aligned - base + i * size) % total
+                         for i in range(length)]
+        else:               # INCR
+            addresses = [aligned + i * size for i in range(length)]
+        return _AXIBurst(id, addresses, size)
+
+    def _lane_shift(self, addr, size):
+        """Position in bits of the byte lanes of a beat in the data bus."""
+        lane = addr % self._bus_bytes
+        if self.big_endian:
+            return 8 * (self._bus_bytes - size - lane)
+        return 8 * lane
+
+    def _pick(self, queues, cycle):
+        """Choose the ID whose oldest burst is due for a response."""
+        due = [id for id, queue in queues.items() if queue[0].due <= cycle]
+        if not due:
+            return None
+        if self._reorder:
+            return queues[random.choice(due)][0]
+        return queues[min(due, key=lambda id: queues[id][0].due)][0]
+
+    def _queue(self, queues, new, cycle):
+        """Move newly accepted bursts to their ID queue."""
+        while new:
+            burst = new.popleft()
+            burst.due = cycle + random.randint(*self._latency)
+            queues.setdefault(burst.id, deque()).append(burst)
+
+    def _store_writes(self):
+        """Write the data beats received for the oldest bursts to memory."""
+        writes = self._writes
+        beats = self._write_beats
+        while writes and beats:
+            burst = writes[0]
+            data, strobe = beats.popleft()
+            addr = burst.addresses[burst.beat]
+            size = burst.size
+            lane = addr % self._bus_bytes
+            data = (data >> self._lane_shift(addr, size)) & ((1 << (8 * size)) - 1)
+            if strobe is not None:
+                strobe = (strobe >> lane) & ((1 << size) - 1)
+            self._memory.write_word(addr, data, size,
+                                    big_endian=self.big_endian, strobe=strobe)
+            burst.beat += 1
+            if burst.beat == len(burst.addresses):
+                writes.popleft()
+                if self._has_write_response:
+                    self._new_responses.append(burst)
+                else:
+                    # Without a B channel the write is done once stored
+                    self._writes_outstanding -= 1
+
+    def _ready(self, outstanding):
+        return self._max_outstanding is None or outstanding < self._max_outstanding
+
+    @cocotb.coroutine
+    def _write_data(self):
+        self._has_write_response = hasattr(self.bus, "BVALID")
+        cocotb.fork(self._write_address_channel())
+        cocotb.fork(self._write_response_channel())
+        yield self._write_data_channel()
+
+    @cocotb.coroutine
+    def _read_data(self):
+        cocotb.fork(self._read_address_channel())
+        yield self._read_data_channel()
+
+    @cocotb.coroutine
+    def _write_address_channel(self):
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        ready = True
+        while True:
+            yield rdonly
+            if ready and self.bus.AWVALID.value:
+                self._writes.append(self._burst("AW"))
+                self._writes_outstanding += 1
+                self._store_writes()
+            yield clkedge
+            ready = self._ready(self._writes_outstanding)
+            self.bus.AWREADY <= int(ready)
+
+    @cocotb.coroutine
+    def _write_data_channel(self):
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        bus = self.bus
+        has_strobe = hasattr(bus, "WSTRB")
+        bus.WREADY <= 1
+        while True:
+            yield rdonly
+            if bus.WVALID.value:
+                strobe = bus.WSTRB.value.integer if has_strobe else None
+                self._write_beats.append((bus.WDATA.value.integer, strobe))
+                self._store_writes()
+            yield clkedge
+
+    @cocotb.coroutine
+    def _write_response_channel(self):
+        bus = self.bus
+        if not self._has_write_response:
+            return
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        has_id = hasattr(bus, "BID")
+        has_resp = hasattr(bus, "BRESP")
+        queues = OrderedDict()
+        current = None
+        cycle = 0
+        bus.BVALID <= 0
+        while True:
+            yield rdonly
+            accepted = current is not None and bus.BREADY.value
+            yield clkedge
+            cycle += 1
+            self._queue(queues, self._new_responses, cycle)
+
+            if accepted:
+                queue = queues[current.id]
+                queue.popleft()
+                if not queue:
+                    del queues[current.id]
+                self._writes_outstanding -= 1
+                current = None
+
+            if current is None:
+                current = self._pick(queues, cycle)
+                if current is None:
+                    bus.BVALID <= 0
+                    continue
+                if has_id:
+                    bus.BID <= current.id
+                if has_resp:
+                    bus.BRESP <= 0
+                bus.BVALID <= 1
+
+    @cocotb.coroutine
+    def _read_address_channel(self):
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        ready = True
+        while True:
+            yield rdonly
+            if ready and self.bus.ARVALID.value:
+                self._new_reads.append(self._burst("AR"))
+                self._reads_outstanding += 1
+            yield clkedge
+            ready = self._ready(self._reads_outstanding)
+            self.bus.ARREADY <= int(ready)
+
+    @cocotb.coroutine
+    def _read_data_channel(self):
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        bus = self.bus
+        has_id = hasattr(bus, "RID")
+        has_resp = hasattr(bus, "RRESP")
+        memory = self._memory
+        queues = OrderedDict()
+        current = None
+        cycle = 0
+        while True:
+            yield rdonly
+            accepted = current is not None and bus.RREADY.value
+            yield clkedge
+            cycle += 1
+            self._queue(queues, self._new_reads, cycle)
+
+            if accepted:
+                current.beat += 1
+                if current.beat == len(current.addresses):
+                    queue = queues[current.id]
+                    queue.popleft()
+                    if not queue:
+                        del queues[current.id]
+                    self._reads_outstanding -= 1
+                    current = None
+
+            if current is None:
+                current = self._pick(queues, cycle)
+                if current is None:
+                    bus.RVALID <= 0
+                    bus.RLAST <= 0
+                    continue
+                if has_id:
+                    bus.RID <= current.id
+                if has_resp:
+                    bus.RRESP <= 0
+
+            addr = current.addresses[current.beat]
+            data = memory.read_word(addr, current.size,
+                                    big_endian=self.big_endian)
+            bus.RDATA <= data << self._lane_shift(addr, current.size)
+            bus.RLAST <= int(current.beat == len(current.addresses) - 1)
+            bus.RVALID <= 1
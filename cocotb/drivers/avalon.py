@@ -33,13 +33,16 @@ NB Currently we only support a very small subset of functionality
 """
 
 import random
+from collections import deque
 
 import cocotb
 from cocotb.decorators import coroutine
 from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly, NextTimeStep, Event
 from cocotb.drivers import BusDriver, ValidatedBusDriver
-from cocotb.utils import hexdump
+from cocotb.utils import hexdump, int_from_bytes
 from cocotb.binary import BinaryValue
+from cocotb.log import LazyMessage
+from cocotb.memory import SparseMemory
 from cocotb.result import ReturnValue, TestError
 
 
@@ -56,7 +59,7 @@ class AvalonMM(BusDriver):
     _signals = ["address"]
     _optional_signals = ["readdata", "read", "write", "waitrequest",
                          "writedata", "readdatavalid", "byteenable",
-                         "cs"]
+                         "cs", "burstcount"]
 
 
     def __init__(self, entity, name, clock, **kwargs):
@@ -82,6 +85,9 @@ class AvalonMM(BusDriver):
         if hasattr(self.bus, "cs"):
             self.bus.cs.setimmediatevalue(0)
 
+        if hasattr(self.bus, "burstcount"):
+            self.bus.burstcount.setimmediatevalue(1)
+
         v = self.bus.address.value
         v.binstr = "x" * len(self.bus.address)
         self.bus.address.setimmediatevalue(v)
@@ -93,20 +99,54 @@ class AvalonMM(BusDriver):
         pass
 
 
+class _AvalonRead(object):
+    """A read command waiting for its ``readdatavalid`` beats."""
+    __slots__ = ("count", "data", "event")
+
+    def __init__(self, count):
+        self.count = count
+        self.data = []
+        self.event = Event()
+
+
 class AvalonMaster(AvalonMM):
-    """Avalon Memory Mapped Interface (Avalon-MM) Master"""
-    def __init__(self, entity, name, clock, **kwargs):
+    """Avalon Memory Mapped Interface (Avalon-MM) Master
+
+    With *pipelined*, a read only holds the bus until the slave accepts the
+    command. Further reads and writes can then be issued while a background
+    coroutine hands the ``readdatavalid`` beats to the pending reads in
+    the order they were issued. This needs the ``readdatavalid`` signal.
+
+    :meth:`read_block` and :meth:`write_block` transfer consecutive words,
+    using ``burstcount`` bursts if the bus has the signal. Addresses are
+    in symbols, i.e. bytes, and step by the width of the data bus.
+    """
+    def __init__(self, entity, name, clock, pipelined=False, **kwargs):
         AvalonMM.__init__(self, entity, name, clock, **kwargs)
         self.log.debug("AvalonMaster created")
         self.busy_event = Event("%s_busy" % name)
         self.busy = False
 
+        data = self.bus.readdata if self._can_read else self.bus.writedata
+        self._word_bytes = len(data) // 8
+        self._max_burst = 1
+        if hasattr(self.bus, "burstcount"):
+            self._max_burst = 1 << (len(self.bus.burstcount) - 1)
+
+        self._pipelined = pipelined
+        self._pending = deque()
+        if pipelined:
+            if not hasattr(self.bus, "readdatavalid"):
+                raise TestError("Pipelined reads need a readdatavalid signal")
+            self._tracker = cocotb.fork(self._track_responses())
+
     def __len__(self):
         return 2**len(self.bus.address)
 
     @coroutine
     def _acquire_lock(self):
-        if self.busy:
+        # Several coroutines can be woken by one release
+        while self.busy:
             yield self.busy_event.wait()
         self.busy_event.clear()
         self.busy = True
@@ -136,6 +176,10 @@ class AvalonMaster(AvalonMM):
             self.log.error("Cannot read - have no read signal")
             raise TestError("Attempt to read on a write-only AvalonMaster")
 
+        if self._pipelined:
+            data = yield self._pipelined_read(address, 1, sync)
+            raise ReturnValue(data[0])
+
         yield self._acquire_lock()
 
         # Apply values for next clock edge
@@ -230,8 +274,185 @@ class AvalonMaster(AvalonMM):
         self._release_lock()
 
 
+    def _idle(self):
+        """Deassert the command signals."""
+        if self._can_read:
+            self.bus.read <= 0
+        if self._can_write:
+            self.bus.write <= 0
+            v = self.bus.writedata.value
+            v.binstr = "x" * len(self.bus.writedata)
+            self.bus.writedata <= v
+        if hasattr(self.bus, "byteenable"):
+            self.bus.byteenable <= 0
+        if hasattr(self.bus, "cs"):
+            self.bus.cs <= 0
+        if hasattr(self.bus, "burstcount"):
+            self.bus.burstcount <= 1
+        v = self.bus.address.value
+        v.binstr = "x" * len(self.bus.address)
+        self.bus.address <= v
+
+    @coroutine
+    def _accepted(self):
+        """Wait until the slave accepts the command on the bus."""
+        if hasattr(self.bus, "waitrequest"):
+            yield self._wait_for_nsignal(self.bus.waitrequest)
+        yield RisingEdge(self.clock)
+
+    def _bursts(self, address, n):
+        """Split *n* words from *address* into ``(address, count)`` bursts."""
+        step = self._word_bytes
+        while n > 0:
+            count = min(n, self._max_burst)
+            yield address, count
+            address += count * step
+            n -= count
+
+    @coroutine
+    def _track_responses(self):
+        """Hand the read data to the pending reads in order."""
+        clkedge = RisingEdge(self.clock)
+        rdonly = ReadOnly()
+        while True:
+            yield clkedge
+            yield rdonly
+            if not self.bus.readdatavalid.value:
+                continue
+            if not self._pending:
+                self.log.error("readdatavalid asserted without a pending read")
+                continue
+            request = self._pending[0]
+            request.data.append(self.bus.readdata.value)
+            if len(request.data) == request.count:
+                self._pending.popleft()
+                request.event.set(request.data)
+
+    @coroutine
+    def _pipelined_read(self, address, n, sync=True):
+        """Issue the reads of *n* words back-to-back, then wait for the data."""
+        yield self._acquire_lock()
+        if sync:
+            yield RisingEdge(self.clock)
+
+        requests = []
+        for burst_address, count in self._bursts(address, n):
+            self.bus.address <= burst_address
+            self.bus.read <= 1
+            if hasattr(self.bus, "byteenable"):
+                self.bus.byteenable <= int("1"*len(self.bus.byteenable), 2)
+            if hasattr(self.bus, "cs"):
+                self.bus.cs <= 1
+            if hasattr(self.bus, "burstcount"):
+                self.bus.burstcount <= count
+            yield self._accepted()
+            request = _AvalonRead(count)
+            self._pending.append(request)
+            requests.append(request)
+        self._idle()
+        self._release_lock()
+
+        data = []
+        for request in requests:
+            yield request.event.wait()
+            data.extend(request.data)
+        raise ReturnValue(data)
+
+    @coroutine
+    def read_block(self, address, n, sync=True):
+        """Read *n* consecutive words starting at *address*.
+
+        The reads are pipelined if the master is, and use bursts if the bus
+        has a ``burstcount`` signal.
+
+        Args:
+            address (int): The address of the first word.
+            n (int): The number of words to read.
+            sync (bool, optional): Wait for rising edge on clock initially.
+                Defaults to True.
+
+        Returns:
+            list(BinaryValue): The read data values.
+
+        Raises:
+            :any:`TestError`: If master is write-only, or uses bursts
+                without being pipelined.
+        """
+        if not self._can_read:
+            self.log.error("Cannot read - have no read signal")
+            raise TestError("Attempt to read on a write-only AvalonMaster")
+
+        if self._pipelined:
+            data = yield self._pipelined_read(address, n, sync)
+            raise ReturnValue(data)
+
+        if self._max_burst > 1:
+            raise TestError("Burst reads need a pipelined AvalonMaster")
+        data = []
+        for i in range(n):
+            value = yield self.read(address + i * self._word_bytes,
+                                    sync=sync and not i)
+            data.append(value)
+        raise ReturnValue(data)
+
+    @coroutine
+    def write_block(self, address, data, sync=True):
+        """Write the words in *data* to consecutive addresses, back-to-back.
+
+        Bursts are used if the bus has a ``burstcount`` signal.
+
+        Args:
+            address (int): The address of the first word.
+            data (list(int)): The data values to write.
+            sync (bool, optional): Wait for rising edge on clock initially.
+                Defaults to True.
+
+        Raises:
+            :any:`TestError`: If master is read-only.
+        """
+        if not self._can_write:
+            self.log.error("Cannot write - have no write signal")
+            raise TestError("Attempt to write on a read-only AvalonMaster")
+
+        yield self._acquire_lock()
+        if sync:
+            yield RisingEdge(self.clock)
+
+        data = list(data)
+        pos = 0
+        for burst_address, count in self._bursts(address, len(data)):
+            self.bus.address <= burst_address
+            if hasattr(self.bus, "burstcount"):
+                self.bus.burstcount <= count
+            if hasattr(self.bus, "byteenable"):
+                self.bus.byteenable <= int("1"*len(self.bus.byteenable), 2)
+            if hasattr(self.bus, "cs"):
+                self.bus.cs <= 1
+            for value in data[pos:pos + count]:
+                self.bus.writedata <= value
+                self.bus.write <= 1
+                yield self._accepted()
+            pos += count
+        self._idle()
+        self._release_lock()
+
+
 class AvalonMemory(BusDriver):
-    """Emulate a memory, with back-door access."""
+    """Emulate a memory, with back-door access.
+
+    The contents are held in a :class:`~cocotb.memory.SparseMemory`, which
+    can be passed as *memory* to share it with other bus models or to
+    preload it. A dictionary of byte values keyed by address preloads a
+    new one, and every byte written over the bus is also stored in the
+    dictionary, so it can still be used to check what was written. Changes
+    made to the dictionary afterwards are not seen on the bus, ports
+    sharing a memory need a :class:`~cocotb.memory.SparseMemory`.
+    Reads of bytes which were never written return X's.
+
+    Raises:
+        :any:`ValueError`: If a value in a *memory* dictionary is not a
+            byte.
+    """
     _signals = ["address"]
     _optional_signals = ["write", "read", "writedata", "readdatavalid",
                          "readdata", "waitrequest", "burstcount", "byteenable"]
@@ -280,9 +501,19 @@ class AvalonMemory(BusDriver):
         if not self._readable and not self._writeable:
             raise TestError("Attempt to instantiate useless memory")
 
-        # Allow dual port RAMs by referencing the same dictionary
+        # Dual port RAMs share one SparseMemory, a dictionary preloads it and
+        # mirrors the writes
+        self._mirror = None
         if memory is None:
-            self._mem = {}
+            self._mem = SparseMemory()
+        elif isinstance(memory, dict):
+            self._mirror = memory
+            self._mem = SparseMemory()
+            for addr, value in memory.items():
+                if not 0 <= value <= 0xFF:
+                    raise ValueError("Memory holds bytes, got 0x%x at "
+                                     "address 0x%x" % (value, addr))
+                self._mem.write(addr, bytearray([value]))
         else:
             self._mem = memory
 
@@ -357,15 +588,19 @@ class AvalonMemory(BusDriver):
 
         return (addr, byteenable, burstcount)
 
+    def _write_word(self, addr, data, strobe=None):
+        """Write a bus word to the memory and the dictionary it mirrors."""
+        self._mem.write_word(addr, data, self.dataByteSize, strobe=strobe)
+        if self._mirror is not None:
+            for i in range(self.dataByteSize):
+                if strobe is None or strobe >> i & 1:
+                    self._mirror[addr + i] = data >> 8 * i & 0xFF
+
     @coroutine
     def _writing_byte_value(self, byteaddr):
         """Writing value in _mem with byteaddr size."""
         yield FallingEdge(self.clock)
-        for i in range(self.dataByteSize):
-            data = self.bus.writedata.value.integer
-            addrtmp = byteaddr + i
-            datatmp = (data >> (i*8)) & 0xff
-            self._mem[addrtmp] = datatmp
+        self._write_word(byteaddr, self.bus.writedata.value.integer)
 
     @coroutine
     def _waitrequest(self):
@@ -387,9 +622,13 @@ class AvalonMemory(BusDriver):
     def _respond(self):
         """Coroutine to respond to the actual requests."""
         edge = RisingEdge(self.clock)
+        sampled = False
         while True:
-            yield edge
-            self._do_response()
+            # A burst read returns just after an edge, ready to sample
+            if not sampled:
+                yield edge
+                self._do_response()
+            sampled = False
 
             yield ReadOnly()
 
@@ -397,14 +636,15 @@ class AvalonMemory(BusDriver):
                 if not self._burstread:
                     self._pad()
                     addr = self.bus.address.value.integer
-                    if addr not in self._mem:
+                    if not self._mem.is_initialised(addr, self.dataByteSize):
                         self.log.warning("Attempt to read from uninitialised "
                                          "address 0x%x" % addr)
                         self._responses.append(True)
                     else:
-                        self.log.debug("Read from address 0x%x returning 0x%x" %
-                                       (addr, self._mem[addr]))
-                        self._responses.append(self._mem[addr])
+                        value = self._mem.read_word(addr, self.dataByteSize)
+                        self.log.debug("Read from address 0x%x returning 0x%x",
+                                       addr, value)
+                        self._responses.append(value)
                 else:
                     addr = self.bus.address.value.integer
                     if addr % self.dataByteSize != 0:
@@ -430,57 +670,45 @@ class AvalonMemory(BusDriver):
                     yield edge
                     self.bus.waitrequest <= 0
 
-                    # wait for read data
+                    # wait for read data, holding off further commands
+                    # after this one was accepted until the burst is done
                     for i in range(self._avalon_properties["readLatency"]):
                         yield edge
+                        self.bus.waitrequest <= 1
                     for count in range(burstcount):
-                        if (addr + count)*self.dataByteSize not in self._mem:
+                        byteaddr = (addr + count)*self.dataByteSize
+                        if not self._mem.is_initialised(byteaddr,
+                                                        self.dataByteSize):
                             self.log.warning(
                                    "Attempt to burst read from uninitialised " +
                                    "address 0x%x (addr 0x%x count 0x%x)" %
-                                    ((addr + count)*self.dataByteSize, addr, count) )
+                                    (byteaddr, addr, count) )
                             self._responses.append(True)
                         else:
-                            value = 0
-                            for i in range(self.dataByteSize):
-                                rvalue = self._mem[(addr + count)*self.dataByteSize + i]
-                                value += rvalue << i*8
-                            self.log.debug("Read from address 0x%x returning 0x%x" %
-                                           ((addr + count)*self.dataByteSize, value))
+                            value = self._mem.read_word(byteaddr,
+                                                        self.dataByteSize)
+                            self.log.debug("Read from address 0x%x returning 0x%x",
+                                           byteaddr, value)
                             self._responses.append(value)
                         yield edge
+                        self.bus.waitrequest <= 1
                         self._do_response()
+                    self.bus.waitrequest <= int(self._avalon_properties.get(
+                        "WriteBurstWaitReq", True))
+                    sampled = True
+                    continue
 
             if self._writeable and self.bus.write.value:
                 if not self._burstwrite:
                     addr = self.bus.address.value.integer
                     data = self.bus.writedata.value.integer
+                    byteenable = None
                     if hasattr(self.bus, "byteenable"):
                         byteenable = int(self.bus.byteenable.value)
-                        mask = 0
-                        oldmask = 0
-                        olddata = 0
-                        if (addr in self._mem):
-                            olddata = self._mem[addr]
-                        self.log.debug("Old Data  : %x" % olddata)
-                        self.log.debug("Data in   : %x" % data)
-                        self.log.debug("Width     : %d" % self._width)
-                        self.log.debug("Byteenable: %x" % byteenable)
-                        for i in range(self._width/8):
-                            if (byteenable & 2**i):
-                                mask |= 0xFF << (8*i)
-                            else:
-                                oldmask |= 0xFF << (8*i)
-
-                        self.log.debug("Data mask : %x" % mask)
-                        self.log.debug("Old mask  : %x" % oldmask)
-
-                        data = (data & mask) | (olddata & oldmask)
-
-                        self.log.debug("Data out  : %x" % data)
-
-                    self.log.debug("Write to address 0x%x -> 0x%x" % (addr, data))
-                    self._mem[addr] = data
+
+                    self.log.debug("Write to address 0x%x -> 0x%x (byteenable %r)",
+                                   addr, data, byteenable)
+                    self._write_word(addr, data, strobe=byteenable)
                 else:
                     self.log.debug("writing burst")
                     # maintain waitrequest high randomly
@@ -566,8 +794,7 @@ class AvalonST(ValidatedBusDriver):
         # Insert a gap where valid is low
         if not self.on:
             self.bus.valid <= 0
-            for i in range(self.off):
-                yield clkedge
+            yield self._wait_invalid()
 
             # Grab the next set of on/off values
             self._next_valids()
@@ -632,25 +859,31 @@ class AvalonSTPkts(ValidatedBusDriver):
         self.use_empty = (num_data_symbols > 1)
         self.config["useEmpty"] = self.use_empty
 
-        word   = BinaryValue(n_bits=len(self.bus.data),
-                             bigEndian=self.config['firstSymbolInHighOrderBits'])
+        # The optional signals don't change, look for them once
+        self._has_ready = hasattr(self.bus, "ready")
+        self._has_channel = hasattr(self.bus, "channel")
+        self._has_error = hasattr(self.bus, "error")
 
-        single = BinaryValue(n_bits=1, bigEndian=False)
+        # FIXME busses that aren't integer numbers of bytes
+        self._bus_bytes = len(self.bus.data) // 8
 
-        word.binstr   = ("x"*len(self.bus.data))
-        single.binstr = ("x")
+        # Values driven while the bus is idle
+        self._idle_data = BinaryValue(n_bits=len(self.bus.data), bigEndian=False)
+        self._idle_data.binstr = "x" * len(self.bus.data)
+        self._idle_single = BinaryValue(n_bits=1, bigEndian=False)
+        self._idle_single.binstr = "x"
 
         self.bus.valid <= 0
-        self.bus.data <= word
-        self.bus.startofpacket <= single
-        self.bus.endofpacket <= single
+        self.bus.data <= self._idle_data
+        self.bus.startofpacket <= self._idle_single
+        self.bus.endofpacket <= self._idle_single
 
         if self.use_empty:
-            empty = BinaryValue(n_bits=len(self.bus.empty), bigEndian=False)
-            empty.binstr  = ("x"*len(self.bus.empty))
-            self.bus.empty <= empty
+            self._idle_empty = BinaryValue(n_bits=len(self.bus.empty), bigEndian=False)
+            self._idle_empty.binstr = "x" * len(self.bus.empty)
+            self.bus.empty <= self._idle_empty
 
-        if hasattr(self.bus, 'channel'):
+        if self._has_channel:
             if len(self.bus.channel) > 128:
                 raise AttributeError(
                         "Avalon-ST interface specification defines channel width as 1-128. %d channel width is %d" %
@@ -661,9 +894,9 @@ class AvalonSTPkts(ValidatedBusDriver):
                 raise AttributeError(
                         "%s has maxChannel=%d, but can only support a maximum channel of (2**channel_width)-1=%d, channel_width=%d" %
                         (self.name,self.config['maxChannel'],maxChannel,len(self.bus.channel)))
-            channel = BinaryValue(n_bits=len(self.bus.channel), bigEndian=False)
-            channel.binstr = ("x"*len(self.bus.channel))
-            self.bus.channel <= channel
+            self._idle_channel = BinaryValue(n_bits=len(self.bus.channel), bigEndian=False)
+            self._idle_channel.binstr = "x" * len(self.bus.channel)
+            self.bus.channel <= self._idle_channel
 
     @coroutine
     def _wait_ready(self):
@@ -678,49 +911,66 @@ class AvalonSTPkts(ValidatedBusDriver):
             yield RisingEdge(self.clock)
             yield ReadOnly()
 
-    @coroutine
-    def _send_string(self, string, sync=True, channel=None):
-        """Args:
-            string (str): A string of bytes to send over the bus.
-            channel (int): Channel to send the data on.
-        """
-        # Avoid spurious object creation by recycling
-        clkedge = RisingEdge(self.clock)
-        firstword = True
+    def _beats(self, data):
+        """Split a packet into integer data words, one per bus cycle.
 
-        # FIXME busses that aren't integer numbers of bytes
-        bus_width = int(len(self.bus.data) / 8)
+        Args:
+            data: A bytes-like object.
 
-        word = BinaryValue(n_bits=len(self.bus.data),
-                           bigEndian=self.config['firstSymbolInHighOrderBits'])
+        Returns:
+            The list of words and the number of empty symbols in the last one.
+        """
+        view = memoryview(data)
+        width = self._bus_bytes
+        big_endian = self.config["firstSymbolInHighOrderBits"]
+        words = [int_from_bytes(view[i:i + width], big_endian)
+                 for i in range(0, len(view), width)]
+        empty = -len(view) % width
+        if empty and big_endian:
+            words[-1] <<= 8 * empty
+        return words, empty
+
+    def _packet_beats(self, string, sync, channel):
+        """Drive the beats of a packet, yielding what to wait for in between.
+
+        The last beat is left on the bus, the caller waits for the clock
+        edge which takes it.
+        """
+        clkedge = RisingEdge(self.clock)
+        bus = self.bus
 
-        single = BinaryValue(n_bits=1, bigEndian=False)
-        if self.use_empty:
-            empty = BinaryValue(n_bits=len(self.bus.empty), bigEndian=False)
+        words, empty = self._beats(string)
+        last = len(words) - 1
 
         # Drive some defaults since we don't know what state we're in
         if self.use_empty:
-            self.bus.empty <= 0
-        self.bus.startofpacket <= 0
-        self.bus.endofpacket <= 0
-        self.bus.valid <= 0
-        if hasattr(self.bus, 'error'):
-            self.bus.error <= 0
-
-        if hasattr(self.bus, 'channel'):
-            self.bus.channel <= 0
+            bus.empty <= 0
+        bus.startofpacket <= 0
+        bus.endofpacket <= 0
+        bus.valid <= 0
+        if self._has_error:
+            bus.error <= 0
+
+        if self._has_channel:
+            if channel is None:
+                bus.channel <= 0
+            elif channel > self.config['maxChannel'] or channel < 0:
+                raise TestError(
+                        "%s: Channel value %d is outside range 0-%d" %
+                        (self.name,channel,self.config['maxChannel']))
+            else:
+                bus.channel <= channel
         elif channel is not None:
             raise TestError("%s does not have a channel signal" % self.name)
 
-        while string:
-            if not firstword or (firstword and sync):
+        for beat, word in enumerate(words):
+            if beat or sync:
                 yield clkedge
 
             # Insert a gap where valid is low
             if not self.on:
-                self.bus.valid <= 0
-                for i in range(self.off):
-                    yield clkedge
+                bus.valid <= 0
+                yield self._wait_invalid()
 
                 # Grab the next set of on/off values
                 self._next_valids()
@@ -729,58 +979,49 @@ class AvalonSTPkts(ValidatedBusDriver):
             if self.on is not True and self.on:
                 self.on -= 1
 
-            self.bus.valid <= 1
-            if hasattr(self.bus, 'channel'):
-                if channel is None:
-                    self.bus.channel <= 0
-                elif channel > self.config['maxChannel'] or channel < 0:
-                    raise TestError(
-                            "%s: Channel value %d is outside range 0-%d" %
-                            (self.name,channel,self.config['maxChannel']))
-                else:
-                    self.bus.channel <= channel
+            bus.valid <= 1
 
-            if firstword:
-                self.bus.startofpacket <= 1
-                firstword = False
-            else:
-                self.bus.startofpacket <= 0
+            if beat == 0:
+                bus.startofpacket <= 1
+            elif beat == 1:
+                bus.startofpacket <= 0
 
-            nbytes = min(len(string), bus_width)
-            data = string[:nbytes]
-            word.buff = data
+            bus.data <= word
 
-            if len(string) <= bus_width:
-                self.bus.endofpacket <= 1
+            if beat == last:
+                bus.endofpacket <= 1
                 if self.use_empty:
-                    self.bus.empty <= bus_width - len(string)
-                string = ""
-            else:
-                string = string[bus_width:]
-
-            self.bus.data <= word
+                    bus.empty <= empty
 
             # If this is a bus with a ready signal, wait for this word to
             # be acknowledged
-            if hasattr(self.bus, "ready"):
+            if self._has_ready:
                 yield self._wait_ready()
 
-        yield clkedge
-        self.bus.valid <= 0
-        self.bus.endofpacket <= 0
-        word.binstr   = ("x"*len(self.bus.data))
-        single.binstr = ("x")
-        self.bus.data <= word
-        self.bus.startofpacket <= single
-        self.bus.endofpacket <= single
+    def _idle(self):
+        """Return the bus to idle after the last beat of a packet."""
+        bus = self.bus
+        bus.valid <= 0
+        bus.endofpacket <= 0
+        bus.data <= self._idle_data
+        bus.startofpacket <= self._idle_single
+        bus.endofpacket <= self._idle_single
 
         if self.use_empty:
-            empty.binstr  = ("x"*len(self.bus.empty))
-            self.bus.empty <= empty
-        if hasattr(self.bus, 'channel'):
-            channel_value = BinaryValue(n_bits=len(self.bus.channel), bigEndian=False)
-            channel_value.binstr = ("x"*len(self.bus.channel))
-            self.bus.channel <= channel_value
+            bus.empty <= self._idle_empty
+        if self._has_channel:
+            bus.channel <= self._idle_channel
+
+    @coroutine
+    def _send_string(self, string, sync=True, channel=None):
+        """Args:
+            string (bytes): A bytes-like object to send over the bus.
+            channel (int): Channel to send the data on.
+        """
+        for trigger in self._packet_beats(string, sync, channel):
+            yield trigger
+        yield RisingEdge(self.clock)
+        self._idle()
 
     @coroutine
     def _send_iterable(self, pkt, sync=True):
@@ -800,8 +1041,7 @@ class AvalonSTPkts(ValidatedBusDriver):
             # Insert a gap where valid is low
             if not self.on:
                 self.bus.valid <= 0
-                for i in range(self.off):
-                    yield clkedge
+                yield self._wait_invalid()
 
                 # Grab the next set of on/off values
                 self._next_valids()
@@ -817,7 +1057,7 @@ class AvalonSTPkts(ValidatedBusDriver):
 
             # Wait for valid words to be acknowledged
             if not hasattr(word, "valid") or word.valid:
-                if hasattr(self.bus, "ready"):
+                if self._has_ready:
                     yield self._wait_ready()
 
         yield clkedge
@@ -828,22 +1068,52 @@ class AvalonSTPkts(ValidatedBusDriver):
         """Send a packet over the bus.
 
         Args:
-            pkt (str or iterable): Packet to drive onto the bus.
+            pkt (bytes, str or iterable): Packet to drive onto the bus.
             channel (None or int): Channel attributed to the packet.
 
-        If ``pkt`` is a string, we simply send it word by word
+        If ``pkt`` is a ``bytes``, ``bytearray`` or ``memoryview``, we simply
+        send it word by word. A ``str`` is sent with one byte per character.
 
         If ``pkt`` is an iterable, it's assumed to yield objects with 
         attributes matching the signal names.
         """
 
-        # Avoid spurious object creation by recycling
-        if isinstance(pkt, str):
-            self.log.debug("Sending packet of length %d bytes" % len(pkt))
-            self.log.debug(hexdump(pkt))
+        if isinstance(pkt, type(u"")):
+            pkt = pkt.encode("latin-1")
+        if isinstance(pkt, (bytes, bytearray, memoryview)):
+            self.log.debug("Sending packet of length %d bytes", len(pkt))
+            self.log.debug("%s", LazyMessage(hexdump, pkt))
             yield self._send_string(pkt, sync=sync, channel=channel)
-            self.log.debug("Successfully sent packet of length %d bytes" % len(pkt))
+            self.log.debug("Successfully sent packet of length %d bytes", len(pkt))
         else:
             if channel is not None:
                 self.log.warning("%s is ignoring channel=%d because pkt is an iterable" % (self.name, channel))
             yield self._send_iterable(pkt, sync=sync)
+
+    @coroutine
+    def _driver_send_stream(self, transactions, sync=True, channel=None):
+        """Send the packets of a :meth:`~cocotb.drivers.Driver.send_stream`
+        back to back from this one coroutine.
+
+        ``bytes``-like packets are driven directly, other packets are sent
+        with :any:`_driver_send`.
+        """
+        clkedge = RisingEdge(self.clock)
+        # Whether the last beat of a packet is still on the bus
+        pending = False
+        for pkt in transactions:
+            if isinstance(pkt, type(u"")):
+                pkt = pkt.encode("latin-1")
+            if isinstance(pkt, (bytes, bytearray, memoryview)):
+                for trigger in self._packet_beats(pkt, sync, channel):
+                    yield trigger
+                yield clkedge
+                pending = True
+            else:
+                if pending:
+                    self._idle()
+                    pending = False
+                yield self._driver_send(pkt, sync=sync, channel=channel)
+            sync = False
+        if pending:
+            self._idle()
@@ -30,18 +30,70 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE. '''
 
 """
     Collection of generators for creating byte streams
+
+    The ``*_chunks`` generators yield whole ``bytes`` blocks rather than one
+    byte at a time, which is much faster for large payloads.
 """
+import itertools
 import random
+
+# NumPy produces random bytes fastest, random_chunks uses it on request
+try:
+    from numpy.random import default_rng as _numpy_rng
+except ImportError:
+    _numpy_rng = None
+
 from cocotb.decorators import public
+from cocotb.utils import get_python_integer_types, int_to_bytes
 
 
 @public
 def get_bytes(nbytes, generator):
-    """Get nbytes from generator"""
-    result = ""
-    for i in range(nbytes):
-        result += next(generator)
-    return result
+    """Get nbytes from generator
+
+    The items of *generator* are joined if they are strings, and converted
+    to ``bytes`` if they are ints.
+
+    Raises:
+        StopIteration: If *generator* runs out before *nbytes* items.
+    """
+    items = list(itertools.islice(generator, nbytes))
+    if len(items) < nbytes:
+        raise StopIteration()
+    if items and isinstance(items[0], get_python_integer_types()):
+        return bytes(bytearray(items))
+    return (items[0][:0] if items else "").join(items)
+
+
+def _sizes(sizes):
+    """Iterate over the sizes of the chunks to yield."""
+    if isinstance(sizes, get_python_integer_types()):
+        return itertools.repeat(sizes)
+    return iter(sizes)
+
+
+def _cycle_chunks(period, sizes):
+    """Yield chunks of the endlessly repeated bytes *period*."""
+    offset = 0
+    length = len(period)
+    block = b""
+    for size in _sizes(sizes):
+        if len(block) < length + size:
+            block = period * (size // length + 2)
+        yield block[offset:offset + size]
+        offset = (offset + size) % length
+
+
+def _random_chunks(rng, sizes):
+    """Yield chunks of bytes drawn from a :class:`random.Random`."""
+    for size in _sizes(sizes):
+        yield int_to_bytes(rng.getrandbits(8 * size), size) if size else b""
+
+
+def _numpy_chunks(rng, sizes):
+    """Yield chunks of bytes drawn from a NumPy generator."""
+    for size in _sizes(sizes):
+        yield rng.bytes(size)
 
 
 @public
@@ -67,3 +119,62 @@ def repeating_bytes(pattern="\x00"):
     while True:
         for byte in pattern:
             yield byte
+
+
+@public
+def random_chunks(sizes=4096, seed=None, numpy=False):
+    """Blocks of random bytes
+
+    Args:
+        sizes (int or iterable): The size of every block, or the sizes of
+            the blocks in turn.
+        seed (int, optional): Seed for the data, by default one is drawn
+            from the :mod:`random` module, which is seeded from
+            ``RANDOM_SEED``.
+        numpy (bool, optional): Generate the data with NumPy, which is
+            faster for large blocks but gives different data for the same
+            seed.
+
+    Raises:
+        ImportError: If *numpy* is ``True`` and NumPy is not installed.
+    """
+    if numpy and _numpy_rng is None:
+        raise ImportError("random_chunks(numpy=True) needs NumPy")
+    if seed is None:
+        seed = random.getrandbits(64)
+    if numpy:
+        return _numpy_chunks(_numpy_rng(seed), sizes)
+    return _random_chunks(random.Random(seed), sizes)
+
+
+@public
+def incrementing_chunks(sizes=4096, increment=1):
+    """Blocks of incrementing bytes, continuing from one block to the next
+
+    Args:
+        sizes (int or iterable): The size of every block, or the sizes of
+            the blocks in turn.
+        increment (int, optional): The difference between consecutive bytes.
+    """
+    period = bytes(bytearray((i * increment) & 0xFF for i in range(256)))
+    return _cycle_chunks(period, sizes)
+
+
+@public
+def repeating_chunks(pattern=b"\x00", sizes=4096):
+    """Blocks of a repeated pattern of bytes, continuing from one block to
+    the next
+
+    Args:
+        pattern (bytes): The pattern to repeat.
+        sizes (int or iterable): The size of every block, or the sizes of
+            the blocks in turn.
+
+    Raises:
+        ValueError: If *pattern* is empty.
+    """
+    if not isinstance(pattern, bytes):
+        pattern = bytes(bytearray(pattern))
+    if not pattern:
+        raise ValueError("Cannot repeat an empty pattern")
+    return _cycle_chunks(pattern, sizes)
@@ -31,10 +31,16 @@ Everything related to logging
 
 import os
 import sys
+import json
 import logging
-import inspect
+import threading
 
-from cocotb.utils import get_sim_time
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2
+
+from cocotb.utils import get_sim_time, simulator, _LOG_SIM_PRECISION
 
 import cocotb.ANSI as ANSI
 from pdb import set_trace
@@ -44,6 +50,14 @@ if "COCOTB_REDUCED_LOG_FMT" in os.environ:
 else:
     _suppress = False
 
+# The simulator can only be asked for the time from the thread which
+# imported cocotb, records logged by other threads carry no time
+_sim_thread = threading.current_thread().ident
+
+# Optional file the log records are written to as JSON lines
+_json_log_file = os.getenv("COCOTB_LOG_JSON")
+_json_handler = None
+
 # Column alignment
 _LEVEL_CHARS    = len("CRITICAL")  # noqa
 _RECORD_CHARS   = 35  # noqa
@@ -72,9 +86,141 @@ class SimBaseLog(logging.getLoggerClass()):
         self.filters = []
         self.propagate = False
         logging.__init__(name)
+        if _json_log_file:
+            self.addHandler(_get_json_handler())
         self.addHandler(hdlr)
         self.setLevel(logging.NOTSET)
 
+
+def _update_gpi_log_level():
+    """Push the effective level of the GPI logger down to the GPI, which
+    drops disabled messages before they reach Python."""
+    if simulator is not None:
+        simulator.log_level(logging.getLogger("cocotb.gpi").getEffectiveLevel())
+
+
+def _get_json_handler():
+    global _json_handler
+    if _json_handler is None:
+        _json_handler = SimJSONLogHandler(_json_log_file)
+    return _json_handler
+
+
+def flush_log_sink():
+    """Wait until all records queued for the JSON log file are written out.
+
+    Does nothing unless :envvar:`COCOTB_LOG_JSON` is set.
+    """
+    if _json_handler is not None:
+        _json_handler.flush()
+
+
+class SimJSONLogHandler(logging.Handler):
+    """Write log records to a file as JSON lines from a background thread.
+
+    The record is reduced to a tuple on the simulator thread and handed to a
+    writer thread through a bounded queue, so the simulator only blocks on
+    file I/O when the writer falls behind by more than *maxsize* records.
+
+    The first line of the file holds the simulator precision, every other
+    line is an object with the simulation time in steps (``null`` for records
+    logged by another thread than the simulator's), the wall-clock time,
+    logger name, level, source location and the formatted message.
+    Use :func:`render_json_log` to turn the file back into the usual
+    column format.
+
+    Args:
+        filename (str): The file to write to.
+        maxsize (int, optional): Number of records which can be queued
+            before logging blocks.
+    """
+    _FIELDS = ("sim_steps", "wall", "logger", "level", "file", "line", "func", "msg")
+
+    _FLUSH = object()
+    _CLOSE = object()
+
+    def __init__(self, filename, maxsize=10000):
+        logging.Handler.__init__(self)
+        self._file = open(filename, "w")
+        self._file.write(json.dumps({"precision": _LOG_SIM_PRECISION}) + "\n")
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, name="cocotb.log.json")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, record):
+        try:
+            # The message has to be built here, the arguments may change or
+            # need the simulator once we have returned
+            sim_steps = get_sim_time() if record.thread == _sim_thread else None
+            self._queue.put((sim_steps, record.created, record.name,
+                             record.levelname, record.filename, record.lineno,
+                             record.funcName, record.getMessage()))
+        except Exception:
+            self.handleError(record)
+
+    def _writer(self):
+        fields = self._FIELDS
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._FLUSH:
+                    self._file.flush()
+                elif item is self._CLOSE:
+                    self._file.close()
+                    return
+                else:
+                    self._file.write(json.dumps(dict(zip(fields, item)),
+                                                separators=(",", ":")) + "\n")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until the queued records have been written to the file."""
+        if not self._closed:
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+        logging.Handler.close(self)
+
+
+def render_json_log(filename, stream=None, colour=False):
+    """Render a log file written by :class:`SimJSONLogHandler` in the column
+    format of :class:`SimLogFormatter`.
+
+    Args:
+        filename (str): The JSON lines log file.
+        stream (file, optional): Where to write the text, defaults to stdout.
+        colour (bool, optional): Use ANSI colours.
+    """
+    if stream is None:
+        stream = sys.stdout
+    formatter = SimColourLogFormatter() if colour else SimLogFormatter()
+    with open(filename) as f:
+        header = json.loads(f.readline())
+        scale = 10.0 ** (header["precision"] + 9)
+        for line in f:
+            entry = json.loads(line)
+            sim_steps = entry["sim_steps"]
+            record = logging.makeLogRecord({
+                "name": entry["logger"],
+                "levelname": entry["level"],
+                "levelno": logging.getLevelName(entry["level"]),
+                "pathname": entry["file"],
+                "filename": entry["file"],
+                "lineno": entry["line"],
+                "funcName": entry["func"],
+                "msg": entry["msg"],
+                "created": entry["wall"],
+                "sim_time_ns": None if sim_steps is None else sim_steps * scale})
+            stream.write(formatter.format(record) + "\n")
+
 """ Need to play with this to get the path of the called back,
     construct our own makeRecord for this """
 
@@ -91,19 +237,25 @@ class SimLog(object):
 
     def _makeRecord(self, level, msg, args, extra=None):
         if self.logger.isEnabledFor(level):
-            frame = inspect.stack()[2]
-            info = inspect.getframeinfo(frame[0])
+            # Only look up the caller of the public logging method, walking
+            # the whole stack with inspect is far too slow to do per message
+            frame = sys._getframe(2)
+            code = frame.f_code
             record = self.logger.makeRecord(self._log_name,
                                             level,
-                                            info.filename,
-                                            info.lineno,
+                                            code.co_filename,
+                                            frame.f_lineno,
                                             msg,
                                             args,
                                             None,
-                                            info.function,
+                                            code.co_name,
                                             extra)
             self.logger.handle(record)
 
+    def setLevel(self, level):
+        self.logger.setLevel(level)
+        _update_gpi_log_level()
+
     def _willLog(self, level):
         """ This is for user from the C world
             it allows a check on if the message will
@@ -150,6 +302,33 @@ class SimLog(object):
         return getattr(self.logger, attribute)
 
 
+class LazyMessage(object):
+    """Defer building (part of) a log message until a record is emitted.
+
+    The function is only called when the message is actually formatted, so
+    expensive representations such as hexdumps cost nothing when the log
+    level filters the message out::
+
+        self.log.debug("Received:\n%s", LazyMessage(hexdump, pkt))
+
+    Args:
+        func (callable): Function returning the message text.
+        *args: Positional arguments for *func*.
+        **kwargs: Keyword arguments for *func*.
+    """
+    __slots__ = ("_func", "_args", "_kwargs")
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self):
+        return str(self._func(*self._args, **self._kwargs))
+
+    __repr__ = __str__
+
+
 class SimLogFormatter(logging.Formatter):
     """Log formatter to provide consistent log message handling."""
 
@@ -167,8 +346,14 @@ class SimLogFormatter(logging.Formatter):
         return string.rjust(chars)
 
     def _format(self, level, record, msg, coloured=False):
-        time_ns = get_sim_time('ns')
-        simtime = "%6.2fns" % (time_ns)
+        # Records read back from a log file carry their own timestamp
+        if hasattr(record, "sim_time_ns"):
+            time_ns = record.sim_time_ns
+        elif record.thread == _sim_thread:
+            time_ns = get_sim_time('ns')
+        else:
+            time_ns = None
+        simtime = "-" if time_ns is None else "%6.2fns" % (time_ns)
         prefix = simtime.rjust(11) + ' ' + level + ' '
         if not _suppress:
             prefix += self.ljust(record.name, _RECORD_CHARS) + \
@@ -212,7 +397,7 @@ class SimColourLogFormatter(SimLogFormatter):
         if record.args:
             msg = record.msg % record.args
         else:
-            msg = record.msg
+            msg = str(record.msg)
 
         # Need to colour each line in case coloring is applied in the message
         msg = '\n'.join([SimColourLogFormatter.loglevel2colour[record.levelno] % line for line in msg.split('\n')])
@@ -0,0 +1,263 @@
+"""
+Sparse memory model for memory-mapped bus models.
+
+The address space is split into pages which are only allocated when they
+are first written, so a model can cover a multi-GB address space while
+only paying for the regions a test touches. Unallocated pages read as the
+*fill* byte.
+"""
+
+from cocotb.utils import byte_view, int_from_bytes, int_to_bytes
+
+
+class SparseMemory(object):
+    """Byte addressable memory made of lazily allocated pages.
+
+    Several bus models can share one instance to emulate a multi-port
+    memory, and the test has back-door access through the same methods.
+
+    Args:
+        size (int, optional): Size of the address space in bytes, accesses
+            beyond it raise :any:`IndexError`. Defaults to ``None``, unbounded.
+        page_size (int, optional): Size of a page in bytes, a power of two.
+        fill (int, optional): Value of the bytes which were never written.
+
+    Example:
+
+    >>> mem = SparseMemory(size=1 << 32)
+    >>> mem.load(0x80000000, "firmware.bin")
+    >>> mem.write(0x10, b"\\x01\\x02\\x03\\x04", strobe=0b0101)
+    >>> mem.read_word(0x10, 4)
+    196609
+    """
+
+    def __init__(self, size=None, page_size=4096, fill=0):
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError("Page size must be a power of two, got %r" %
+                             page_size)
+        self.size = size
+        self.page_size = page_size
+        self.fill = fill
+        self._shift = page_size.bit_length() - 1
+        self._mask = page_size - 1
+        self._pages = {}
+        # Flags of the bytes written so far, for pages which were allocated
+        # by a write rather than loaded or mapped as a whole
+        self._written = {}
+        self._blank = bytes(bytearray([fill]) * page_size)
+        self._ones = b"\x01" * page_size
+
+    def __repr__(self):
+        return "%s(size=%r, page_size=%d, allocated=%d)" % (
+            self.__class__.__name__, self.size, self.page_size, self.allocated)
+
+    @property
+    def allocated(self):
+        """Number of bytes in allocated pages."""
+        return sum(len(page) for page in self._pages.values())
+
+    def _check(self, addr, n):
+        if addr < 0 or n < 0 or (self.size is not None and addr + n > self.size):
+            raise IndexError("Access of %d bytes at 0x%x is outside the memory "
+                             "of %r bytes" % (n, addr, self.size))
+
+    def _page(self, index):
+        page = self._pages.get(index)
+        if page is None:
+            page = self._pages[index] = memoryview(bytearray(self._blank))
+            self._written[index] = bytearray(self.page_size)
+        return page
+
+    def _mark(self, index, offset, length):
+        """Record that *length* bytes at *offset* in a page were written."""
+        flags = self._written.get(index)
+        if flags is not None:
+            flags[offset:offset + length] = self._ones[:length]
+
+    def _segments(self, addr, n):
+        """Split an access into ``(page index, offset, length, position)``
+        tuples, one per page."""
+        mask = self._mask
+        pos = 0
+        while pos < n:
+            offset = (addr + pos) & mask
+            length = min(self.page_size - offset, n - pos)
+            yield (addr + pos) >> self._shift, offset, length, pos
+            pos += length
+
+    def read(self, addr, n):
+        """Read *n* bytes from *addr*.
+
+        Returns:
+            ``bytes``
+
+        Raises:
+            :any:`IndexError`: If the access is outside the memory.
+        """
+        self._check(addr, n)
+        offset = addr & self._mask
+        if offset + n <= self.page_size:
+            page = self._pages.get(addr >> self._shift)
+            if page is None:
+                return self._blank[:n]
+            return page[offset:offset + n].tobytes()
+
+        result = bytearray(n)
+        view = memoryview(result)
+        for index, offset, length, pos in self._segments(addr, n):
+            page = self._pages.get(index)
+            if page is None:
+                view[pos:pos + length] = self._blank[:length]
+            else:
+                view[pos:pos + length] = page[offset:offset + length]
+        return bytes(result)
+
+    def write(self, addr, data, strobe=None):
+        """Write the bytes-like *data* to *addr*.
+
+        Args:
+            addr (int): Address of the first byte.
+            data: ``bytes``, ``bytearray``, ``memoryview`` or ``mmap`` to write.
+            strobe (int, optional): Only write the bytes of *data* whose bit
+                is set, bit 0 enabling the first byte. Defaults to ``None``,
+                writing every byte.
+
+        Raises:
+            :any:`IndexError`: If the access is outside the memory.
+        """
+        data = memoryview(data)
+        n = len(data)
+        self._check(addr, n)
+        if strobe is None:
+            for index, offset, length, pos in self._segments(addr, n):
+                self._page(index)[offset:offset + length] = data[pos:pos + length]
+                self._mark(index, offset, length)
+            return
+
+        # Write each run of enabled bytes at once
+        strobe &= (1 << n) - 1
+        while strobe:
+            start = (strobe & -strobe).bit_length() - 1
+            run = strobe >> start
+            length = (~run & (run + 1)).bit_length() - 1
+            self.write(addr + start, data[start:start + length])
+            strobe &= ~(((1 << length) - 1) << start)
+
+    def read_word(self, addr, size, big_endian=False):
+        """Read *size* bytes from *addr* as an unsigned integer."""
+        self._check(addr, size)
+        offset = addr & self._mask
+        page = self._pages.get(addr >> self._shift)
+        if page is not None and offset + size <= self.page_size:
+            return int_from_bytes(page[offset:offset + size], big_endian)
+        return int_from_bytes(self.read(addr, size), big_endian)
+
+    def write_word(self, addr, value, size, big_endian=False, strobe=None):
+        """Write the unsigned integer *value* as *size* bytes to *addr*.
+
+        *strobe* has one bit per byte of the word, as in :meth:`write`.
+        """
+        self.write(addr, int_to_bytes(value, size, big_endian), strobe)
+
+    def is_initialised(self, addr, n=1):
+        """Whether all the *n* bytes at *addr* were written, loaded, mapped
+        or handed out in a view."""
+        for index, offset, length, _ in self._segments(addr, n):
+            if index not in self._pages:
+                return False
+            flags = self._written.get(index)
+            if flags is not None and b"\x00" in flags[offset:offset + length]:
+                return False
+        return True
+
+    def view(self, addr, n):
+        """Return a writable ``memoryview`` of the *n* bytes at *addr*
+        without copying them, allocating the page if needed.
+
+        Raises:
+            :any:`ValueError`: If the bytes span more than one page, use
+                :meth:`views` for those.
+        """
+        self._check(addr, n)
+        offset = addr & self._mask
+        if offset + n > self.page_size:
+            raise ValueError("%d bytes at 0x%x span more than one page" %
+                             (n, addr))
+        index = addr >> self._shift
+        page = self._page(index)
+        self._mark(index, offset, n)
+        return page[offset:offset + n]
+
+    def views(self, addr, n):
+        """Iterate over writable ``memoryview`` objects covering the *n* bytes
+        at *addr*, one per page."""
+        self._check(addr, n)
+        for index, offset, length, _ in self._segments(addr, n):
+            page = self._page(index)
+            self._mark(index, offset, length)
+            yield page[offset:offset + length]
+
+    def load(self, addr, source):
+        """Copy the contents of a file or buffer to *addr*.
+
+        Files are read straight into the pages.
+
+        Args:
+            addr (int): Address of the first byte.
+            source: A file name, a file object opened in binary mode, or a
+                bytes-like object such as an ``mmap``.
+
+        Returns:
+            The number of bytes loaded.
+        """
+        if isinstance(source, (str, type(u""))):
+            with open(source, "rb") as f:
+                return self.load(addr, f)
+        if not hasattr(source, "readinto"):
+            self.write(addr, source)
+            return len(memoryview(source))
+
+        loaded = 0
+        while self.size is None or addr + loaded < self.size:
+            offset = (addr + loaded) & self._mask
+            length = self.page_size - offset
+            if self.size is not None:
+                length = min(length, self.size - addr - loaded)
+            page = self._page((addr + loaded) >> self._shift)
+            got = source.readinto(page[offset:offset + length])
+            if not got:
+                break
+            self._mark((addr + loaded) >> self._shift, offset, got)
+            loaded += got
+            if got < length:
+                break
+        return loaded
+
+    def map(self, addr, buffer):
+        """Use the writable *buffer* as the pages from *addr* on.
+
+        The memory then reads and writes the buffer in place, which gives
+        back-door access to it, e.g. to an ``array.array`` or an ``mmap``
+        of a file.
+
+        Args:
+            addr (int): A page aligned address.
+            buffer: A writable bytes-like object. Its length must be a
+                multiple of the page size unless it ends the memory.
+
+        Raises:
+            :any:`ValueError`: If *addr* or the length of *buffer* don't
+                fit the pages.
+        """
+        view = byte_view(buffer)
+        n = len(view)
+        self._check(addr, n)
+        if addr & self._mask:
+            raise ValueError("Address 0x%x is not page aligned" % addr)
+        if n & self._mask and addr + n != self.size:
+            raise ValueError("Mapping %d bytes at 0x%x would leave a partial "
+                             "page" % (n, addr))
+        for pos in range(0, n, self.page_size):
+            index = (addr + pos) >> self._shift
+            self._pages[index] = view[pos:pos + self.page_size]
+            self._written.pop(index, None)
@@ -34,21 +34,48 @@ the transactions.
 """
 
 import math
+import weakref
 from collections import deque
 
 import cocotb
 from cocotb.decorators import coroutine
-from cocotb.triggers import Edge, Event, RisingEdge, ReadOnly, Timer
+from cocotb.triggers import (Edge, Event, RisingEdge, ReadOnly, Timer,
+                             NextTimeStep)
 from cocotb.binary import BinaryValue
 from cocotb.bus import Bus
 from cocotb.log import SimLog
-from cocotb.result import ReturnValue
+from cocotb.result import ReturnValue, TestError
+from cocotb.utils import get_sim_time, get_time_from_sim_steps
 
 
 class MonitorStatistics(object):
     """Wrapper class for storing Monitor statistics"""
     def __init__(self):
         self.received_transactions = 0
+        self.dropped_transactions = 0
+        self.first_time = None
+        self.last_time = None
+
+    @property
+    def throughput(self):
+        """Transactions received per second of simulated time between the
+        first and the last one, ``None`` until there are two or if the
+        monitor doesn't record ``timestamps``."""
+        if self.received_transactions < 2 or self.last_time == self.first_time:
+            return None
+        span = get_time_from_sim_steps(self.last_time - self.first_time, "sec")
+        return (self.received_transactions - 1) / span
+
+    def properties(self):
+        """Return the statistics as a list of ``(name, value)`` pairs."""
+        return [("transactions", self.received_transactions),
+                ("dropped", self.dropped_transactions),
+                ("throughput", self.throughput)]
+
+
+def _observe():
+    for observer in list(Monitor._observers):
+        observer.observe()
 
 
 class Monitor(object):
@@ -72,15 +99,73 @@ class Monitor(object):
             be placed on a queue and the event used to notify any consumers.
         event (event): Object that supports a ``set`` method that will be called when
             a transaction is received through the internal :any:`_recv` method.
+        max_queue (int, optional): Maximum number of transactions held on the
+            queue when no callback is used. Defaults to ``None``, unbounded.
+        overflow (str, optional): What happens when a transaction is received
+            while the queue holds *max_queue* transactions:
+            ``"drop_oldest"`` (the default) discards the oldest one and counts
+            it in :attr:`MonitorStatistics.dropped_transactions`,
+            ``"error"`` raises :any:`TestError` and ``"block"`` makes the
+            producer yield :any:`_wait_for_space` before calling :any:`_recv`,
+            which is woken up by :meth:`pop`. A bus monitor can't stall the
+            bus, so ``"block"`` is only accepted by subclasses which set
+            :attr:`_can_block` and wait in their :any:`_monitor_recv`.
+        batch (optional): Deliver transactions to the callbacks as lists instead
+            of one at a time, either ``"timestep"`` to deliver everything
+            received during a time step at the start of the next one, or an
+            integer *N* to deliver every *N* transactions. :meth:`flush` delivers
+            the transactions of an incomplete batch. Defaults to ``None``.
+        timestamps (bool, optional): Record the sim time of the first and the
+            last received transaction in :attr:`stats`, from which
+            :attr:`MonitorStatistics.throughput` is derived. This reads the
+            sim time for every transaction, so it defaults to ``False``.
+
+    The :class:`MonitorStatistics` in :attr:`stats` are reported when the test
+    that created the monitor finishes.
     """
 
-    def __init__(self, callback=None, event=None):
+    # Monitors whose statistics are reported at the end of the test
+    _active = weakref.WeakSet()
+
+    overflow_policies = ("drop_oldest", "error", "block")
+
+    # Whether _monitor_recv yields _wait_for_space before each _recv
+    _can_block = False
+
+    # Objects whose observe() method is called after any monitor has passed
+    # transactions to its callbacks, which is where models append expected
+    # transactions, see Scoreboard
+    _observers = weakref.WeakSet()
+
+    def __init__(self, callback=None, event=None, max_queue=None,
+                 overflow="drop_oldest", batch=None, timestamps=False):
+        if overflow not in self.overflow_policies:
+            raise ValueError("Unknown overflow policy %r, expected one of %s" %
+                             (overflow, ", ".join(self.overflow_policies)))
+        if overflow == "block" and not self._can_block:
+            raise ValueError("%s does not wait for space on its queue, use "
+                             "another overflow policy" %
+                             self.__class__.__name__)
+        if batch is not None and batch != "timestep" and int(batch) < 1:
+            raise ValueError("Batch size must be positive, got %r" % batch)
         self._event = event
         self._wait_event = None
-        self._recvQ = deque()
+        self._max_queue = max_queue
+        self._overflow = overflow
+        if max_queue is not None and overflow == "drop_oldest":
+            self._recvQ = deque(maxlen=max_queue)
+        else:
+            self._recvQ = deque()
+        self._space_event = Event()
         self._callbacks = []
+        self.batch = batch
+        self._batched = []
+        self._batch_event = Event()
         self.stats = MonitorStatistics()
+        self.timestamps = timestamps
         self._wait_event = Event()
+        self._waiters = 0
+        Monitor._active.add(self)
 
         # Subclasses may already set up logging
         if not hasattr(self, "log"):
@@ -92,11 +177,18 @@ class Monitor(object):
         # Create an independent coroutine which can receive stuff
         self._thread = cocotb.scheduler.add(self._monitor_recv())
 
+        self._flusher = None
+        if batch == "timestep":
+            self._flusher = cocotb.scheduler.add(self._flush_each_timestep())
+
     def kill(self):
         """Kill the monitor coroutine."""
         if self._thread:
             self._thread.kill()
             self._thread = None
+        if self._flusher:
+            self._flusher.kill()
+            self._flusher = None
 
     def __len__(self):
         return len(self._recvQ)
@@ -104,6 +196,28 @@ class Monitor(object):
     def __getitem__(self, idx):
         return self._recvQ[idx]
 
+    def pop(self):
+        """Remove and return the oldest transaction on the queue.
+
+        Raises:
+            :any:`IndexError`: If the queue is empty.
+        """
+        transaction = self._recvQ.popleft()
+        self._space_event.set()
+        return transaction
+
+    def flush(self):
+        """Deliver the transactions of an incomplete batch to the callbacks."""
+        batch = self._batched
+        if not batch:
+            return
+        self._batched = []
+        for callback in self._callbacks:
+            callback(batch)
+        if Monitor._observers:
+            _observe()
+        self._notify(batch)
+
     def add_callback(self, callback):
         """Add function as a callback.
 
@@ -123,15 +237,20 @@ class Monitor(object):
             timeout (optional): The timeout value for :class:`~.triggers.Timer`.
                 Defaults to ``None``.
 
-        Returns: Data of received transaction.
+        Returns: Data of received transaction, or the list of transactions
+            delivered together when :attr:`batch` is set.
         """
-        if timeout:
-            t = Timer(timeout)
-            fired = yield [self._wait_event.wait(), t]
-            if fired is t:
-                raise ReturnValue(None)
-        else:
-            yield self._wait_event.wait()
+        self._waiters += 1
+        try:
+            if timeout:
+                t = Timer(timeout)
+                fired = yield [self._wait_event.wait(), t]
+                if fired is t:
+                    raise ReturnValue(None)
+            else:
+                yield self._wait_event.wait()
+        finally:
+            self._waiters -= 1
 
         pkt = self._wait_event.data
         raise ReturnValue(pkt)
@@ -146,25 +265,74 @@ class Monitor(object):
         raise NotImplementedError("Attempt to use base monitor class without "
                                   "providing a ``_monitor_recv`` method")
 
+    @coroutine
+    def _wait_for_space(self):
+        """Block until the queue has room for another transaction.
+
+        Producers of a monitor with the ``"block"`` overflow policy yield this
+        before calling :any:`_recv`.
+        """
+        while (self._max_queue is not None and
+               len(self._recvQ) >= self._max_queue):
+            self._space_event.clear()
+            yield self._space_event.wait()
+
+    @coroutine
+    def _flush_each_timestep(self):
+        """Deliver the transactions batched during a time step."""
+        while True:
+            yield self._batch_event.wait()
+            self._batch_event.clear()
+            yield NextTimeStep()
+            self.flush()
+
     def _recv(self, transaction):
         """Common handling of a received transaction."""
 
-        self.stats.received_transactions += 1
+        stats = self.stats
+        stats.received_transactions += 1
+        if self.timestamps:
+            stats.last_time = get_sim_time()
+            if stats.first_time is None:
+                stats.first_time = stats.last_time
 
         # either callback based consumer
-        for callback in self._callbacks:
-            callback(transaction)
+        if self._callbacks:
+            if self.batch is None:
+                for callback in self._callbacks:
+                    callback(transaction)
+                if Monitor._observers:
+                    _observe()
+            else:
+                batch = self._batched
+                batch.append(transaction)
+                if self.batch == "timestep":
+                    if len(batch) == 1:
+                        self._batch_event.set()
+                elif len(batch) >= self.batch:
+                    self.flush()
+                return
 
         # Or queued with a notification
-        if not self._callbacks:
-            self._recvQ.append(transaction)
-
+        else:
+            queue = self._recvQ
+            if self._max_queue is not None and len(queue) >= self._max_queue:
+                if self._overflow == "drop_oldest":
+                    stats.dropped_transactions += 1
+                else:
+                    raise TestError("%s received a transaction with %d already "
+                                    "queued" % (str(self), len(queue)))
+            queue.append(transaction)
+
+        self._notify(transaction)
+
+    def _notify(self, data):
         if self._event is not None:
             self._event.set()
 
         # If anyone was waiting then let them know
-        if self._wait_event is not None:
-            self._wait_event.set(data=transaction)
+        if self._waiters:
+            self._wait_event.set(data=data)
             self._wait_event.clear()
 
 
@@ -174,7 +342,9 @@ class BusMonitor(Monitor):
     _optional_signals = []
 
     def __init__(self, entity, name, clock, reset=None, reset_n=None,
-                 callback=None, event=None, bus_separator="_", array_idx=None):
+                 callback=None, event=None, bus_separator="_", array_idx=None,
+                 max_queue=None, overflow="drop_oldest", batch=None,
+                 timestamps=False):
         self.log = SimLog("cocotb.%s.%s" % (entity._name, name))
         self.entity = entity
         self.name = name
@@ -184,7 +354,9 @@ class BusMonitor(Monitor):
                        bus_separator=bus_separator,array_idx=array_idx)
         self._reset = reset
         self._reset_n = reset_n
-        Monitor.__init__(self, callback=callback, event=event)
+        Monitor.__init__(self, callback=callback, event=event,
+                         max_queue=max_queue, overflow=overflow, batch=batch,
+                         timestamps=timestamps)
 
     @property
     def in_reset(self):
@@ -32,7 +32,8 @@ See https://www.intel.com/content/dam/www/programmable/us/en/pdfs/literature/man
 NB Currently we only support a very small subset of functionality.
 """
 
-from cocotb.utils import hexdump
+from cocotb.utils import hexdump, int_to_bytes
+from cocotb.log import LazyMessage
 from cocotb.decorators import coroutine
 from cocotb.monitors import BusMonitor
 from cocotb.triggers import RisingEdge, ReadOnly
@@ -89,7 +90,12 @@ class AvalonST(BusMonitor):
 
 
 class AvalonSTPkts(BusMonitor):
-    """Packetised Avalon-ST bus."""
+    """Packetised Avalon-ST bus.
+
+    Each packet is a ``bytes`` transaction, or a ``memoryview`` of a buffer
+    owned by the transaction if the monitor is created with
+    ``zero_copy=True``.
+    """
     
     _signals = ["valid", "data", "startofpacket", "endofpacket"]
     _optional_signals = ["error", "channel", "ready", "empty"]
@@ -104,9 +110,11 @@ class AvalonSTPkts(BusMonitor):
 
     def __init__(self, *args, **kwargs):
         config = kwargs.pop('config', {})
+        self.zero_copy = kwargs.pop('zero_copy', False)
         BusMonitor.__init__(self, *args, **kwargs)
 
         self.config = self._default_config.copy()
+        self._data_bits = len(self.bus.data)
 
         # Set default config maxChannel to max value on channel bus
         if hasattr(self.bus, 'channel'):
@@ -141,6 +149,25 @@ class AvalonSTPkts(BusMonitor):
                         "%s has maxChannel=%d, but can only support a maximum channel of (2**channel_width)-1=%d, channel_width=%d" %
                         (self.name,self.config['maxChannel'],maxChannel,len(self.bus.channel)))
 
+    def _last_word(self, value, empty_bits, big_endian):
+        """Return the integer value of the symbols of an end-of-packet beat
+        which aren't empty."""
+        try:
+            word = value.integer
+        except ValueError:
+            # X's are allowed in the empty symbols
+            binstr = value.binstr
+            if big_endian:
+                vec = BinaryValue(binstr[:len(binstr) - empty_bits])
+            else:
+                vec = BinaryValue(binstr[empty_bits:])
+            if not vec.is_resolvable:
+                raise AvalonProtocolError("After empty masking value is still bad?  Had empty {:d}, got value {:s}".format(empty_bits, binstr))
+            return vec.integer
+        if big_endian:
+            return word >> empty_bits
+        return word & ((1 << (self._data_bits - empty_bits)) - 1)
+
     @coroutine
     def _monitor_recv(self):
         """Watch the pins and reconstruct transactions."""
@@ -148,16 +175,20 @@ class AvalonSTPkts(BusMonitor):
         # Avoid spurious object creation by recycling
         clkedge = RisingEdge(self.clock)
         rdonly = ReadOnly()
-        pkt = ""
+        bus = self.bus
+        has_ready = hasattr(bus, "ready")
+        has_channel = hasattr(bus, "channel")
+        use_empty = self.config["useEmpty"]
+        bus_bytes = self._data_bits // 8
+
+        # Beats are written into a buffer which only grows for packets
+        # larger than any seen so far
+        buff = bytearray(64 * bus_bytes)
+        length = 0
         in_pkt = False
         invalid_cyclecount = 0
         channel = None
 
-        def valid():
-            if hasattr(self.bus, 'ready'):
-                return self.bus.valid.value and self.bus.ready.value
-            return self.bus.valid.value
-
         while True:
             yield clkedge
             yield rdonly
@@ -165,54 +196,63 @@ class AvalonSTPkts(BusMonitor):
             if self.in_reset:
                 continue
 
-            if valid():
+            if bus.valid.value and (not has_ready or bus.ready.value):
                 invalid_cyclecount = 0
 
-                if self.bus.startofpacket.value:
-                    if pkt:
+                if bus.startofpacket.value:
+                    if length:
                         raise AvalonProtocolError(
                             "Duplicate start-of-packet received on %s" % (
-                                str(self.bus.startofpacket)))
-                    pkt = ""
+                                str(bus.startofpacket)))
                     in_pkt = True
 
                 if not in_pkt:
                     raise AvalonProtocolError("Data transfer outside of "
                                               "packet")
 
+                # The config may be changed between packets
+                big_endian = self.config["firstSymbolInHighOrderBits"]
+                endofpacket = bus.endofpacket.value
+
                 # Handle empty and X's in empty / data
-                vec = BinaryValue()
-                if not self.bus.endofpacket.value:
-                    vec = self.bus.data.value
+                if not endofpacket:
+                    word = bus.data.value.integer
+                    nbytes = bus_bytes
                 else:
-                    value = self.bus.data.value.get_binstr()
-                    if self.config["useEmpty"] and self.bus.empty.value.integer:
-                        empty = self.bus.empty.value.integer * self.config["dataBitsPerSymbol"]
-                        if self.config["firstSymbolInHighOrderBits"]:
-                            value = value[:-empty]
-                        else:
-                            value = value[empty:]
-                    vec.assign(value)
-                    if not vec.is_resolvable:
-                        raise AvalonProtocolError("After empty masking value is still bad?  Had empty {:d}, got value {:s}".format(empty, self.bus.data.value.get_binstr()))
-
-                vec.big_endian = self.config['firstSymbolInHighOrderBits']
-                pkt += vec.buff
-
-                if hasattr(self.bus, 'channel'):
+                    empty_bits = 0
+                    if use_empty:
+                        empty_bits = (bus.empty.value.integer *
+                                      self.config["dataBitsPerSymbol"])
+                    word = self._last_word(bus.data.value, empty_bits,
+                                           big_endian)
+                    nbytes = (self._data_bits - empty_bits) // 8
+
+                if length + nbytes > len(buff):
+                    buff.extend(bytearray(len(buff)))
+                buff[length:length + nbytes] = int_to_bytes(word, nbytes,
+                                                            big_endian)
+                length += nbytes
+
+                if has_channel:
+                    value = bus.channel.value.integer
                     if channel is None:
-                        channel = self.bus.channel.value.integer
+                        channel = value
                         if channel > self.config["maxChannel"]:
                             raise AvalonProtocolError("Channel value (%d) is greater than maxChannel (%d)" % (channel,self.config["maxChannel"]))
-                    elif self.bus.channel.value.integer != channel:
+                    elif value != channel:
                         raise AvalonProtocolError("Channel value changed during packet")
 
-                if self.bus.endofpacket.value:
-                    self.log.info("Received a packet of %d bytes" % len(pkt))
-                    self.log.debug(hexdump(str((pkt))))
+                if endofpacket:
+                    if self.zero_copy:
+                        pkt = memoryview(buff)[:length]
+                        buff = bytearray(len(buff))
+                    else:
+                        pkt = memoryview(buff)[:length].tobytes()
+                    self.log.info("Received a packet of %d bytes", length)
+                    self.log.debug("%s", LazyMessage(hexdump, pkt))
                     self.channel = channel
                     self._recv(pkt)
-                    pkt = ""
+                    length = 0
                     in_pkt = False
                     channel = None
             else :
@@ -237,6 +277,6 @@ class AvalonSTPktsWithChannel(AvalonSTPkts):
         """Force use of channel in recv function.
 
         Args:
-            pkt: (string) Monitored data.
+            pkt: (bytes) Monitored data.
         """
         AvalonSTPkts._recv(self,{"data":pkt,"channel":self.channel})
@@ -25,7 +25,7 @@
 
 """Monitor for XGMII (10 Gigabit Media Independent Interface)."""
 
-# By default cast to scapy packets, otherwise we pass the string of bytes
+# Received frames can be decoded by scapy on demand
 try:
     from scapy.all import Ether
     _have_scapy = True
@@ -33,18 +33,82 @@ except ImportError:
     _have_scapy = False
 
 import struct
+import sys
 import zlib
 
 import cocotb
 from cocotb.utils import hexdump
+from cocotb.log import LazyMessage
 from cocotb.monitors import Monitor
-from cocotb.triggers import RisingEdge, ReadOnly
+from cocotb.triggers import RisingEdge
+from cocotb.xgmii import XGMIICodec, PREAMBLE_SFD, XGMII_TERMINATE
 
-_XGMII_IDLE      = "\x07"  # noqa
-_XGMII_START     = "\xFB"  # noqa
-_XGMII_TERMINATE = "\xFD"  # noqa
+_TERMINATE = bytearray([XGMII_TERMINATE])
 
-_PREAMBLE_SFD = "\x55\x55\x55\x55\x55\x55\xD5"
+
+class LazyEther(object):
+    """A received Ethernet frame which is only decoded by scapy when one of
+    its attributes or layers is first accessed.
+
+    It compares equal to anything with the same ``bytes()``, e.g. the scapy
+    packet that was sent, without being decoded.
+    """
+    __slots__ = ("raw", "_packet")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._packet = None
+
+    @property
+    def packet(self):
+        """The scapy ``Ether`` packet, decoded on first use."""
+        if self._packet is None:
+            self._packet = Ether(self.raw)
+        return self._packet
+
+    def __getattr__(self, name):
+        # Private and special names, e.g. those looked up by copy and
+        # pickle before the slots are set, are never the packet's
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.packet, name)
+
+    def __getstate__(self):
+        return self.raw
+
+    def __setstate__(self, raw):
+        self.raw = raw
+        self._packet = None
+
+    def __getitem__(self, layer):
+        return self.packet[layer]
+
+    def __contains__(self, layer):
+        return layer in self.packet
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __bytes__(self):
+        return self.raw
+
+    if sys.version_info[0] < 3:
+        __str__ = __bytes__
+
+    def __eq__(self, other):
+        if isinstance(other, LazyEther):
+            other = other.raw
+        elif isinstance(other, (bytearray, memoryview)):
+            other = memoryview(other).tobytes()
+        return self.raw == bytes(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.raw)
 
 
 class XGMII(Monitor):
@@ -53,16 +117,23 @@ class XGMII(Monitor):
     Assumes a single vector, either 4 or 8 bytes plus control bit for each byte.
 
     If interleaved is true then the control bits are adjacent to the bytes.
+
+    Received frames are passed on as ``bytes`` without the preamble, SFD
+    and FCS. With *decode* they are wrapped in a :class:`LazyEther`, which
+    scapy only parses when the frame is inspected, so checking the FCS is
+    the only work done for every frame.
     """
 
     def __init__(self, signal, clock, interleaved=True, callback=None,
-                 event=None):
+                 event=None, decode=False):
         """Args:
             signal (SimHandle): The XGMII data bus.
             clock (SimHandle): The associated clock (assumed to be
                 driven by another coroutine).
             interleaved (bool, optional): Whether control bits are interleaved
                 with the data bytes or not.
+            decode (bool, optional): Pass on frames as :class:`LazyEther`
+                objects. Needs scapy.
 
         If interleaved the bus is
             byte0, byte0_control, byte1, byte1_control, ...
@@ -73,101 +144,75 @@ class XGMII(Monitor):
         self.log = signal._log
         self.clock = clock
         self.signal = signal
-        self.bytes = len(self.signal) / 9
+        self.bytes = len(self.signal) // 9
         self.interleaved = interleaved
+        if decode and not _have_scapy:
+            raise ImportError("Decoding XGMII frames needs scapy")
+        self.decode = decode
+        self.codec = XGMIICodec(self.bytes, interleaved=interleaved)
         Monitor.__init__(self, callback=callback, event=event)
 
-    def _get_bytes(self):
-        """Take a value and extract the individual bytes / ctrl bits.
-
-        Returns a tuple of lists.
-        """
-        value = self.signal.value.integer
-        bytes = []
-        ctrls = []
-        byte_shift = 8
-        ctrl_base = 8 * self.bytes
-        ctrl_inc = 1
-        if self.interleaved:
-            byte_shift += 1
-            ctrl_base = 8
-            ctrl_inc = 9
-
-        for i in range(self.bytes):
-            bytes.append(chr((value >> (i * byte_shift)) & 0xff))
-            ctrls.append(bool(value & (1 << ctrl_base)))
-            ctrl_base += ctrl_inc
-
-        return ctrls, bytes
-
-    def _add_payload(self, ctrl, bytes):
-        """Take the payload and return true if more to come"""
-        for index, byte in enumerate(bytes):
-            if ctrl[index]:
-                if byte != _XGMII_TERMINATE:
-                    self.log.error("Got control character in XGMII payload")
-                    self.log.info("data = :" +
-                                  " ".join(["%02X" % ord(b) for b in bytes]))
-                    self.log.info("ctrl = :" +
-                                  " ".join(["%s" % str(c) for c in ctrl]))
-                    self._pkt = ""
-                return False
-
-            self._pkt += byte
-        return True
-
     @cocotb.coroutine
     def _monitor_recv(self):
         clk = RisingEdge(self.clock)
-        self._pkt = ""
+        codec = self.codec
+        idle = codec.idle
+        pkt = bytearray()
 
         while True:
             yield clk
-            ctrl, bytes = self._get_bytes()
-
-            if ctrl[0] and bytes[0] == _XGMII_START:
-
-                ctrl, bytes = ctrl[1:], bytes[1:]
-
-                while self._add_payload(ctrl, bytes):
-                    yield clk
-                    ctrl, bytes = self._get_bytes()
-
-            if self._pkt:
-
-                self.log.debug("Received:\n%s" % (hexdump(self._pkt)))
-
-                if len(self._pkt) < 64 + 7:
-                    self.log.error("Received a runt frame!")
-                if len(self._pkt) < 12:
-                    self.log.error("No data to extract")
-                    self._pkt = ""
-                    continue
-
-                preamble_sfd = self._pkt[0:7]
-                crc32 = self._pkt[-4:]
-                payload = self._pkt[7:-4]
-
-                if preamble_sfd != _PREAMBLE_SFD:
-                    self.log.error("Got a frame with unknown preamble/SFD")
-                    self.log.error(hexdump(preamble_sfd))
-                    self._pkt = ""
-                    continue
-
-                expected_crc = struct.pack("<I",
-                                           (zlib.crc32(payload) & 0xFFFFFFFF))
-
-                if crc32 != expected_crc:
-                    self.log.error("Incorrect CRC on received packet")
-                    self.log.info("Expected: %s" % (hexdump(expected_crc)))
-                    self.log.info("Received: %s" % (hexdump(crc32)))
-
-                # Use scapy to decode the packet
-                if _have_scapy:
-                    p = Ether(payload)
-                    self.log.debug("Received decoded packet:\n%s" % p.show2())
-                else:
-                    p = payload
-
-                self._recv(p)
-                self._pkt = ""
+            value = self.signal.value.integer
+            if value == idle or not codec.is_start(value):
+                continue
+
+            # Collect whole words of data up to the first control character
+            data, ctrl = codec.decode(value)
+            first = 1
+            ctrl &= ~1
+            while not ctrl:
+                pkt += data[first:]
+                yield clk
+                data, ctrl = codec.decode(self.signal.value.integer)
+                first = 0
+
+            lane = (ctrl & -ctrl).bit_length() - 1
+            pkt += data[first:lane]
+            if data[lane:lane + 1] != _TERMINATE:
+                self.log.error("Got control character in XGMII payload")
+                self.log.info("data = : %s", LazyMessage(hexdump, data))
+                self.log.info("ctrl = : 0x%x", ctrl)
+                pkt = bytearray()
+                continue
+
+            self.log.debug("Received:\n%s", LazyMessage(hexdump, pkt))
+
+            if len(pkt) < 64 + 7:
+                self.log.error("Received a runt frame!")
+            if len(pkt) < 12:
+                self.log.error("No data to extract")
+                pkt = bytearray()
+                continue
+
+            view = memoryview(pkt)
+            preamble_sfd = view[0:7].tobytes()
+            crc32 = view[-4:].tobytes()
+            payload = view[7:-4].tobytes()
+            pkt = bytearray()
+
+            if preamble_sfd != PREAMBLE_SFD:
+                self.log.error("Got a frame with unknown preamble/SFD")
+                self.log.error(hexdump(preamble_sfd))
+                continue
+
+            expected_crc = struct.pack("<I",
+                                       (zlib.crc32(payload) & 0xFFFFFFFF))
+
+            if crc32 != expected_crc:
+                self.log.error("Incorrect CRC on received packet")
+                self.log.info("Expected: %s", LazyMessage(hexdump, expected_crc))
+                self.log.info("Received: %s", LazyMessage(hexdump, crc32))
+
+            if self.decode:
+                self._recv(LazyEther(payload))
+            else:
+                self._recv(payload)
@@ -0,0 +1,311 @@
+"""
+Recording of the transactions seen by monitors and drivers, and replay of a
+recording through a driver.
+
+A recording starts with a header holding the simulator precision and the
+simulation time at which it was started. Each record is a fixed-size
+header followed by the serialised transaction::
+
+    sim time in steps (uint64), channel (uint16), kind (uint8), length (uint32)
+
+Byte strings are stored as they are, text as UTF-8 and anything else is
+pickled. Every monitor or driver being recorded is a channel, whose name
+is stored in a record of its own the first time it is used.
+"""
+
+import mmap
+import pickle
+import struct
+import threading
+import weakref
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2
+
+import cocotb
+from cocotb.decorators import coroutine
+from cocotb.drivers import _TransactionStream
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time, _LOG_SIM_PRECISION
+
+_MAGIC = b"COCOTBTR"
+_VERSION = 1
+_FILE_HEADER = struct.Struct("<8sBbQ")
+_RECORD_HEADER = struct.Struct("<QHBI")
+
+_KIND_NAME = 0
+_KIND_BYTES = 1
+_KIND_TEXT = 2
+_KIND_PICKLE = 3
+
+
+def _encode(transaction):
+    """Return the kind and serialised form of *transaction*."""
+    if isinstance(transaction, bytes):
+        return _KIND_BYTES, transaction
+    if isinstance(transaction, (bytearray, memoryview)):
+        return _KIND_BYTES, memoryview(transaction).tobytes()
+    if isinstance(transaction, type(u"")):
+        return _KIND_TEXT, transaction.encode("utf-8")
+    return _KIND_PICKLE, pickle.dumps(transaction, 2)
+
+
+def _decode(kind, data):
+    if kind == _KIND_BYTES:
+        return data
+    if kind == _KIND_TEXT:
+        return data.decode("utf-8")
+    return pickle.loads(data)
+
+
+class TransactionRecorder(object):
+    """Stream the transactions of monitors and drivers to a file.
+
+    Transactions are serialised when they are seen, packed into chunks of
+    *chunk* records and written by a background thread, so the simulator
+    only blocks on file I/O when the writer falls behind by more than
+    *maxsize* chunks.
+
+    Args:
+        filename (str): The file to write to.
+        chunk (int, optional): Number of records handed to the writer at once.
+        maxsize (int, optional): Number of chunks which can be queued
+            before recording blocks.
+
+    Example:
+
+    >>> recorder = TransactionRecorder("soak.rec")
+    >>> recorder.record_monitor(monitor)
+    >>> recorder.record_driver(driver, name="stimulus")
+    ... # at the end of the test
+    >>> recorder.close()
+
+    Recorders which are still open are flushed when each test finishes and
+    closed when the regression ends.
+    """
+
+    _FLUSH = object()
+    _CLOSE = object()
+
+    # Recorders which haven't been closed yet
+    _open = weakref.WeakSet()
+
+    def __init__(self, filename, chunk=256, maxsize=64):
+        self._file = open(filename, "wb")
+        self._file.write(_FILE_HEADER.pack(_MAGIC, _VERSION, _LOG_SIM_PRECISION,
+                                           get_sim_time()))
+        self._chunk = chunk
+        self._records = []
+        self._channels = {}
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer,
+                                        name="cocotb.recording")
+        self._thread.daemon = True
+        self._thread.start()
+        TransactionRecorder._open.add(self)
+
+    def _channel(self, name):
+        try:
+            return self._channels[name]
+        except KeyError:
+            channel = self._channels[name] = len(self._channels)
+            data = name.encode("utf-8")
+            self._records.append(_RECORD_HEADER.pack(0, channel, _KIND_NAME,
+                                                     len(data)) + data)
+            return channel
+
+    def record(self, name, transaction):
+        """Record *transaction* on the channel *name* at the current time."""
+        if self._closed:
+            raise RuntimeError("Recording to a closed TransactionRecorder")
+        channel = self._channel(name)
+        kind, data = _encode(transaction)
+        records = self._records
+        records.append(_RECORD_HEADER.pack(get_sim_time(), channel, kind,
+                                           len(data)))
+        records.append(data)
+        if len(records) >= 2 * self._chunk:
+            self._queue.put(b"".join(records))
+            self._records = []
+
+    def record_monitor(self, monitor, name=None):
+        """Record every transaction passed to the :any:`_recv` method of
+        *monitor*.
+
+        Args:
+            monitor (Monitor): The monitor to record.
+            name (str, optional): The channel name, defaults to ``str(monitor)``.
+        """
+        if name is None:
+            name = str(monitor)
+        recv = monitor._recv
+
+        def _recv(transaction):
+            self.record(name, transaction)
+            recv(transaction)
+        monitor._recv = _recv
+
+    def record_driver(self, driver, name=None):
+        """Record every transaction *driver* starts to send, at the time it
+        starts, including those of a :meth:`~cocotb.drivers.Driver.send_stream`.
+        Additional arguments to :meth:`~cocotb.drivers.Driver.append`
+        are not recorded.
+
+        Args:
+            driver (Driver): The driver to record.
+            name (str, optional): The channel name, defaults to ``str(driver)``.
+        """
+        if name is None:
+            name = str(driver)
+        send = driver._send
+
+        @coroutine
+        def _send(transaction, callback, event, sync=True, **kwargs):
+            if isinstance(transaction, _TransactionStream):
+                transaction.taps.append(lambda item: self.record(name, item))
+            else:
+                self.record(name, transaction)
+            yield send(transaction, callback, event, sync=sync, **kwargs)
+        driver._send = _send
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._FLUSH:
+                    self._file.flush()
+                elif item is self._CLOSE:
+                    self._file.close()
+                    return
+                else:
+                    self._file.write(item)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until the recorded transactions have been written to the file."""
+        if not self._closed:
+            if self._records:
+                self._queue.put(b"".join(self._records))
+                self._records = []
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+    def close(self):
+        """Write the remaining transactions and close the file."""
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+            TransactionRecorder._open.discard(self)
+
+
+class TransactionReader(object):
+    """Iterate over the records of a file written by :class:`TransactionRecorder`.
+
+    The file is mapped into memory and each transaction is only decoded
+    when the iteration reaches it. Iterating yields ``(sim_steps, channel,
+    transaction)`` tuples with the time of the recording in steps of the
+    current simulator precision.
+
+    Args:
+        filename (str): The recording.
+        channel (str, optional): Only yield the records of this channel.
+
+    Raises:
+        :any:`ValueError`: If the file isn't a recording.
+    """
+
+    def __init__(self, filename, channel=None):
+        self.filename = filename
+        self.channel = channel
+        with open(filename, "rb") as f:
+            header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError("%s is not a transaction recording" % filename)
+        magic, version, precision, start = _FILE_HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("%s is not a transaction recording" % filename)
+        self.precision = precision
+        self.start_time = self._to_steps(start)
+
+    def _to_steps(self, steps):
+        if self.precision == _LOG_SIM_PRECISION:
+            return steps
+        return int(round(steps * 10.0 ** (self.precision - _LOG_SIM_PRECISION)))
+
+    def __iter__(self):
+        with open(self.filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            names = {}
+            offset = _FILE_HEADER.size
+            size = len(mapped)
+            unpack_from = _RECORD_HEADER.unpack_from
+            header_size = _RECORD_HEADER.size
+            while offset + header_size <= size:
+                steps, channel, kind, length = unpack_from(mapped, offset)
+                offset += header_size
+                start, offset = offset, offset + length
+                if kind == _KIND_NAME:
+                    names[channel] = mapped[start:offset].decode("utf-8")
+                    continue
+                name = names[channel]
+                if self.channel is not None and name != self.channel:
+                    continue
+                yield (self._to_steps(steps), name,
+                       _decode(kind, mapped[start:offset]))
+        finally:
+            mapped.close()
+
+
+class ReplayDriver(object):
+    """Feed the transactions of a recording to a driver at the times they
+    were recorded.
+
+    Times are relative to the start of the recording, the first transaction
+    recorded 100ns after the :class:`TransactionRecorder` was created is
+    appended 100ns after :meth:`start` was called.
+
+    Args:
+        driver (Driver): The driver to :meth:`~cocotb.drivers.Driver.append`
+            the transactions to.
+        filename (str): The recording.
+        channel (str, optional): Only replay this channel, by default
+            every channel in the file is replayed.
+    """
+
+    def __init__(self, driver, filename, channel=None):
+        self.driver = driver
+        self.reader = TransactionReader(filename, channel=channel)
+        self._thread = None
+
+    def start(self):
+        """Start the replay.
+
+        Returns:
+            The forked coroutine, which can be joined to wait for the last
+            transaction to be appended.
+        """
+        self._thread = cocotb.fork(self._replay())
+        return self._thread
+
+    def stop(self):
+        """Stop the replay."""
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+
+    @coroutine
+    def _replay(self):
+        offset = get_sim_time() - self.reader.start_time
+        append = self.driver.append
+        for steps, _, transaction in self.reader:
+            delay = steps + offset - get_sim_time()
+            if delay > 0:
+                yield Timer(delay)
+            append(transaction)
@@ -28,6 +28,7 @@
 """All things relating to regression capabilities."""
 
 import time
+import json
 import logging
 import inspect
 from itertools import product
@@ -53,9 +54,9 @@ if "COVERAGE" in os.environ:
 
 import cocotb
 import cocotb.ANSI as ANSI
-from cocotb.log import SimLog
+from cocotb.log import SimLog, flush_log_sink
 from cocotb.result import TestError, TestFailure, TestSuccess, SimFailure
-from cocotb.utils import get_sim_time
+from cocotb.utils import get_sim_time, get_context_times
 from cocotb.xunit_reporter import XUnitReporter
 
 
@@ -102,6 +103,7 @@ class RegressionManager(object):
         self.skipped = 0
         self.failures = 0
         self.xunit = XUnitReporter()
+        self.scheduler_stats = []
 
         suite_name = os.getenv('RESULT_TESTSUITE') if os.getenv('RESULT_TESTSUITE') else "all"
         package_name = os.getenv('RESULT_TESTPACKAGE') if os.getenv('RESULT_TESTPACKAGE') else "all"
@@ -170,7 +172,10 @@ class RegressionManager(object):
                                                 classname=module_name,
                                                 time="0.0",
                                                 sim_time_ns="0.0",
-                                                ratio_time="0.0")
+                                                ratio_time="0.0",
+                                                sim_kernel_time="0.0",
+                                                python_time="0.0",
+                                                gpi_time="0.0")
                         self.xunit.add_skipped()
                         self.skipped += 1
                         self._store_test_result(module_name, thing.name, None, 0.0, 0.0, 0.0)
@@ -217,6 +222,10 @@ class RegressionManager(object):
         self._log_sim_summary()
         self.log.info("Shutting down...")
         self.xunit.write()
+        self._flush_recorders(close=True)
+        if self.scheduler_stats:
+            self._write_scheduler_stats()
+        flush_log_sink()
         simulator.stop_simulator()
 
     def next_test(self):
@@ -239,14 +248,30 @@ class RegressionManager(object):
         Args:
             result: The sub-exception of TestComplete to raise.
         """
+        self._running_test._stop_log_capture()
+
         real_time   = time.time() - self._running_test.start_time
         sim_time_ns = get_sim_time('ns') - self._running_test.start_sim_time
         ratio_time  = sim_time_ns / real_time
+        context_times = tuple(end - start for start, end in
+                              zip(self._running_test.start_context_times,
+                                  get_context_times()))
         self.xunit.add_testcase(name=self._running_test.funcname,
                                 classname=self._running_test.module,
                                 time=repr(real_time),
                                 sim_time_ns=repr(sim_time_ns),
-                                ratio_time=repr(ratio_time))
+                                ratio_time=repr(ratio_time),
+                                sim_kernel_time=repr(context_times[0]),
+                                python_time=repr(context_times[1]),
+                                gpi_time=repr(context_times[2]))
+
+        self._report_statistics()
+        self._flush_recorders()
+
+        if cocotb.scheduler.stats is not None:
+            self._collect_scheduler_stats()
+
+        flush_log_sink()
 
         running_test_funcname = self._running_test.funcname
 
@@ -290,7 +315,7 @@ class RegressionManager(object):
                 self.log.error("Test error has lead to simulator shutting us "
                                "down")
                 self._add_failure(result)
-                self._store_test_result(self._running_test.module, self._running_test.funcname, False, sim_time_ns, real_time, ratio_time)
+                self._store_test_result(self._running_test.module, self._running_test.funcname, False, sim_time_ns, real_time, ratio_time, context_times)
                 self.tear_down()
                 return
 
@@ -299,10 +324,69 @@ class RegressionManager(object):
             self._add_failure(result)
             result_pass = False
 
-        self._store_test_result(self._running_test.module, self._running_test.funcname, result_pass, sim_time_ns, real_time, ratio_time)
+        self._store_test_result(self._running_test.module, self._running_test.funcname, result_pass, sim_time_ns, real_time, ratio_time, context_times)
 
         self.execute()
 
+    def _report_statistics(self):
+        """Log the statistics of the monitors and scoreboards created since
+        the previous test and add them to the XML results as properties of
+        the test case."""
+        # Imported here as both import cocotb themselves
+        from cocotb.monitors import Monitor
+        from cocotb.scoreboard import Scoreboard
+
+        properties = []
+        for monitor in list(Monitor._active):
+            properties += [("%s.%s" % (monitor.log.name, name), value)
+                           for name, value in monitor.stats.properties()]
+        for scoreboard in list(Scoreboard._active):
+            for interface, stats in scoreboard.stats.items():
+                properties += [("%s.%s.%s" % (scoreboard.log.name, interface, name), value)
+                               for name, value in stats.properties()]
+        Monitor._active.clear()
+        Scoreboard._active.clear()
+
+        properties = sorted(prop for prop in properties if prop[1] is not None)
+        if not properties:
+            return
+        self.log.info("Statistics of %s:\n%s" % (
+            self._running_test.funcname,
+            "\n".join("%s: %s" % prop for prop in properties)))
+        element = self.xunit.add_properties()
+        for name, value in properties:
+            self.xunit.add_property(testsuite=element, name=name,
+                                    value=str(value))
+
+    def _flush_recorders(self, close=False):
+        """Write the buffered records of the transaction recorders which
+        are still open, and close them if *close*."""
+        # Imported here as it imports cocotb itself
+        from cocotb.recording import TransactionRecorder
+
+        for recorder in list(TransactionRecorder._open):
+            if close:
+                recorder.close()
+            else:
+                recorder.flush()
+
+    def _collect_scheduler_stats(self):
+        """Keep the scheduler statistics of the test that just finished, and
+        reset them for the next test."""
+        stats = cocotb.scheduler.stats.as_dict()
+        stats["test"] = "%s.%s" % (self._running_test.module,
+                                   self._running_test.funcname)
+        self.scheduler_stats.append(stats)
+        cocotb.scheduler.stats.reset()
+
+    def _write_scheduler_stats(self):
+        """Dump the scheduler statistics of every test alongside the XML
+        results."""
+        filename = os.path.join(os.path.dirname(self.xunit.filename),
+                                "scheduler_stats.json")
+        with open(filename, "w") as f:
+            json.dump(self.scheduler_stats, f, indent=1, sort_keys=True)
+
     def execute(self):
         self._running_test = cocotb.regression_manager.next_test()
         if self._running_test:
@@ -331,24 +415,34 @@ class RegressionManager(object):
         SIM_FIELD    = 'SIM TIME(NS)'
         REAL_FIELD   = 'REAL TIME(S)'
         RATIO_FIELD  = 'RATIO(NS/S)'
+        KERNEL_FIELD = 'KERNEL(S)'
+        PYTHON_FIELD = 'PYTHON(S)'
+        GPI_FIELD    = 'GPI(S)'
 
         TEST_FIELD_LEN   = max(len(TEST_FIELD),len(max([x['test'] for x in self.test_results],key=len)))
         RESULT_FIELD_LEN = len(RESULT_FIELD)
         SIM_FIELD_LEN    = len(SIM_FIELD)
         REAL_FIELD_LEN   = len(REAL_FIELD)
         RATIO_FIELD_LEN  = len(RATIO_FIELD)
+        KERNEL_FIELD_LEN = len(KERNEL_FIELD)
+        PYTHON_FIELD_LEN = len(PYTHON_FIELD)
+        GPI_FIELD_LEN    = len(GPI_FIELD)
 
-        LINE_LEN = 3 + TEST_FIELD_LEN + 2 + RESULT_FIELD_LEN + 2 + SIM_FIELD_LEN + 2 + REAL_FIELD_LEN + 2 + RATIO_FIELD_LEN + 3
+        LINE_LEN = 3 + TEST_FIELD_LEN + 2 + RESULT_FIELD_LEN + 2 + SIM_FIELD_LEN + 2 + REAL_FIELD_LEN + 2 + RATIO_FIELD_LEN + \
+                   2 + KERNEL_FIELD_LEN + 2 + PYTHON_FIELD_LEN + 2 + GPI_FIELD_LEN + 3
 
         LINE_SEP = "*"*LINE_LEN+"\n"
 
         summary = ""
         summary += LINE_SEP
-        summary += "** {a:<{a_len}}  {b:^{b_len}}  {c:>{c_len}}  {d:>{d_len}}  {e:>{e_len}} **\n".format(a=TEST_FIELD,   a_len=TEST_FIELD_LEN,
-                                                                                                         b=RESULT_FIELD, b_len=RESULT_FIELD_LEN,
-                                                                                                         c=SIM_FIELD,    c_len=SIM_FIELD_LEN,
-                                                                                                         d=REAL_FIELD,   d_len=REAL_FIELD_LEN,
-                                                                                                         e=RATIO_FIELD,  e_len=RATIO_FIELD_LEN)
+        summary += "** {a:<{a_len}}  {b:^{b_len}}  {c:>{c_len}}  {d:>{d_len}}  {e:>{e_len}}  {f:>{f_len}}  {g:>{g_len}}  {h:>{h_len}} **\n".format(a=TEST_FIELD,   a_len=TEST_FIELD_LEN,
+                                                                                                                                              b=RESULT_FIELD, b_len=RESULT_FIELD_LEN,
+                                                                                                                                              c=SIM_FIELD,    c_len=SIM_FIELD_LEN,
+                                                                                                                                              d=REAL_FIELD,   d_len=REAL_FIELD_LEN,
+                                                                                                                                              e=RATIO_FIELD,  e_len=RATIO_FIELD_LEN,
+                                                                                                                                              f=KERNEL_FIELD, f_len=KERNEL_FIELD_LEN,
+                                                                                                                                              g=PYTHON_FIELD, g_len=PYTHON_FIELD_LEN,
+                                                                                                                                              h=GPI_FIELD,    h_len=GPI_FIELD_LEN)
         summary += LINE_SEP
         for result in self.test_results:
             hilite = ''
@@ -362,12 +456,15 @@ class RegressionManager(object):
                 if self.log.colour:
                     hilite = ANSI.COLOR_HILITE_SUMMARY
 
-            summary += "{start}** {a:<{a_len}}  {b:^{b_len}}  {c:>{c_len}.2f}   {d:>{d_len}.2f}   {e:>{e_len}.2f}  **\n".format(a=result['test'],   a_len=TEST_FIELD_LEN,
-                                                                                                                                b=pass_fail_str,    b_len=RESULT_FIELD_LEN,
-                                                                                                                                c=result['sim'],    c_len=SIM_FIELD_LEN-1,
-                                                                                                                                d=result['real'],   d_len=REAL_FIELD_LEN-1,
-                                                                                                                                e=result['ratio'],  e_len=RATIO_FIELD_LEN-1,
-                                                                                                                                start=hilite)
+            summary += "{start}** {a:<{a_len}}  {b:^{b_len}}  {c:>{c_len}.2f}   {d:>{d_len}.2f}   {e:>{e_len}.2f}   {f:>{f_len}.2f}   {g:>{g_len}.2f}   {h:>{h_len}.2f}  **\n".format(a=result['test'],   a_len=TEST_FIELD_LEN,
+                                                                                                                                                                       b=pass_fail_str,    b_len=RESULT_FIELD_LEN,
+                                                                                                                                                                       c=result['sim'],    c_len=SIM_FIELD_LEN-1,
+                                                                                                                                                                       d=result['real'],   d_len=REAL_FIELD_LEN-1,
+                                                                                                                                                                       e=result['ratio'],  e_len=RATIO_FIELD_LEN-1,
+                                                                                                                                                                       f=result['kernel'], f_len=KERNEL_FIELD_LEN-1,
+                                                                                                                                                                       g=result['python'], g_len=PYTHON_FIELD_LEN-1,
+                                                                                                                                                                       h=result['gpi'],    h_len=GPI_FIELD_LEN-1,
+                                                                                                                                                                       start=hilite)
         summary += LINE_SEP
 
         self.log.info(summary)
@@ -376,6 +473,7 @@ class RegressionManager(object):
         real_time   = time.time() - self.start_time
         sim_time_ns = get_sim_time('ns')
         ratio_time  = sim_time_ns / real_time
+        kernel_time, python_time, gpi_time = get_context_times()
 
         summary = ""
 
@@ -385,17 +483,23 @@ class RegressionManager(object):
         summary += "**                               SIM TIME : {0:<39}**\n".format('{0:.2f} NS'.format(sim_time_ns))
         summary += "**                              REAL TIME : {0:<39}**\n".format('{0:.2f} S'.format(real_time))
         summary += "**                        SIM / REAL TIME : {0:<39}**\n".format('{0:.2f} NS/S'.format(ratio_time))
+        summary += "**                        SIM KERNEL TIME : {0:<39}**\n".format('{0:.2f} S'.format(kernel_time))
+        summary += "**                            PYTHON TIME : {0:<39}**\n".format('{0:.2f} S'.format(python_time))
+        summary += "**                               GPI TIME : {0:<39}**\n".format('{0:.2f} S'.format(gpi_time))
         summary += "*************************************************************************************\n"
 
         self.log.info(summary)
 
-    def _store_test_result(self, module_name, test_name, result_pass, sim_time, real_time, ratio):
+    def _store_test_result(self, module_name, test_name, result_pass, sim_time, real_time, ratio, context_times=(0.0, 0.0, 0.0)):
         result = {
-            'test'  : '.'.join([module_name, test_name]),
-            'pass'  : result_pass,
-            'sim'   : sim_time,
-            'real'  : real_time,
-            'ratio' : ratio}
+            'test'   : '.'.join([module_name, test_name]),
+            'pass'   : result_pass,
+            'sim'    : sim_time,
+            'real'   : real_time,
+            'ratio'  : ratio,
+            'kernel' : context_times[0],
+            'python' : context_times[1],
+            'gpi'    : context_times[2]}
         self.test_results.append(result)
 
 
@@ -100,6 +100,11 @@ class TestFailure(TestComplete):
     pass
 
 
+class TestTimeout(TestFailure):
+    """Exception showing that the test exceeded its simulation or wall-clock timeout."""
+    pass
+
+
 class TestSuccess(TestComplete):
     """Exception showing that test was completed successfully."""
     pass
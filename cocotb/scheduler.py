@@ -38,6 +38,7 @@ import collections
 import copy
 import os
 import time
+import timeit
 import logging
 import threading
 
@@ -48,7 +49,7 @@ else:
 
 # Debug mode controlled by environment variables
 if "COCOTB_ENABLE_PROFILING" in os.environ:
-    import cProfile, StringIO, pstats
+    import cProfile, pstats
     _profile = cProfile.Profile()
     _profiling = True
 else:
@@ -61,14 +62,20 @@ if "COCOTB_SCHEDULER_DEBUG" in os.environ:
 else:
     _debug = False
 
+# Per-coroutine and per-trigger statistics, see SchedulerStatistics
+if "COCOTB_SCHEDULER_STATS" in os.environ:
+    _instrumenting = True
+else:
+    _instrumenting = False
+
 
 import cocotb
 import cocotb.decorators
 from cocotb.triggers import (Trigger, GPITrigger, Timer, ReadOnly, PythonTrigger,
                              NextTimeStep, ReadWrite, Event, Join)
 from cocotb.log import SimLog
-from cocotb.result import (TestComplete, TestError, ReturnValue, raise_error,
-                           create_error, ExternalException)
+from cocotb.result import (TestComplete, TestError, TestTimeout, ReturnValue,
+                           raise_error, create_error, ExternalException)
 from cocotb.utils import nullcontext
 
 
@@ -83,6 +90,92 @@ class profiling_context(object):
 
 from cocotb import outcomes
 
+
+class SchedulerStatistics(object):
+    """Runtime statistics collected by the :class:`Scheduler`.
+
+    Enabled by the ``COCOTB_SCHEDULER_STATS`` environment variable. Records,
+    per test:
+
+    * the number of resumes and the wall time spent inside each coroutine
+      function, excluding time spent in coroutines it started
+    * the same, grouped by the class of the trigger that caused the resume
+    * the number of callbacks from the simulator per trigger class
+    * the depth of the scheduler queues each time a trigger is processed
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear all statistics, called at the start of each test."""
+        self.coroutines = {}
+        self.triggers = {}
+        self.callbacks = {}
+        self.queue_depths = {}
+        self._nested = []
+
+    @staticmethod
+    def _accumulate(table, key, elapsed):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def advance(self, coroutine, outcome, trigger):
+        """Advance *coroutine* with *outcome*, timing how long it runs."""
+        self._nested.append(0.0)
+        start = timeit.default_timer()
+        try:
+            return coroutine._advance(outcome)
+        finally:
+            elapsed = timeit.default_timer() - start
+            elapsed_children = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            elapsed -= elapsed_children
+
+            self._accumulate(self.coroutines, "%s.%s" % (coroutine.module,
+                                                         coroutine.funcname),
+                             elapsed)
+            if trigger is None:
+                trigger_name = "<start>"
+            else:
+                trigger_name = type(trigger).__name__
+            self._accumulate(self.triggers, trigger_name, elapsed)
+
+    def callback(self, trigger):
+        """Count a callback from the simulator."""
+        name = type(trigger).__name__
+        self.callbacks[name] = self.callbacks.get(name, 0) + 1
+
+    def queue_depth(self, name, depth):
+        """Record a sample of the depth of the queue *name*."""
+        entry = self.queue_depths.get(name)
+        if entry is None:
+            entry = self.queue_depths[name] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += depth
+        if depth > entry[2]:
+            entry[2] = depth
+
+    def as_dict(self):
+        """Return the statistics as a dictionary suitable for JSON output."""
+        def timings(table):
+            return dict((key, {"resumes": count, "time": elapsed})
+                        for key, (count, elapsed) in table.items())
+
+        return {
+            "coroutines": timings(self.coroutines),
+            "triggers": timings(self.triggers),
+            "callbacks": dict(self.callbacks),
+            "queue_depths": dict(
+                (key, {"max": peak, "mean": float(total) / samples})
+                for key, (samples, total, peak) in self.queue_depths.items()),
+        }
+
+
 class external_state(object):
     INIT = 0
     RUNNING = 1
@@ -243,6 +336,17 @@ class Scheduler(object):
         self._write_coro_inst = None
         self._writes_pending = Event()
 
+        if _instrumenting:
+            self.stats = SchedulerStatistics()
+        else:
+            self.stats = None
+
+        # Per-test timeouts, armed when a test starts running
+        self._timeout_test = None
+        self._timeout_timer = None
+        self._wall_watchdog = None
+        self._wall_timeout_expired = None
+
     @cocotb.decorators.coroutine
     def _do_writes(self):
         """ An internal coroutine that performs pending writes """
@@ -270,6 +374,8 @@ class Scheduler(object):
                 self._write_coro_inst.kill()
                 self._write_coro_inst = None
 
+            self._disarm_test_timeouts()
+
             for t in self._trigger2coros:
                 t.unprime()
 
@@ -330,6 +436,16 @@ class Scheduler(object):
 
         assert not self._pending_triggers
 
+        if _instrumenting:
+            self.stats.callback(trigger)
+
+        # The wall-clock watchdog can only flag expiry from its own thread,
+        # the test is failed here, back on the simulator thread
+        if (self._wall_timeout_expired is not None and
+                self._wall_timeout_expired is self._timeout_test):
+            self._timeout_expired("Test exceeded its wall-clock timeout of "
+                                  "%.1fs" % self._timeout_test.wall_timeout)
+
         # start the event loop
         self._is_reacting = True
         try:
@@ -412,6 +528,14 @@ class Scheduler(object):
                 # thing to do is pop all entries waiting on this trigger.
                 scheduling = self._trigger2coros.pop(trigger)
 
+                if _instrumenting:
+                    self.stats.queue_depth("pending_triggers",
+                                           len(self._pending_triggers))
+                    self.stats.queue_depth("waiting_triggers",
+                                           len(self._trigger2coros))
+                    self.stats.queue_depth("coroutines_per_trigger",
+                                           len(scheduling))
+
                 if _debug:
                     debugstr = "\n\t".join([coro.__name__ for coro in scheduling])
                     if len(scheduling):
@@ -614,7 +738,10 @@ class Scheduler(object):
             self.log.debug("Scheduling with {}".format(send_outcome))
 
         try:
-            result = coroutine._advance(send_outcome)
+            if _instrumenting:
+                result = self.stats.advance(coroutine, send_outcome, trigger)
+            else:
+                result = coroutine._advance(send_outcome)
             if _debug:
                 self.log.debug("Coroutine %s yielded %s (mode %d)" %
                                (coroutine.__name__, str(result), self._mode))
@@ -702,6 +829,67 @@ class Scheduler(object):
         while self._pending_coros:
             self.add(self._pending_coros.pop(0))
 
+    def _arm_test_timeouts(self, test):
+        """Start the simulation time and wall-clock timeouts of *test*.
+
+        Called by the test itself when it is first scheduled.
+        """
+        self._disarm_test_timeouts()
+        self._timeout_test = test
+
+        if test.timeout is not None:
+            self._timeout_timer = Timer(test.timeout, units=test.timeout_unit)
+            self._timeout_timer.prime(self._sim_timeout_expired)
+
+        if test.wall_timeout is not None:
+            def expired():
+                # Nothing else may happen here, logging asks the simulator
+                # for the time, which can only be done from its own thread.
+                # react() logs and fails the test.
+                self._wall_timeout_expired = test
+            self._wall_watchdog = threading.Timer(test.wall_timeout, expired)
+            self._wall_watchdog.daemon = True
+            self._wall_watchdog.start()
+
+    def _disarm_test_timeouts(self):
+        """Cancel any timeouts of the current test."""
+        if self._timeout_timer is not None:
+            self._timeout_timer.unprime()
+            self._timeout_timer = None
+        if self._wall_watchdog is not None:
+            self._wall_watchdog.cancel()
+            self._wall_watchdog = None
+        self._wall_timeout_expired = None
+        self._timeout_test = None
+
+    def _sim_timeout_expired(self, trigger):
+        """Callback from the simulation time timeout :class:`Timer`."""
+        trigger.unprime()
+        self._timeout_timer = None
+        self._timeout_expired("Test exceeded its simulation timeout of %s" %
+                              str(trigger))
+
+    def _timeout_expired(self, msg):
+        """Fail the running test with a dump of all waiting coroutines."""
+        dump = self._coroutine_dump()
+        self.log.error("%s\n%s" % (msg, dump))
+        result = TestTimeout(msg)
+        result.stderr.write(dump)
+        self.finish_test(result)
+        self._check_termination()
+
+    def _coroutine_dump(self):
+        """Return a description of every live coroutine and the trigger
+        it is waiting on."""
+        lines = ["Live coroutines:"]
+        for coro, trigger in self._coro2trigger.items():
+            lines.append("    %s (%s.%s) waiting on %s" %
+                         (coro.__name__, coro.module, coro.funcname,
+                          str(trigger)))
+        for coro in self._pending_coros:
+            lines.append("    %s pending start" % coro.__name__)
+        return "\n".join(lines)
+
     def finish_test(self, test_result):
         """Cache the test result and set the terminate flag."""
         self.log.debug("finish_test called with %s" % (repr(test_result)))
@@ -30,12 +30,311 @@
 """Common scoreboarding capability."""
 
 import logging
+import weakref
+import collections
+import multiprocessing
+import multiprocessing.pool
+import threading
+import traceback
 import cocotb
 
-from cocotb.utils import hexdump, hexdiffs
-from cocotb.log import SimLog
+from cocotb.utils import hexdump, hexdiffs, get_sim_time, LogHistogram
+from cocotb.log import SimLog, LazyMessage
 from cocotb.monitors import Monitor
-from cocotb.result import TestFailure, TestSuccess
+from cocotb.result import TestFailure, TestSuccess, TestError
+
+
+def _default_key(transaction):
+    """Index hashable transactions by themselves and anything else by its
+    string representation."""
+    try:
+        hash(transaction)
+    except TypeError:
+        return str(transaction)
+    return transaction
+
+
+class KeyedExpectedQueue(object):
+    """Queue of expected transactions indexed by a key.
+
+    Use in place of the list of expected transactions passed to
+    :meth:`Scoreboard.add_interface`. Each received transaction is matched in
+    constant time against the oldest expected transaction with the same key,
+    so reordering is allowed between transactions with different keys
+    irrespective of how far apart they are. When nothing with that key is
+    expected, the transaction is compared against the oldest expected
+    transaction, as with a plain list.
+
+    Args:
+        key (callable, optional): Function returning the key of a transaction,
+            e.g. its ID or flow. Defaults to the transaction itself (or its
+            string representation if it isn't hashable), which matches equal
+            transactions in any order.
+        in_order (bool, optional): Require transactions with the same key to
+            arrive in the order they were expected. Otherwise an equal
+            transaction is searched for among the ones with the same key.
+    """
+
+    def __init__(self, key=None, in_order=False):
+        self._key = key if key is not None else _default_key
+        self._in_order = in_order
+        # Transactions are identified by a sequence number. A key maps to the
+        # number of its only transaction, or to a deque of numbers once there
+        # are several, which keeps the common case of unique keys cheap.
+        # Removed transactions stay in the queues and are skipped lazily.
+        # Pending transactions are kept with the sim time they were queued at.
+        self._pending = {}
+        self._by_key = {}
+        self._order = collections.deque()
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __iter__(self):
+        pending = self._pending
+        for seq in self._order:
+            if seq in pending:
+                yield pending[seq][0]
+
+    def append(self, transaction):
+        """Add a transaction to the end of the queue."""
+        seq = self._next_seq
+        self._next_seq += 1
+        self._pending[seq] = (transaction, get_sim_time())
+        self._order.append(seq)
+
+        key = self._key(transaction)
+        queued = self._by_key.get(key)
+        if queued is None:
+            self._by_key[key] = seq
+        elif isinstance(queued, collections.deque):
+            queued.append(seq)
+        else:
+            self._by_key[key] = collections.deque((queued, seq))
+
+    def extend(self, transactions):
+        """Add all of *transactions* to the end of the queue."""
+        for transaction in transactions:
+            self.append(transaction)
+
+    def _discard_removed(self, queued):
+        pending = self._pending
+        while queued and queued[0] not in pending:
+            queued.popleft()
+
+    def _match_key(self, key, transaction):
+        """Remove and return the sequence number of the transaction with
+        *key* to compare against, or ``None``."""
+        queued = self._by_key.get(key)
+        if queued is None:
+            return None
+        if not isinstance(queued, collections.deque):
+            del self._by_key[key]
+            return queued if queued in self._pending else None
+
+        self._discard_removed(queued)
+        seq = None
+        if queued:
+            seq = queued[0]
+            if not self._in_order:
+                pending = self._pending
+                for candidate in queued:
+                    if candidate in pending and pending[candidate][0] == transaction:
+                        seq = candidate
+                        break
+            if seq == queued[0]:
+                queued.popleft()
+            else:
+                queued.remove(seq)
+        if not queued:
+            del self._by_key[key]
+        return seq
+
+    def pop_match(self, transaction):
+        """Remove and return the expected transaction *transaction* should be
+        compared with.
+
+        Raises:
+            :any:`IndexError`: If no transactions are expected.
+        """
+        return self._pop_match(transaction)[0]
+
+    def _pop_match(self, transaction):
+        """As :meth:`pop_match`, returning the sim time the expected
+        transaction was queued at as well."""
+        seq = self._match_key(self._key(transaction), transaction)
+        if seq is None:
+            # Nothing with this key, compare against the oldest one instead
+            self._discard_removed(self._order)
+            seq = self._order[0]
+        expected = self._pending.pop(seq)
+        self._discard_removed(self._order)
+        return expected
+
+
+def _run_model(model, transaction):
+    """Run *model* in the pool, returning ``(result, traceback)``.
+
+    Exceptions are returned rather than raised so the pool always calls
+    back when a job finishes, which Python 2 pools don't do on errors.
+    """
+    try:
+        return model(transaction), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+class ModelExpectedQueue(object):
+    """Queue of expected transactions computed by a reference model in a pool.
+
+    Use in place of the list of expected transactions passed to
+    :meth:`Scoreboard.add_interface` when the model is too slow to run in
+    the monitor callback. Input transactions are handed to the pool with
+    :meth:`submit` as soon as they are sent, e.g. by passing it as the
+    *callback* of :meth:`.Driver.append`, and the scoreboard only waits for
+    the result when the output is received. Results are compared in the
+    order the inputs were submitted::
+
+        expected = ModelExpectedQueue(golden_model)
+        scoreboard.add_interface(monitor, expected)
+        driver.append(transaction, callback=expected.submit)
+
+    Args:
+        model (callable): Function returning the expected output for an
+            input transaction. Must be picklable, i.e. defined at module
+            level, if *processes* is ``True``.
+        workers (int, optional): Size of the pool, defaults to the number
+            of CPUs.
+        processes (bool, optional): Use a pool of processes instead of
+            threads, for models which hold the GIL. Defaults to ``False``.
+
+            .. warning::
+                The worker processes are forked from the simulator, from
+                inside a simulator callback, along with all of its state.
+                Only use this with simulators which survive that, and with
+                models which don't touch the simulator or the DUT.
+        max_pending (int, optional): Number of submitted transactions the
+            model may be working on or have queued before :meth:`submit`
+            blocks waiting for one of them to finish. Defaults to four per
+            worker.
+    """
+
+    def __init__(self, model, workers=None, processes=False, max_pending=None):
+        self._model = model
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if processes:
+            self._pool = multiprocessing.Pool(workers)
+        else:
+            self._pool = multiprocessing.pool.ThreadPool(workers)
+        self._max_pending = max_pending if max_pending is not None else 4 * workers
+        self._results = collections.deque()
+        self._slots = threading.Semaphore(self._max_pending)
+
+    def __len__(self):
+        return len(self._results)
+
+    def __iter__(self):
+        for result, queued_at in self._results:
+            yield self._get(result)
+
+    def submit(self, transaction):
+        """Start computing the expected output for the input *transaction*."""
+        self._slots.acquire()
+        result = self._pool.apply_async(_run_model, (self._model, transaction),
+                                        callback=self._finished)
+        self._results.append((result, get_sim_time()))
+
+    def _finished(self, _):
+        self._slots.release()
+
+    @staticmethod
+    def _get(result):
+        value, error = result.get()
+        if error is not None:
+            raise TestError("Reference model failed:\n" + error)
+        return value
+
+    def pop_match(self, transaction):
+        """Remove and return the oldest expected output, waiting for the model
+        to compute it if needed.
+
+        Raises:
+            :any:`IndexError`: If no transactions are expected.
+        """
+        return self._pop_match(transaction)[0]
+
+    def _pop_match(self, transaction):
+        result, queued_at = self._results.popleft()
+        return self._get(result), queued_at
+
+    def close(self):
+        """Shut down the pool once the submitted transactions are computed."""
+        self._pool.close()
+        self._pool.join()
+
+
+class _ListTimestamps(object):
+    """Sim times at which the transactions of a plain list of expected
+    outputs were appended.
+
+    A list can't tell when it is appended to, so its length is checked
+    after every monitor callback, which is where models append, and
+    before each comparison. New transactions get the time they were first
+    seen at.
+    """
+    def __init__(self, expected):
+        self._expected = expected
+        self._times = collections.deque()
+        self.observe()
+        Monitor._observers.add(self)
+
+    def observe(self):
+        times = self._times
+        added = len(self._expected) - len(times)
+        if added > 0:
+            times.extend([get_sim_time()] * added)
+        else:
+            # Removed by someone other than the scoreboard, oldest first
+            for _ in range(-added):
+                times.popleft()
+
+    def pop(self, index):
+        """Return and forget the time of the transaction at *index*."""
+        self.observe()
+        queued_at = self._times[index]
+        del self._times[index]
+        return queued_at
+
+
+class ScoreboardStatistics(object):
+    """Statistics of one interface of a :class:`Scoreboard`.
+
+    Attributes:
+        compared (int): Number of received transactions compared.
+        peak_depth (int): Largest number of expected transactions outstanding
+            when a transaction was received.
+        latency (LogHistogram): Sim steps between an expected transaction
+            being queued and the matching transaction being received. Not
+            recorded for a callable *expected_output*. A plain list is
+            checked for new transactions after every monitor callback, so
+            those appended elsewhere count from the next check.
+    """
+    def __init__(self):
+        self.compared = 0
+        self.peak_depth = 0
+        self.latency = LogHistogram()
+
+    def properties(self):
+        """Return the statistics as a list of ``(name, value)`` pairs."""
+        props = [("compared", self.compared),
+                 ("peak_depth", self.peak_depth)]
+        if self.latency.count:
+            summary = self.latency.summary()
+            props += [("latency_" + name, summary[name])
+                      for name in ("min", "mean", "p50", "p90", "p99", "max")]
+        return props
 
 
 class Scoreboard(object):
@@ -46,9 +345,10 @@ class Scoreboard(object):
     The expected output can either be a function which provides a transaction
     or a simple list containing the expected output.
 
-    TODO:
-        Statistics for end-of-test summary etc.
-        
+    The :class:`ScoreboardStatistics` of every interface are kept in
+    :attr:`stats` and reported when the test that created the scoreboard
+    finishes.
+
     Args:
         dut (SimHandle): Handle to the DUT.
         reorder_depth (int, optional): Consider up to `reorder_depth` elements 
@@ -60,12 +360,20 @@ class Scoreboard(object):
             recording an error. Default is ``True``.
     """
     
+    # Scoreboards whose statistics are reported at the end of the test
+    _active = weakref.WeakSet()
+
+    #: Maximum number of lines of each hexdump and diff reported on a mismatch
+    report_lines = 100
+
     def __init__(self, dut, reorder_depth=0, fail_immediately=True):  # FIXME: reorder_depth needed here?
         self.dut = dut
         self.log = SimLog("cocotb.scoreboard.%s" % self.dut._name)
         self.errors = 0
         self.expected = {}
+        self.stats = {}
         self._imm = fail_immediately
+        Scoreboard._active.add(self)
 
     @property
     def result(self):
@@ -77,20 +385,21 @@ class Scoreboard(object):
         """
         fail = False
         for monitor, expected_output in self.expected.items():
+            monitor.flush()
             if callable(expected_output):
                 self.log.debug("Can't check all data returned for %s since "
                                "expected output is callable function rather "
-                               "than a list" % str(monitor))
+                               "than a list", monitor)
                 continue
             if len(expected_output):
-                self.log.warn("Still expecting %d transactions on %s" %
-                              (len(expected_output), str(monitor)))
+                self.log.warn("Still expecting %d transactions on %s",
+                              len(expected_output), monitor)
                 for index, transaction in enumerate(expected_output):
-                    self.log.info("Expecting %d:\n%s" %
-                                  (index, hexdump(str(transaction))))
+                    self.log.info("Expecting %d:\n%s", index,
+                                  LazyMessage(hexdump, str(transaction)))
                     if index > 5:
-                        self.log.info("... and %d more to come" %
-                                      (len(expected_output) - index - 1))
+                        self.log.info("... and %d more to come",
+                                      len(expected_output) - index - 1)
                         break
                 fail = True
         if fail:
@@ -122,8 +431,7 @@ class Scoreboard(object):
         if strict_type and type(got) != type(exp):
             self.errors += 1
             log.error("Received transaction type is different than expected")
-            log.info("Received: %s but expected %s" %
-                     (str(type(got)), str(type(exp))))
+            log.info("Received: %s but expected %s", type(got), type(exp))
             if self._imm:
                 raise TestFailure("Received transaction of wrong type. "
                                   "Set strict_type=False to avoid this.")
@@ -141,26 +449,29 @@ class Scoreboard(object):
 
             log.error("Received transaction differed from expected output")
             if not strict_type:
-                log.info("Expected:\n" + hexdump(strexp))
+                log.info("Expected:\n%s", LazyMessage(hexdump, strexp,
+                                                       max_lines=self.report_lines))
             else:
-                log.info("Expected:\n" + repr(exp))
+                log.info("Expected:\n%r", exp)
             if not isinstance(exp, str):
                 try:
                     for word in exp:
-                        log.info(str(word))
+                        log.info("%s", word)
                 except:
                     pass
             if not strict_type:
-                log.info("Received:\n" + hexdump(strgot))
+                log.info("Received:\n%s", LazyMessage(hexdump, strgot,
+                                                       max_lines=self.report_lines))
             else:
-                log.info("Received:\n" + repr(got))
+                log.info("Received:\n%r", got)
             if not isinstance(got, str):
                 try:
                     for word in got:
-                        log.info(str(word))
+                        log.info("%s", word)
                 except:
                     pass
-            log.warning("Difference:\n%s" % hexdiffs(strexp, strgot))
+            log.warning("Difference:\n%s", LazyMessage(hexdiffs, strexp, strgot,
+                                                        max_lines=self.report_lines))
             if self._imm:
                 raise TestFailure("Received transaction differed from expected"
                                   "transaction")
@@ -168,9 +479,8 @@ class Scoreboard(object):
             # Don't want to fail the test
             # if we're passed something without __len__
             try:
-                log.debug("Received expected transaction %d bytes" %
-                          (len(got)))
-                log.debug(repr(got))
+                log.debug("Received expected transaction %d bytes", len(got))
+                log.debug("%r", got)
             except:
                 pass
 
@@ -185,12 +495,20 @@ class Scoreboard(object):
         
         Args:
             monitor: The monitor object.
-            expected_output: Queue of expected outputs.
-            compare_fn (callable, optional): 
+            expected_output: Queue of expected outputs. Either a list, a
+                :class:`KeyedExpectedQueue`, a :class:`ModelExpectedQueue`
+                or a callable returning the expected output for a received
+                transaction.
+            compare_fn (callable, optional): Called with each received
+                transaction instead of the built-in comparison, or with lists
+                of them if the monitor delivers in batches.
             reorder_depth (int, optional): Consider up to *reorder_depth* elements 
                 of the expected result list as passing matches.
                 Default is 0, meaning only the first element in the expected result list
                 is considered for a passing match.
+                Not used for a :class:`KeyedExpectedQueue`, its key decides
+                which transactions may be reordered, nor for a
+                :class:`ModelExpectedQueue`, which is always in order.
             strict_type (bool, optional): Require transaction type to match
                 exactly if ``True``, otherwise compare its string representation.
 
@@ -214,39 +532,63 @@ class Scoreboard(object):
             raise TypeError("Expected a callable compare function but got %s" %
                             str(type(compare_fn)))
 
-        self.log.info("Created with reorder_depth %d" % reorder_depth)
+        self.log.info("Created with reorder_depth %d", reorder_depth)
+
+        name = getattr(monitor, "name", None)
+        if name:
+            interface = name
+        else:
+            interface = monitor.__class__.__name__
+        log_name = self.log.name + '.' + interface
+
+        log = logging.getLogger(log_name)
+
+        timestamped = isinstance(expected_output,
+                                 (KeyedExpectedQueue, ModelExpectedQueue))
+        stats = self.stats[interface] = ScoreboardStatistics()
+        list_times = None
+        if isinstance(expected_output, list):
+            list_times = _ListTimestamps(expected_output)
 
         def check_received_transaction(transaction):
             """Called back by the monitor when a new transaction has been
             received."""
 
-            if monitor.name:
-                log_name = self.log.name + '.' + monitor.name
-            else:
-                log_name = self.log.name + '.' + monitor.__class__.__name__
-
-            log = logging.getLogger(log_name)
-
             if callable(expected_output):
                 exp = expected_output(transaction)
 
+            elif timestamped and len(expected_output):
+                stats.peak_depth = max(stats.peak_depth, len(expected_output))
+                exp, queued_at = expected_output._pop_match(transaction)
+                stats.latency.record(get_sim_time() - queued_at)
+
             elif len(expected_output):  # we expect something
+                stats.peak_depth = max(stats.peak_depth, len(expected_output))
                 for i in range(min((reorder_depth + 1), len(expected_output))):
                     if expected_output[i] == transaction:
                         break  # break out of enclosing for loop
                 else:  # run when for loop is exhausted (but no break occurs)
                     i = 0
+                if list_times is not None:
+                    stats.latency.record(get_sim_time() - list_times.pop(i))
                 exp = expected_output.pop(i)
             else:
                 self.errors += 1
                 log.error("Received a transaction but wasn't expecting "
                           "anything")
-                log.info("Got: %s" % (hexdump(str(transaction))))
+                log.info("Got: %s", LazyMessage(hexdump, str(transaction)))
                 if self._imm:
                     raise TestFailure("Received a transaction but wasn't "
                                       "expecting anything")
                 return
 
+            stats.compared += 1
             self.compare(transaction, exp, log, strict_type=strict_type)
 
-        monitor.add_callback(check_received_transaction)
+        if monitor.batch is None:
+            monitor.add_callback(check_received_transaction)
+        else:
+            def check_received_batch(transactions):
+                for transaction in transactions:
+                    check_received_transaction(transaction)
+            monitor.add_callback(check_received_batch)
@@ -45,24 +45,17 @@ extern void* utils_dyn_sym(void *handle, const char* sym_name);
 
 extern int is_python_context;
 
-void to_python(void) {
-    if (is_python_context) {
-        fprintf(stderr, "FATAL: We are calling up again\n");
-        exit(1);
-    }
-    ++is_python_context;
-    //fprintf(stderr, "INFO: Calling up to python %d\n", is_python_context);
-}
+/* Switch between the simulator and the Python context.  Every switch is
+ * timestamped so the wall time spent on either side can be reported. */
+extern void to_python(void);
+extern void to_simulator(void);
 
-void to_simulator(void) {
-    if (!is_python_context) {
-        fprintf(stderr, "FATAL: We have returned twice from python\n");
-        exit(1);
-    }
+/* Monotonic wall-clock timestamp in seconds */
+extern double utils_timestamp(void);
 
-    --is_python_context;
-    //fprintf(stderr, "INFO: Returning back to simulator %d\n", is_python_context);
-}
+/* Accumulated wall time (in seconds) spent in the simulator and in the
+ * Python context since the library was loaded */
+extern void utils_context_times(double *sim_time, double *python_time);
 
 #ifdef __cplusplus
 }
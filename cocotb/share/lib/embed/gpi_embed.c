@@ -240,21 +240,6 @@ int embed_sim_init(gpi_sim_info_t *info)
 
     Py_DECREF(simlog_func);
 
-    simlog_func = PyObject_GetAttrString(simlog_obj, "_willLog");
-    if (simlog_func == NULL) {
-        PyErr_Print();
-        fprintf(stderr, "Failed to get the _willLog method");
-        goto cleanup;
-    }
-
-    if (!PyCallable_Check(simlog_func)) {
-        PyErr_Print();
-        fprintf(stderr, "_willLog is not callable");
-        goto cleanup;
-    }
-
-    set_log_filter(simlog_func);
-
     argv_list = PyList_New(0);
     for (i = 0; i < info->argc; i++) {
         arg_value = PyString_FromString(info->argv[i]);
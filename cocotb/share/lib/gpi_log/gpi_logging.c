@@ -33,19 +33,75 @@
 
 // Used to log using the standard python mechanism
 static PyObject *pLogHandler;
-static PyObject *pLogFilter;
+
+// Cached effective level of the cocotb.gpi logger, pushed from Python so
+// that disabled messages are dropped without taking the GIL
 static enum gpi_log_levels local_level = GPIInfo;
 
-void set_log_handler(void *handler)
+// We keep this module global to avoid reallocation
+// we do not need to worry about locking here as
+// are single threaded and can not have multiple calls
+// into gpi_log at once.
+#define LOG_SIZE    512
+static char log_buff[LOG_SIZE];
+
+// Optional ring buffer of the most recent messages, whatever their level,
+// which is only written out when an error is logged. Enabled by setting
+// COCOTB_GPI_LOG_RING to the number of messages to keep.
+//
+// The strings are copied, callers pass temporary Python strings or the
+// static buffers of the simulator interfaces which are gone by the time
+// the ring is written out.
+#define RING_NAME_SIZE  64
+#define RING_PATH_SIZE  256
+
+struct ring_entry {
+    long level;
+    char name[RING_NAME_SIZE];
+    char pathname[RING_PATH_SIZE];
+    char funcname[RING_NAME_SIZE];
+    long lineno;
+    char msg[LOG_SIZE];
+};
+
+// Claim the next slot atomically where the compiler lets us
+#if defined(__GNUC__)
+#define RING_CLAIM() __sync_fetch_and_add(&ring_head, 1)
+#elif defined(_MSC_VER)
+#include <intrin.h>
+#define RING_CLAIM() ((unsigned long)_InterlockedExchangeAdd((volatile long *)&ring_head, 1))
+#else
+#define RING_CLAIM() (ring_head++)
+#endif
+
+static struct ring_entry *ring = NULL;
+static unsigned long ring_size = 0;
+static unsigned long ring_head = 0;
+static unsigned long ring_tail = 0;
+
+static void ring_init(void)
 {
-    pLogHandler = (PyObject *)handler;
-    Py_INCREF(pLogHandler);
+    const char *size = getenv("COCOTB_GPI_LOG_RING");
+
+    if (ring || !size)
+        return;
+
+    ring_size = strtoul(size, NULL, 10);
+    if (!ring_size)
+        return;
+
+    ring = (struct ring_entry *)calloc(ring_size, sizeof(struct ring_entry));
+    if (!ring) {
+        fprintf(stderr, "Unable to allocate GPI log ring of %lu entries\n", ring_size);
+        ring_size = 0;
+    }
 }
 
-void set_log_filter(void *filter)
+void set_log_handler(void *handler)
 {
-    pLogFilter = (PyObject *)filter;
-    Py_INCREF(pLogFilter);
+    pLogHandler = (PyObject *)handler;
+    Py_INCREF(pLogHandler);
+    ring_init();
 }
 
 void set_log_level(enum gpi_log_levels new_level)
@@ -82,12 +138,75 @@ const char *log_level(long level)
   return str;
 }
 
-// We keep this module global to avoid reallocation
-// we do not need to worry about locking here as
-// are single threaded and can not have multiple calls
-// into gpi_log at once.
-#define LOG_SIZE    512
-static char log_buff[LOG_SIZE];
+// Print a message in the same layout as the Python SimLogFormatter
+static void log_to_stream(FILE *stream, const char *name, long level, const char *pathname,
+                          const char *funcname, long lineno, const char *msg)
+{
+    int n;
+
+    fprintf(stream, "     -.--ns ");
+    fprintf(stream, "%-9s", log_level(level));
+    fprintf(stream, "%-35s", name);
+
+    n = strlen(pathname);
+    if (n > 20) {
+        fprintf(stream, "..%18s:", (pathname + (n - 18)));
+    } else {
+        fprintf(stream, "%20s:", pathname);
+    }
+
+    fprintf(stream, "%-4ld", lineno);
+    fprintf(stream, " in %-31s ", funcname);
+    fprintf(stream, "%s", msg);
+    fprintf(stream, "\n");
+}
+
+static void ring_copy(char *dest, const char *src, size_t size)
+{
+    if (!src)
+        src = "";
+    strncpy(dest, src, size - 1);
+    dest[size - 1] = '\0';
+}
+
+// The slot is claimed with an atomic increment so a writer never has to
+// wait for another one, a reader only runs when an error is logged
+static void ring_record(const char *name, long level, const char *pathname,
+                        const char *funcname, long lineno, const char *msg, va_list ap)
+{
+    unsigned long slot = RING_CLAIM() % ring_size;
+    struct ring_entry *entry = &ring[slot];
+
+    entry->level = level;
+    ring_copy(entry->name, name, RING_NAME_SIZE);
+    ring_copy(entry->pathname, pathname, RING_PATH_SIZE);
+    ring_copy(entry->funcname, funcname, RING_NAME_SIZE);
+    entry->lineno = lineno;
+    vsnprintf(entry->msg, LOG_SIZE, msg, ap);
+}
+
+// Write out the messages recorded since the last dump, oldest first
+static void ring_dump(void)
+{
+    unsigned long head = ring_head;
+    unsigned long index = ring_tail;
+
+    if (head - index > ring_size)
+        index = head - ring_size;
+
+    if (index == head)
+        return;
+
+    fprintf(stderr, "Last %lu GPI log messages before the error:\n", head - index);
+    for (; index != head; index++) {
+        struct ring_entry *entry = &ring[index % ring_size];
+        log_to_stream(stderr, entry->name, entry->level, entry->pathname,
+                      entry->funcname, entry->lineno, entry->msg);
+    }
+    fflush(stderr);
+
+    ring_tail = head;
+}
 
 /**
  * @name    GPI logging
@@ -112,6 +231,21 @@ void gpi_log(const char *name, long level, const char *pathname, const char *fun
     va_list ap;
     int n;
 
+    if (level < local_level && !ring_size)
+        return;
+
+    if (ring_size) {
+        if (level >= GPIError)
+            ring_dump();
+
+        va_start(ap, msg);
+        ring_record(name, level, pathname, funcname, lineno, msg, ap);
+        va_end(ap);
+
+        if (level < local_level)
+            return;
+    }
+
     if (!pLogHandler) {
         if (level >= GPIInfo) {
             va_start(ap, msg);
@@ -122,46 +256,16 @@ void gpi_log(const char *name, long level, const char *pathname, const char *fun
                fprintf(stderr, "Log message construction failed\n");
             }
 
-            fprintf(stdout, "     -.--ns ");
-            fprintf(stdout, "%-9s", log_level(level));
-            fprintf(stdout, "%-35s", name);
-
-            n = strlen(pathname);
-            if (n > 20) {
-                fprintf(stdout, "..%18s:", (pathname + (n - 18)));
-            } else {
-                fprintf(stdout, "%20s:", pathname);
-            }
-
-            fprintf(stdout, "%-4ld", lineno);
-            fprintf(stdout, " in %-31s ", funcname);
-            fprintf(stdout, "%s", log_buff);
-            fprintf(stdout, "\n");
+            log_to_stream(stdout, name, level, pathname, funcname, lineno, log_buff);
         }
         return;
     }
 
-    if (level < local_level)
-        return;
-
     // Ignore truncation
     // calling args is level, filename, lineno, msg, function
     //
     PyGILState_STATE gstate = PyGILState_Ensure();
 
-    PyObject *check_args = PyTuple_New(1);
-    PyTuple_SetItem(check_args, 0, PyLong_FromLong(level));
-    PyObject *retuple = PyObject_CallObject(pLogFilter, check_args);
-
-    if (retuple != Py_True) {
-        Py_DECREF(check_args);
-        PyGILState_Release(gstate);
-        return;
-    }
-
-    Py_DECREF(retuple);
-    Py_DECREF(check_args);
-
     va_start(ap, msg);
     n = vsnprintf(log_buff, LOG_SIZE, msg, ap);
     va_end(ap);
@@ -173,15 +277,10 @@ void gpi_log(const char *name, long level, const char *pathname, const char *fun
     PyTuple_SetItem(call_args, 3, PyUnicode_FromString(log_buff));   // Note: This function steals a reference.
     PyTuple_SetItem(call_args, 4, PyUnicode_FromString(funcname));
 
-    retuple = PyObject_CallObject(pLogHandler, call_args);
-
-    if (retuple != Py_True) {
-        PyGILState_Release(gstate);
-        return;
-    }
+    PyObject *retuple = PyObject_CallObject(pLogHandler, call_args);
 
     Py_DECREF(call_args);
-    Py_DECREF(retuple);
+    Py_XDECREF(retuple);
 
     PyGILState_Release(gstate);
 }
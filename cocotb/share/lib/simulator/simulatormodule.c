@@ -62,6 +62,10 @@ struct sim_time {
 
 static struct sim_time cache_time;
 
+// Wall time spent executing the Python callbacks themselves, the rest of the
+// time in the Python context is spent in the GPI glue around them
+static double callback_time = 0.0;
+
 // Converter function for turning a Python long into a sim handle, such that it
 // can be used by PyArg_ParseTuple format O&.
 static int gpi_sim_hdl_converter(PyObject *o, gpi_sim_hdl *data)
@@ -146,7 +150,9 @@ int handle_gpi_callback(void *user_data)
     }
 
     // Call the callback
+    double callback_start = utils_timestamp();
     PyObject *pValue = PyObject_Call(callback_data_p->function, callback_data_p->args, callback_data_p->kwargs);
+    callback_time += utils_timestamp() - callback_start;
 
     // If the return value is NULL a Python exception has occurred
     // The best thing to do here is shutdown as any subsequent
@@ -835,6 +841,19 @@ static PyObject *get_sim_time(PyObject *self, PyObject *args)
     return pTuple;
 }
 
+// Returns a (simulator, python, gpi) tuple of the wall time in seconds spent
+// in the simulator kernel, in Python callbacks and in the GPI glue in between
+static PyObject *get_context_times(PyObject *self, PyObject *args)
+{
+    double sim_time;
+    double python_time;
+    double in_callback = callback_time;
+
+    utils_context_times(&sim_time, &python_time);
+
+    return Py_BuildValue("(ddd)", sim_time, in_callback, python_time - in_callback);
+}
+
 static PyObject *get_precision(PyObject *self, PyObject *args)
 {
     int32_t precision;
@@ -86,6 +86,7 @@ static PyObject *iterate(PyObject *self, PyObject *args);
 static PyObject *next(PyObject *self, PyObject *args);
 
 static PyObject *get_sim_time(PyObject *self, PyObject *args);
+static PyObject *get_context_times(PyObject *self, PyObject *args);
 static PyObject *get_precision(PyObject *self, PyObject *args);
 static PyObject *deregister_callback(PyObject *self, PyObject *args);
 
@@ -123,6 +124,7 @@ static PyMethodDef SimulatorMethods[] = {
 
     // FIXME METH_NOARGS => initialization from incompatible pointer type
     {"get_sim_time", get_sim_time, METH_VARARGS, "Get the current simulation time as an int tuple"},
+    {"get_context_times", get_context_times, METH_VARARGS, "Get the wall time spent in the simulator, in Python and in the GPI as a float tuple"},
     {"get_precision", get_precision, METH_VARARGS, "Get the precision of the simulator"},
     {"deregister_callback", deregister_callback, METH_VARARGS, "Deregister a callback"},
     
@@ -32,6 +32,8 @@
 
 #if defined(__linux__) || defined(__APPLE__)
 #include <dlfcn.h>
+#include <time.h>
+#include <sys/time.h>
 #else
 #include <windows.h>
 #endif
@@ -39,6 +41,82 @@
 // Tracks if we are in the context of Python or Simulator
 int is_python_context = 0;
 
+// Wall time accounting of the context switches
+static double last_switch = 0.0;
+static double time_in_simulator = 0.0;
+static double time_in_python = 0.0;
+
+double utils_timestamp(void)
+{
+#if ! defined(__linux__) && ! defined(__APPLE__)
+    static LARGE_INTEGER frequency;
+    LARGE_INTEGER counter;
+    if (!frequency.QuadPart) {
+        QueryPerformanceFrequency(&frequency);
+    }
+    QueryPerformanceCounter(&counter);
+    return (double)counter.QuadPart / (double)frequency.QuadPart;
+#elif defined(CLOCK_MONOTONIC)
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+#else
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return tv.tv_sec + tv.tv_usec * 1e-6;
+#endif
+}
+
+void to_python(void)
+{
+    double now;
+
+    if (is_python_context) {
+        fprintf(stderr, "FATAL: We are calling up again\n");
+        exit(1);
+    }
+    ++is_python_context;
+
+    now = utils_timestamp();
+    /* Time before the first call up belongs to simulator start-up */
+    if (last_switch != 0.0) {
+        time_in_simulator += now - last_switch;
+    }
+    last_switch = now;
+}
+
+void to_simulator(void)
+{
+    double now;
+
+    if (!is_python_context) {
+        fprintf(stderr, "FATAL: We have returned twice from python\n");
+        exit(1);
+    }
+    --is_python_context;
+
+    now = utils_timestamp();
+    time_in_python += now - last_switch;
+    last_switch = now;
+}
+
+void utils_context_times(double *sim_time, double *python_time)
+{
+    double now = utils_timestamp();
+
+    *sim_time = time_in_simulator;
+    *python_time = time_in_python;
+
+    /* Include the time spent in the current context so far */
+    if (last_switch != 0.0) {
+        if (is_python_context) {
+            *python_time += now - last_switch;
+        } else {
+            *sim_time += now - last_switch;
+        }
+    }
+}
+
 void* utils_dyn_open(const char* lib_name)
 {
     void *ret = NULL;
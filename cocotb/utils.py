@@ -29,7 +29,9 @@ from __future__ import print_function
 
 """Collection of handy functions."""
 
+import binascii
 import ctypes
+import difflib
 import math
 import os
 import sys
@@ -51,6 +53,63 @@ def get_python_integer_types():
     else:
         return (int, long)  # python 2
 
+
+if hasattr(int, "from_bytes"):
+    def int_from_bytes(data, big_endian=True):
+        """Convert a bytes-like object to an unsigned integer.
+
+        Args:
+            data: ``bytes``, ``bytearray`` or ``memoryview`` to convert.
+            big_endian (bool, optional): Whether the first byte is the most
+                significant one.
+        """
+        return int.from_bytes(data, "big" if big_endian else "little")
+
+    def int_to_bytes(value, length, big_endian=True):
+        """Convert an unsigned integer to *length* bytes.
+
+        Args:
+            value (int): The value to convert.
+            length (int): The number of bytes to return.
+            big_endian (bool, optional): Whether the first byte is the most
+                significant one.
+        """
+        return value.to_bytes(length, "big" if big_endian else "little")
+else:  # python 2
+    def int_from_bytes(data, big_endian=True):
+        data = bytes(bytearray(data))
+        if not data:
+            return 0
+        if not big_endian:
+            data = data[::-1]
+        return int(binascii.hexlify(data), 16)
+
+    def int_to_bytes(value, length, big_endian=True):
+        if not length:
+            return b""
+        data = binascii.unhexlify("%0*x" % (2 * length, value))
+        return data if big_endian else data[::-1]
+
+
+def byte_view(obj):
+    """Return a ``memoryview`` of the bytes of the bytes-like *obj* without
+    copying them, whatever the type of its items, e.g. of an
+    ``array.array('I')``.
+    """
+    try:
+        view = memoryview(obj)
+    except TypeError:
+        if sys.version_info[0] >= 3:
+            raise
+        view = None
+    if view is not None and view.itemsize == 1:
+        return view
+    if hasattr(view, "cast"):
+        return view.cast("B")
+    # Python 2 memoryviews can't be cast and array.array only has the old
+    # buffer interface, ctypes maps the bytes of both
+    return memoryview((ctypes.c_char * len(buffer(obj))).from_buffer(obj))
+
 # Simulator helper functions
 def get_sim_time(units=None):
     """Retrieves the simulation time from the simulator.
@@ -72,6 +131,18 @@ def get_sim_time(units=None):
 
     return result
 
+def get_context_times():
+    """Retrieves the wall-clock time accumulated on either side of the GPI.
+
+    Returns:
+        A ``(simulator, python, gpi)`` tuple of the time in seconds spent in
+        the simulator kernel, in Python callbacks and in the GPI glue
+        switching between the two, since the simulation started.
+    """
+    if simulator is None:
+        return (0.0, 0.0, 0.0)
+    return simulator.get_context_times()
+
 def get_time_from_sim_steps(steps, units):
     """Calculates simulation time in the specified *units* from the *steps* based
     on the simulator precision.
@@ -201,11 +272,14 @@ def _sane_color(x):
     return r
 
 
-def hexdump(x):
+def hexdump(x, max_lines=None):
     """Hexdump a buffer.
 
     Args:
-        x: Object that supports conversion via the ``str`` built-in.
+        x: A bytes-like object or an object that supports conversion
+            via the ``str`` built-in.
+        max_lines (int, optional): Truncate the dump after this many lines,
+            ``None`` for no limit.
 
     Returns:
         A string containing the hexdump.
@@ -223,8 +297,10 @@ def hexdump(x):
     """
     # adapted from scapy.utils.hexdump
     rs = ""
-    x = str(x)
+    x = _as_text(x)
     l = len(x)
+    if max_lines is not None and l > 16 * max_lines:
+        l = 16 * max_lines
     i = 0
     while i < l:
         rs += "%04x   " % i
@@ -238,15 +314,101 @@ def hexdump(x):
         rs += "  "
         rs += _sane_color(x[i:i + 16]) + "\n"
         i += 16
+    if l < len(x):
+        rs += "[... %d more bytes ...]\n" % (len(x) - l)
     return rs
 
 
-def hexdiffs(x, y):
+def _as_text(x):
+    """Convert a buffer to a string with one character per byte."""
+    if isinstance(x, str):
+        return x
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        # bytes() of a memoryview is its repr on python 2
+        return memoryview(x).tobytes().decode("latin-1")
+    return str(x)
+
+
+def _first_difference(x, y):
+    """Return the offset of the first difference between two strings."""
+    n = min(len(x), len(y))
+    lo = 0
+    # Compare ever smaller blocks, string comparison runs at C speed
+    block = 4096
+    while block:
+        while lo + block <= n and x[lo:lo + block] == y[lo:lo + block]:
+            lo += block
+        block //= 2
+    return lo
+
+
+def _diff_alignment(x, y, window, use_difflib):
+    """Align two strings, returning two equally long lists holding a single
+    character or an empty string for a gap.
+
+    The strings are aligned one window of at most *window* characters at a
+    time, so the cost is linear in their length. Windows of the same length
+    are compared by position when that shows no more differences than
+    :mod:`difflib`, which would rather turn a changed character in a run of
+    identical ones into a deletion and an insertion.
+    """
+    alignx = []
+    aligny = []
+    i = j = 0
+    while i < len(x) or j < len(y):
+        wx = x[i:i + window]
+        wy = y[j:j + window]
+        last = i + window >= len(x) and j + window >= len(y)
+        if use_difflib:
+            opcodes = difflib.SequenceMatcher(None, wx, wy, autojunk=False).get_opcodes()
+            changed = sum(max(i2 - i1, j2 - j1)
+                          for tag, i1, i2, j1, j2 in opcodes if tag != "equal")
+            if (len(wx) == len(wy) and
+                    sum(a != b for a, b in zip(wx, wy)) <= changed):
+                # Compared by position below
+                opcodes = []
+            elif not last:
+                # Stop after the last matching block, what follows is better
+                # aligned together with the next window
+                ends = [n for n, op in enumerate(opcodes) if op[0] == "equal"]
+                opcodes = opcodes[:ends[-1] + 1] if ends else []
+        else:
+            opcodes = []
+        if not opcodes:
+            n = min(len(wx), len(wy))
+            if last or not n:
+                opcodes = [("replace", 0, len(wx), 0, len(wy))]
+            else:
+                opcodes = [("replace", 0, n, 0, n)]
+        for tag, i1, i2, j1, j2 in opcodes:
+            n = max(i2 - i1, j2 - j1)
+            alignx.extend(wx[i1:i2])
+            alignx.extend([""] * (n - (i2 - i1)))
+            aligny.extend(wy[j1:j2])
+            aligny.extend([""] * (n - (j2 - j1)))
+        i += opcodes[-1][2]
+        j += opcodes[-1][4]
+    return alignx, aligny
+
+
+def hexdiffs(x, y, max_lines=100, window=1024, use_difflib=True):
     """Return a diff string showing differences between two binary strings.
 
+    Identical leading data is skipped up to the line before the first
+    difference. The rest is aligned block-wise, so large buffers can be
+    diffed in linear time.
+
     Args:
-        x: Object that supports conversion via the ``str`` built-in.
-        y: Object that supports conversion via the ``str`` built-in.
+        x: Object that supports conversion via the ``str`` built-in, or a
+            ``bytes``-like object.
+        y: Object that supports conversion via the ``str`` built-in, or a
+            ``bytes``-like object.
+        max_lines (int, optional): Truncate the diff after this many lines,
+            ``None`` for no limit.
+        window (int, optional): Number of bytes aligned at a time.
+        use_difflib (bool, optional): Align the data within a window with
+            :class:`difflib.SequenceMatcher`, so insertions and deletions are
+            shown as such. Otherwise bytes are only compared by position.
 
     Example:
 
@@ -256,11 +418,11 @@ def hexdiffs(x, y):
 
     .. code-block:: none
 
-        0000      746869732073686F 7274207468696E67 this short thing
-             0000 7468697320616C73 6F  2073686F7274 this also  short
+        0000      74686973           2073686F727420 this      short 
+             0000 7468697320616C73 6F2073686F7274   this also short 
+        000f      7468696E67                                   thing
 
     """
-    # adapted from scapy.utils.hexdiff
 
     def sane(x):
         r = ""
@@ -288,34 +450,18 @@ def hexdiffs(x, y):
 
     rs = ""
 
-    x = str(x)[::-1]
-    y = str(y)[::-1]
-    SUBST = 1
-    INSERT = 1
-    d = {}
-    d[-1, -1] = 0, (-1, -1)
-    for j in range(len(y)):
-        d[-1, j] = d[-1, j - 1][0] + INSERT, (-1, j - 1)
-    for i in range(len(x)):
-        d[i, -1] = d[i - 1, -1][0] + INSERT, (i - 1, -1)
-
-    for j in range(len(y)):
-        for i in range(len(x)):
-            d[i, j] = min((d[i-1, j-1][0] + SUBST*(x[i] != y[j]), (i-1, j-1)),
-                          (d[i - 1, j][0] + INSERT, (i - 1, j)),
-                          (d[i, j - 1][0] + INSERT, (i, j - 1)))
-
-    backtrackx = []
-    backtracky = []
-    i = len(x) - 1
-    j = len(y) - 1
-    while not (i == j == -1):
-        i2, j2 = d[i, j][1]
-        backtrackx.append(x[i2+1:i+1])
-        backtracky.append(y[j2+1:j+1])
-        i, j = i2, j2
-
-    x = y = i = 0
+    x = _as_text(x)
+    y = _as_text(y)
+
+    # Keep one line of context before the first difference
+    skip = max(_first_difference(x, y) // 16 - 1, 0) * 16
+    if skip:
+        rs += "[... %d identical bytes ...]\n" % skip
+    backtrackx, backtracky = _diff_alignment(x[skip:], y[skip:], window, use_difflib)
+
+    x = y = skip
+    i = 0
+    lines = 0
     colorize = { 0: lambda x: x,  # noqa
                 -1: lambda x: x,  # noqa
                  1: lambda x: x}  # noqa
@@ -391,6 +537,11 @@ def hexdiffs(x, y):
 
         rs += " " + cl + '\n'
 
+        lines += 1
+        if max_lines is not None and lines >= max_lines and i + 16 < l:
+            rs += "[... diff truncated after %d lines ...]\n" % lines
+            break
+
         if doy or not yy:
             doy = 0
             dox = 1
@@ -536,6 +687,72 @@ def reject_remaining_kwargs(name, kwargs):
         )
 
 
+class LogHistogram(object):
+    """Streaming histogram of non-negative integers with log-sized buckets.
+
+    As in an HDR histogram, every value is kept with *significant_bits* bits
+    of precision, so the memory used grows with the logarithm of the range of
+    the values rather than with their number.
+
+    Args:
+        significant_bits (int, optional): Precision of the recorded values.
+    """
+
+    def __init__(self, significant_bits=5):
+        self._bits = significant_bits
+        self._buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        """Add *value* to the histogram."""
+        if value < 0:
+            raise ValueError("Cannot record negative value %r" % (value,))
+        value = int(value)
+        shift = max(value.bit_length() - self._bits, 0)
+        bucket = (shift, value >> shift)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        """The mean of the recorded values, ``None`` if there are none."""
+        if not self.count:
+            return None
+        return float(self.total) / self.count
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket holding the given percentile
+        of the recorded values, ``None`` if there are none."""
+        if not self.count:
+            return None
+        threshold = percent / 100.0 * self.count
+        seen = 0
+        for shift, top in sorted(self._buckets, key=lambda b: b[1] << b[0]):
+            seen += self._buckets[(shift, top)]
+            if seen >= threshold:
+                return min(((top + 1) << shift) - 1, self.max)
+        return self.max
+
+    def summary(self):
+        """Return a dictionary with the count, min, mean, max and the 50th,
+        90th and 99th percentile of the recorded values."""
+        return {"count": self.count,
+                "min": self.min,
+                "mean": self.mean,
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "p99": self.percentile(99),
+                "max": self.max}
+
+
 if __name__ == "__main__":
     import random
     a = ""
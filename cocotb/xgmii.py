@@ -0,0 +1,185 @@
+"""
+Encoding and decoding of XGMII bus words.
+
+An XGMII bus carries *nbytes* lanes per clock cycle, each a data byte and
+a control bit. The bus is either interleaved, the control bit being the
+9th bit of each lane, or has all the data bytes followed by one control
+bit per lane in the MSBs.
+
+:class:`XGMIICodec` converts between whole bus words and ``(data, ctrl)``
+pairs, *data* being the bytes of the lanes in lane order and *ctrl* an
+integer with bit *i* set if lane *i* carries a control character. The
+bits are moved with a handful of precomputed mask and shift steps, so a
+word costs the same whatever its width.
+"""
+
+import struct
+import zlib
+
+from cocotb.utils import int_from_bytes, int_to_bytes
+
+XGMII_IDLE      = 0x07  # noqa
+XGMII_START     = 0xFB  # noqa
+XGMII_TERMINATE = 0xFD  # noqa
+
+# Preamble is technically supposed to be 7 bytes of 0x55 but it seems that it's
+# permissible for the start byte to replace one of the preamble bytes
+# see http://grouper.ieee.org/groups/802/3/10G_study/email/msg04647.html
+PREAMBLE_SFD = b"\x55\x55\x55\x55\x55\x55\xD5"
+
+
+def layer1(packet):
+    """Pad an Ethernet packet to 60 bytes, prepend the preamble and SFD and
+    append the FCS.
+
+    Args:
+        packet: The Ethernet packet as a bytes-like object.
+
+    Returns:
+        bytes: The layer 1 packet.
+    """
+    if isinstance(packet, (bytearray, memoryview)):
+        # bytes() of a memoryview is its repr on python 2
+        packet = memoryview(packet).tobytes()
+    else:
+        packet = bytes(packet)
+    if len(packet) < 60:
+        packet += b"\x00" * (60 - len(packet))
+    return (PREAMBLE_SFD + packet +
+            struct.pack("<I", zlib.crc32(packet) & 0xFFFFFFFF))
+
+
+def _compress_steps(sources, width):
+    """Return the ``(mask, shift)`` steps moving the *width* bit fields at
+    bit positions *sources* next to each other from bit 0 up.
+
+    Each field moves down by its distance to its target in power of two
+    steps, the smallest first, which never lets two fields overlap.
+    """
+    field = (1 << width) - 1
+    positions = list(sources)
+    distances = [pos - width * i for i, pos in enumerate(positions)]
+    steps = []
+    shift = 1
+    while any(d >= shift for d in distances):
+        mask = 0
+        for i, d in enumerate(distances):
+            if d & shift:
+                mask |= field << positions[i]
+                positions[i] -= shift
+        if mask:
+            steps.append((mask, shift))
+        shift <<= 1
+    return steps
+
+
+class XGMIICodec(object):
+    """Convert between XGMII bus words and lane bytes.
+
+    Args:
+        nbytes (int): The number of lanes, usually 8 for SDR and 4 for DDR.
+        interleaved (bool, optional): Whether the control bit of each lane
+            follows its data byte.
+
+    Example:
+
+    >>> codec = XGMIICodec(8)
+    >>> words = codec.encode(packet)    # drive one word per clock
+    >>> data, ctrl = codec.decode(words[1])
+    """
+
+    def __init__(self, nbytes, interleaved=True):
+        self.nbytes = nbytes
+        self.interleaved = interleaved
+
+        if interleaved:
+            data_pos = [9 * i for i in range(nbytes)]
+            ctrl_pos = [9 * i + 8 for i in range(nbytes)]
+        else:
+            data_pos = [8 * i for i in range(nbytes)]
+            ctrl_pos = [8 * nbytes + i for i in range(nbytes)]
+        self._data_mask = sum(0xff << pos for pos in data_pos)
+        self._ctrl_mask = sum(1 << pos for pos in ctrl_pos)
+        self._data_steps = _compress_steps(data_pos, 8)
+        self._ctrl_steps = _compress_steps(ctrl_pos, 1)
+        # Undoing the steps in reverse order spreads the fields out again
+        self._data_expand = [(mask >> shift, shift)
+                             for mask, shift in reversed(self._data_steps)]
+        self._ctrl_expand = [(mask >> shift, shift)
+                             for mask, shift in reversed(self._ctrl_steps)]
+
+        self.all_ctrl = (1 << nbytes) - 1
+        self.idle = self.encode_word(bytes(bytearray([XGMII_IDLE] * nbytes)),
+                                     self.all_ctrl)
+        self._lane0 = (0xff << data_pos[0]) | (1 << ctrl_pos[0])
+        self._start = (XGMII_START << data_pos[0]) | (1 << ctrl_pos[0])
+
+    def encode_word(self, data, ctrl):
+        """Build a bus word from the *nbytes* bytes of *data* and the
+        per-lane control bits *ctrl*."""
+        value = int_from_bytes(data, big_endian=False)
+        for mask, shift in self._data_expand:
+            value = (value & ~mask) | ((value & mask) << shift)
+        for mask, shift in self._ctrl_expand:
+            ctrl = (ctrl & ~mask) | ((ctrl & mask) << shift)
+        return value | ctrl
+
+    def decode_ctrl(self, value):
+        """Return the control bits of the bus word *value*, bit *i* for
+        lane *i*."""
+        ctrl = value & self._ctrl_mask
+        for mask, shift in self._ctrl_steps:
+            ctrl = (ctrl & ~mask) | ((ctrl & mask) >> shift)
+        return ctrl
+
+    def decode_data(self, value):
+        """Return the data bytes of the bus word *value* in lane order."""
+        data = value & self._data_mask
+        for mask, shift in self._data_steps:
+            data = (data & ~mask) | ((data & mask) >> shift)
+        return int_to_bytes(data, self.nbytes, big_endian=False)
+
+    def decode(self, value):
+        """Split the bus word *value* into ``(data, ctrl)``."""
+        return self.decode_data(value), self.decode_ctrl(value)
+
+    def is_start(self, value):
+        """Whether lane 0 of the bus word *value* holds a start character."""
+        return value & self._lane0 == self._start
+
+    def encode(self, packet, ifg=12):
+        """Encode a whole frame into the bus words to drive, one per clock.
+
+        The frame is *packet* with the preamble, SFD and FCS added by
+        :func:`layer1`, a start character in lane 0 of the first word and a
+        terminate character after the FCS. It is followed by idles filling
+        the last word and making up an inter-frame gap of at least *ifg*
+        lanes, counting the terminate.
+
+        Args:
+            packet: The Ethernet packet as a bytes-like object.
+            ifg (int, optional): The minimum inter-frame gap in lanes.
+
+        Returns:
+            list(int): The bus words.
+        """
+        nbytes = self.nbytes
+        frame = bytearray([XGMII_START]) + layer1(packet)
+        # The terminate and the idles up to the end of the word and the gap
+        length = len(frame)
+        gap = max(ifg, 1, nbytes - length % nbytes)
+        gap += -(length + gap) % nbytes
+        frame += bytearray([XGMII_TERMINATE]) + bytearray([XGMII_IDLE]) * (gap - 1)
+
+        view = memoryview(frame)
+        words = [self.encode_word(view[pos:pos + nbytes], 0)
+                 for pos in range(0, len(frame), nbytes)]
+
+        words[0] = self.encode_word(view[0:nbytes], 1)
+        first = length // nbytes
+        words[first] = self.encode_word(
+            view[first * nbytes:(first + 1) * nbytes],
+            self.all_ctrl & ~((1 << (length % nbytes)) - 1))
+        for i in range(first + 1, len(words)):
+            words[i] = self.idle
+        return words
@@ -79,6 +79,12 @@ class XUnitReporter(object):
         self.last_testcase = SubElement(testsuite, "testcase", **kwargs)
         return self.last_testcase
 
+    def add_properties(self, testcase=None):
+        if testcase is None:
+            testcase = self.last_testcase
+        self.last_properties = SubElement(testcase, "properties")
+        return self.last_properties
+
     def add_property(self, testsuite=None, **kwargs):
         if testsuite is None:
             testsuite = self.last_testsuite
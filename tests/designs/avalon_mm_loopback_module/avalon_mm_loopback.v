@@ -0,0 +1,74 @@
+// Connects Avalon-MM master ports straight through to slave ports, so that
+// a master and a memory model can talk to each other. "master"/"slave" have
+// no burstcount, "burst_master"/"burst_slave" do.
+
+module avalon_mm_loopback #(
+    parameter DATA_WIDTH = 32,
+    parameter ADDR_WIDTH = 32
+) (
+    input  wire                      clk,
+
+    input  wire [ADDR_WIDTH-1:0]     master_address,
+    input  wire                      master_read,
+    input  wire                      master_write,
+    input  wire [DATA_WIDTH-1:0]     master_writedata,
+    input  wire [DATA_WIDTH/8-1:0]   master_byteenable,
+    output wire [DATA_WIDTH-1:0]     master_readdata,
+    output wire                      master_readdatavalid,
+    output wire                      master_waitrequest,
+
+    output wire [ADDR_WIDTH-1:0]     slave_address,
+    output wire                      slave_read,
+    output wire                      slave_write,
+    output wire [DATA_WIDTH-1:0]     slave_writedata,
+    output wire [DATA_WIDTH/8-1:0]   slave_byteenable,
+    input  wire [DATA_WIDTH-1:0]     slave_readdata,
+    input  wire                      slave_readdatavalid,
+    input  wire                      slave_waitrequest,
+
+    input  wire [ADDR_WIDTH-1:0]     burst_master_address,
+    input  wire                      burst_master_read,
+    input  wire                      burst_master_write,
+    input  wire [DATA_WIDTH-1:0]     burst_master_writedata,
+    input  wire [DATA_WIDTH/8-1:0]   burst_master_byteenable,
+    input  wire [3:0]                burst_master_burstcount,
+    output wire [DATA_WIDTH-1:0]     burst_master_readdata,
+    output wire                      burst_master_readdatavalid,
+    output wire                      burst_master_waitrequest,
+
+    output wire [ADDR_WIDTH-1:0]     burst_slave_address,
+    output wire                      burst_slave_read,
+    output wire                      burst_slave_write,
+    output wire [DATA_WIDTH-1:0]     burst_slave_writedata,
+    output wire [DATA_WIDTH/8-1:0]   burst_slave_byteenable,
+    output wire [3:0]                burst_slave_burstcount,
+    input  wire [DATA_WIDTH-1:0]     burst_slave_readdata,
+    input  wire                      burst_slave_readdatavalid,
+    input  wire                      burst_slave_waitrequest
+);
+
+assign slave_address        = master_address;
+assign slave_read           = master_read;
+assign slave_write          = master_write;
+assign slave_writedata      = master_writedata;
+assign slave_byteenable     = master_byteenable;
+assign master_readdata      = slave_readdata;
+assign master_readdatavalid = slave_readdatavalid;
+assign master_waitrequest   = slave_waitrequest;
+
+assign burst_slave_address        = burst_master_address;
+assign burst_slave_read           = burst_master_read;
+assign burst_slave_write          = burst_master_write;
+assign burst_slave_writedata      = burst_master_writedata;
+assign burst_slave_byteenable     = burst_master_byteenable;
+assign burst_slave_burstcount     = burst_master_burstcount;
+assign burst_master_readdata      = burst_slave_readdata;
+assign burst_master_readdatavalid = burst_slave_readdatavalid;
+assign burst_master_waitrequest   = burst_slave_waitrequest;
+
+initial begin
+     $dumpfile("waveform.vcd");
+     $dumpvars;
+end
+
+endmodule
@@ -0,0 +1,34 @@
+// Connects a packetised Avalon-ST sink straight through to a source, so
+// that a testbench can drive "in" and check what a monitor sees on "out".
+
+module avalon_st_pkts_loopback #(
+    parameter DATA_WIDTH = 32,
+    parameter EMPTY_WIDTH = 2
+) (
+    input  wire                      clk,
+
+    input  wire                      in_valid,
+    input  wire [DATA_WIDTH-1:0]     in_data,
+    input  wire [EMPTY_WIDTH-1:0]    in_empty,
+    input  wire                      in_startofpacket,
+    input  wire                      in_endofpacket,
+
+    output wire                      out_valid,
+    output wire [DATA_WIDTH-1:0]     out_data,
+    output wire [EMPTY_WIDTH-1:0]    out_empty,
+    output wire                      out_startofpacket,
+    output wire                      out_endofpacket
+);
+
+assign out_valid         = in_valid;
+assign out_data          = in_data;
+assign out_empty         = in_empty;
+assign out_startofpacket = in_startofpacket;
+assign out_endofpacket   = in_endofpacket;
+
+initial begin
+     $dumpfile("waveform.vcd");
+     $dumpvars;
+end
+
+endmodule
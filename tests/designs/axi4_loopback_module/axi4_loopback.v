@@ -0,0 +1,119 @@
+// Connects an AXI4 master port "m_axi" straight through to a slave port
+// "s_axi", so that a master and a slave model can talk to each other
+
+module axi4_loopback #(
+    parameter DATA_WIDTH = 32,
+    parameter ADDR_WIDTH = 32,
+    parameter ID_WIDTH = 4
+) (
+    input  wire                      clk,
+
+    // Driven by the master model
+    input  wire                      m_axi_AWVALID,
+    output wire                      m_axi_AWREADY,
+    input  wire [ADDR_WIDTH-1:0]     m_axi_AWADDR,
+    input  wire [7:0]                m_axi_AWLEN,
+    input  wire [2:0]                m_axi_AWSIZE,
+    input  wire [1:0]                m_axi_AWBURST,
+    input  wire [2:0]                m_axi_AWPROT,
+    input  wire [ID_WIDTH-1:0]       m_axi_AWID,
+    input  wire                      m_axi_WVALID,
+    output wire                      m_axi_WREADY,
+    input  wire [DATA_WIDTH-1:0]     m_axi_WDATA,
+    input  wire [DATA_WIDTH/8-1:0]   m_axi_WSTRB,
+    input  wire                      m_axi_WLAST,
+    output wire                      m_axi_BVALID,
+    input  wire                      m_axi_BREADY,
+    output wire [1:0]                m_axi_BRESP,
+    output wire [ID_WIDTH-1:0]       m_axi_BID,
+    input  wire                      m_axi_ARVALID,
+    output wire                      m_axi_ARREADY,
+    input  wire [ADDR_WIDTH-1:0]     m_axi_ARADDR,
+    input  wire [7:0]                m_axi_ARLEN,
+    input  wire [2:0]                m_axi_ARSIZE,
+    input  wire [1:0]                m_axi_ARBURST,
+    input  wire [2:0]                m_axi_ARPROT,
+    input  wire [ID_WIDTH-1:0]       m_axi_ARID,
+    output wire                      m_axi_RVALID,
+    input  wire                      m_axi_RREADY,
+    output wire [DATA_WIDTH-1:0]     m_axi_RDATA,
+    output wire [1:0]                m_axi_RRESP,
+    output wire                      m_axi_RLAST,
+    output wire [ID_WIDTH-1:0]       m_axi_RID,
+
+    // Driven by the slave model
+    output wire                      s_axi_AWVALID,
+    input  wire                      s_axi_AWREADY,
+    output wire [ADDR_WIDTH-1:0]     s_axi_AWADDR,
+    output wire [7:0]                s_axi_AWLEN,
+    output wire [2:0]                s_axi_AWSIZE,
+    output wire [1:0]                s_axi_AWBURST,
+    output wire [2:0]                s_axi_AWPROT,
+    output wire [ID_WIDTH-1:0]       s_axi_AWID,
+    output wire                      s_axi_WVALID,
+    input  wire                      s_axi_WREADY,
+    output wire [DATA_WIDTH-1:0]     s_axi_WDATA,
+    output wire [DATA_WIDTH/8-1:0]   s_axi_WSTRB,
+    output wire                      s_axi_WLAST,
+    input  wire                      s_axi_BVALID,
+    output wire                      s_axi_BREADY,
+    input  wire [1:0]                s_axi_BRESP,
+    input  wire [ID_WIDTH-1:0]       s_axi_BID,
+    output wire                      s_axi_ARVALID,
+    input  wire                      s_axi_ARREADY,
+    output wire [ADDR_WIDTH-1:0]     s_axi_ARADDR,
+    output wire [7:0]                s_axi_ARLEN,
+    output wire [2:0]                s_axi_ARSIZE,
+    output wire [1:0]                s_axi_ARBURST,
+    output wire [2:0]                s_axi_ARPROT,
+    output wire [ID_WIDTH-1:0]       s_axi_ARID,
+    input  wire                      s_axi_RVALID,
+    output wire                      s_axi_RREADY,
+    input  wire [DATA_WIDTH-1:0]     s_axi_RDATA,
+    input  wire [1:0]                s_axi_RRESP,
+    input  wire                      s_axi_RLAST,
+    input  wire [ID_WIDTH-1:0]       s_axi_RID
+);
+
+assign s_axi_AWVALID = m_axi_AWVALID;
+assign m_axi_AWREADY = s_axi_AWREADY;
+assign s_axi_AWADDR  = m_axi_AWADDR;
+assign s_axi_AWLEN   = m_axi_AWLEN;
+assign s_axi_AWSIZE  = m_axi_AWSIZE;
+assign s_axi_AWBURST = m_axi_AWBURST;
+assign s_axi_AWPROT  = m_axi_AWPROT;
+assign s_axi_AWID    = m_axi_AWID;
+
+assign s_axi_WVALID  = m_axi_WVALID;
+assign m_axi_WREADY  = s_axi_WREADY;
+assign s_axi_WDATA   = m_axi_WDATA;
+assign s_axi_WSTRB   = m_axi_WSTRB;
+assign s_axi_WLAST   = m_axi_WLAST;
+
+assign m_axi_BVALID  = s_axi_BVALID;
+assign s_axi_BREADY  = m_axi_BREADY;
+assign m_axi_BRESP   = s_axi_BRESP;
+assign m_axi_BID     = s_axi_BID;
+
+assign s_axi_ARVALID = m_axi_ARVALID;
+assign m_axi_ARREADY = s_axi_ARREADY;
+assign s_axi_ARADDR  = m_axi_ARADDR;
+assign s_axi_ARLEN   = m_axi_ARLEN;
+assign s_axi_ARSIZE  = m_axi_ARSIZE;
+assign s_axi_ARBURST = m_axi_ARBURST;
+assign s_axi_ARPROT  = m_axi_ARPROT;
+assign s_axi_ARID    = m_axi_ARID;
+
+assign m_axi_RVALID  = s_axi_RVALID;
+assign s_axi_RREADY  = m_axi_RREADY;
+assign m_axi_RDATA   = s_axi_RDATA;
+assign m_axi_RRESP   = s_axi_RRESP;
+assign m_axi_RLAST   = s_axi_RLAST;
+assign m_axi_RID     = s_axi_RID;
+
+initial begin
+     $dumpfile("waveform.vcd");
+     $dumpvars;
+end
+
+endmodule
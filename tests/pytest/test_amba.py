@@ -0,0 +1,50 @@
+import random
+
+from cocotb.drivers.amba import AXI4Master
+
+
+def make_master(bus_bytes=4, max_burst=256):
+    """An AXI4Master with just the state needed to plan bursts."""
+    master = AXI4Master.__new__(AXI4Master)
+    master._bus_bytes = bus_bytes
+    master.max_burst = max_burst
+    return master
+
+
+def test_bursts_split_at_4k():
+    master = make_master()
+    assert list(master._bursts(0xff0, 0x40)) == [(0xff0, 0xff0, 0x1000),
+                                                 (0x1000, 0x1000, 0x1030)]
+
+
+def test_bursts_unaligned_ends():
+    master = make_master()
+    assert list(master._bursts(0x1001, 6)) == [(0x1000, 0x1001, 0x1007)]
+    assert list(master._bursts(0x1fff, 2)) == [(0x1ffc, 0x1fff, 0x2000),
+                                               (0x2000, 0x2000, 0x2001)]
+    assert list(master._bursts(0x10, 0)) == []
+
+
+def test_bursts_max_burst():
+    master = make_master(bus_bytes=8, max_burst=16)
+    assert list(master._bursts(0x4, 0x100)) == [(0x0, 0x4, 0x80),
+                                                (0x80, 0x80, 0x100),
+                                                (0x100, 0x100, 0x104)]
+
+
+def test_bursts_cover_transfer():
+    rng = random.Random(7)
+    for _ in range(1000):
+        bus_bytes = rng.choice([1, 2, 4, 8, 16, 32, 64, 128])
+        master = make_master(bus_bytes, rng.randint(1, 256))
+        address = rng.randrange(1 << 32)
+        length = rng.randint(1, 20000)
+        position = address
+        for aligned, first, end in master._bursts(address, length):
+            assert first == position and first < end
+            assert aligned % bus_bytes == 0 and aligned <= first
+            assert first - aligned < bus_bytes
+            assert aligned >> 12 == (end - 1) >> 12
+            assert end - aligned <= master.max_burst * bus_bytes
+            position = end
+        assert position == address + length
@@ -0,0 +1,75 @@
+"""Tests of the byte stream generators"""
+
+import itertools
+import random
+
+import pytest
+
+from cocotb.generators.byte import (get_bytes, incrementing_chunks,
+                                    random_chunks, repeating_chunks)
+from cocotb.utils import int_to_bytes
+
+SIZES = [0, 1, 5, 255, 256, 257, 1000, 3, 4096]
+
+
+def join(generator, sizes):
+    blocks = list(itertools.islice(generator, len(sizes)))
+    assert [len(block) for block in blocks] == sizes
+    return b"".join(blocks)
+
+
+def test_random_chunks_seed():
+    first = list(itertools.islice(random_chunks(SIZES, seed=1), len(SIZES)))
+    again = list(itertools.islice(random_chunks(SIZES, seed=1), len(SIZES)))
+    other = list(itertools.islice(random_chunks(SIZES, seed=2), len(SIZES)))
+    assert [len(block) for block in first] == SIZES
+    assert first == again
+    assert first != other
+
+
+def test_incrementing_chunks_continue():
+    data = join(incrementing_chunks(SIZES, increment=3), SIZES)
+    assert data == bytes(bytearray((3 * i) & 0xFF for i in range(len(data))))
+
+
+def test_repeating_chunks_continue():
+    pattern = b"abcdefg"
+    data = join(repeating_chunks(pattern, SIZES), SIZES)
+    assert data == (pattern * (len(data) // len(pattern) + 1))[:len(data)]
+    assert join(repeating_chunks([1, 2], 3), [3, 3]) == b"\x01\x02\x01\x02\x01\x02"
+
+
+def test_repeating_chunks_empty_pattern():
+    with pytest.raises(ValueError):
+        repeating_chunks(b"")
+
+
+def test_get_bytes():
+    assert get_bytes(3, iter("abcd")) == "abc"
+    assert get_bytes(3, iter([1, 2, 3, 4])) == b"\x01\x02\x03"
+    with pytest.raises(StopIteration):
+        get_bytes(5, iter([1, 2, 3]))
+
+
+def test_random_chunks_without_numpy():
+    # The default data only depends on the seed, not on what is installed
+    rng = random.Random(3)
+    expected = [int_to_bytes(rng.getrandbits(8 * size), size) if size else b""
+                for size in SIZES]
+    assert list(itertools.islice(random_chunks(SIZES, seed=3),
+                                 len(SIZES))) == expected
+
+
+def test_random_chunks_numpy():
+    try:
+        import numpy  # noqa
+    except ImportError:
+        with pytest.raises(ImportError):
+            random_chunks(numpy=True)
+        return
+    first = list(itertools.islice(random_chunks(SIZES, seed=1, numpy=True),
+                                  len(SIZES)))
+    again = list(itertools.islice(random_chunks(SIZES, seed=1, numpy=True),
+                                  len(SIZES)))
+    assert [len(block) for block in first] == SIZES
+    assert first == again
@@ -0,0 +1,34 @@
+"""Tests of the JSON lines log sink which don't need a simulator"""
+
+import io
+import json
+import logging
+import threading
+
+from cocotb.log import SimJSONLogHandler, render_json_log
+
+
+def test_records_from_other_threads_have_no_time(tmp_path):
+    filename = str(tmp_path / "log.json")
+    handler = SimJSONLogHandler(filename)
+    logger = logging.getLogger("cocotb.test_log")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        thread = threading.Thread(target=logger.warning,
+                                  args=("from %s", "a thread"))
+        thread.start()
+        thread.join()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    with open(filename) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 2
+    assert lines[1]["sim_steps"] is None
+    assert lines[1]["msg"] == "from a thread"
+
+    stream = io.StringIO()
+    render_json_log(filename, stream=stream)
+    assert stream.getvalue().split()[:2] == ["-", "WARNING"]
@@ -0,0 +1,44 @@
+"""Tests of the sparse memory model"""
+
+import array
+import io
+
+from cocotb.memory import SparseMemory
+
+
+def test_initialised_bytes():
+    mem = SparseMemory(page_size=16)
+    mem.write(0x12, b"ab")
+    assert mem.is_initialised(0x12, 2)
+    assert not mem.is_initialised(0x11)
+    assert not mem.is_initialised(0x12, 3)
+    assert not mem.is_initialised(0x0, 1)
+
+    mem.write_word(0x20, 0x44332211, 4, strobe=0b0101)
+    assert mem.is_initialised(0x20) and mem.is_initialised(0x22)
+    assert not mem.is_initialised(0x21) and not mem.is_initialised(0x23)
+
+    mem.write(0x2e, b"\x01" * 4)
+    assert mem.is_initialised(0x2e, 4)
+    assert not mem.is_initialised(0x2e, 5)
+
+
+def test_initialised_by_load_map_and_view():
+    mem = SparseMemory(page_size=16)
+    mem.load(0x4, io.BytesIO(b"x" * 20))
+    assert mem.is_initialised(0x4, 20)
+    assert not mem.is_initialised(0x3) and not mem.is_initialised(0x18)
+
+    mem.map(0x40, bytearray(32))
+    assert mem.is_initialised(0x40, 32)
+
+    mem.view(0x82, 4)[:] = b"abcd"
+    assert mem.is_initialised(0x82, 4) and not mem.is_initialised(0x81)
+
+
+def test_map_wide_items():
+    words = array.array("I", [0] * 8)
+    mem = SparseMemory(size=len(words) * words.itemsize, page_size=16)
+    mem.map(0, words)
+    mem.write_word(4, 0x12345678, 4)
+    assert words[1] == 0x12345678
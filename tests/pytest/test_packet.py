@@ -0,0 +1,59 @@
+"""Tests of the template UDP packet generator against scapy"""
+
+import pytest
+
+scapy = pytest.importorskip("scapy.all")
+
+from cocotb.generators.packet import _UDPTemplate, udp_template_packets
+
+
+def make_header():
+    return (scapy.Ether(src="02:00:00:00:00:01", dst="02:00:00:00:00:02") /
+            scapy.IP(src="10.0.0.1", dst="10.0.0.2", id=7) /
+            scapy.UDP(sport=1234, dport=5678))
+
+
+def scapy_packet(payload, ip_id=7, sport=1234, dport=5678):
+    packet = make_header()
+    packet[scapy.IP].id = ip_id
+    packet[scapy.UDP].sport = sport
+    packet[scapy.UDP].dport = dport
+    if payload:
+        packet = packet / scapy.Raw(payload)
+    return bytes(packet)
+
+
+@pytest.mark.parametrize("payload", [
+    b"", b"\x00", b"\x00" * 64, b"\xab", b"\x01\x02\x03", b"\xff" * 1473,
+    bytes(bytearray(range(256))) * 3 + b"\x5a",
+])
+def test_template_matches_scapy(payload):
+    template = _UDPTemplate(make_header())
+    assert template.packet(payload) == scapy_packet(payload)
+    assert (template.packet(payload, ip_id=0xffff, sport=0, dport=0xfffe) ==
+            scapy_packet(payload, ip_id=0xffff, sport=0, dport=0xfffe))
+
+
+def test_checksum_sum_zero():
+    # A payload word making the ones' complement sum 0xFFFF, whose
+    # checksum of 0 is sent as 0xFFFF
+    template = _UDPTemplate(make_header())
+    rest = template.pseudo + 2 * 10 + template.sport + template.dport
+    word = -rest % 0xFFFF
+    payload = bytes(bytearray([word >> 8, word & 0xFF]))
+    packet = template.packet(payload)
+    assert packet[template.udp + 6:template.udp + 8] == b"\xff\xff"
+    assert packet == scapy_packet(payload)
+
+
+def test_generated_packets_match_scapy():
+    packets = udp_template_packets(npackets=200, sizes=(0, 301),
+                                   ip_id=(0, 0xffff), sport=(0, 0xffff),
+                                   dport=(0, 0xffff), seed=5,
+                                   header=make_header())
+    for raw in packets:
+        packet = scapy.Ether(raw)
+        for layer in (scapy.IP, scapy.UDP):
+            del packet[layer].len
+            del packet[layer].chksum
+        assert bytes(packet) == raw
@@ -0,0 +1,33 @@
+"""Tests of the hexdump and hexdiffs helpers"""
+
+from cocotb.utils import _diff_alignment, hexdiffs, hexdump
+
+
+def test_hexdump_views():
+    assert hexdump(memoryview(b"abc")) == hexdump(b"abc")
+    assert hexdump(bytearray(b"abc")) == hexdump(b"abc")
+    assert "61 62 63" in hexdump(memoryview(b"abc"))
+
+
+def test_changed_byte_in_run_is_substituted():
+    x = "\x00" * 100
+    y = "\x00" * 50 + "\x01" + "\x00" * 49
+    alignx, aligny = _diff_alignment(x, y, 1024, True)
+    assert "" not in alignx and "" not in aligny
+    assert [n for n, (a, b) in enumerate(zip(alignx, aligny)) if a != b] == [50]
+
+
+def test_insertion_is_aligned():
+    x = "".join(chr(n) for n in range(100))
+    y = x[:40] + "XY" + x[40:98]
+    alignx, aligny = _diff_alignment(x, y, 1024, True)
+    assert alignx.count("") == 2 and aligny.count("") == 2
+    assert alignx[40:42] == ["", ""] and aligny[40:42] == ["X", "Y"]
+
+
+def test_hexdiffs_views():
+    x = b"\x00" * 100
+    y = bytearray(x)
+    y[50] = 1
+    assert hexdiffs(memoryview(x), memoryview(y)) == hexdiffs(x, bytes(y))
+    assert "<memory" not in hexdiffs(memoryview(x), memoryview(y))
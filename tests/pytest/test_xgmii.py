@@ -0,0 +1,105 @@
+"""Tests of the XGMII helpers which don't need a simulator"""
+
+import copy
+import pickle
+import random
+
+import pytest
+
+from cocotb.monitors.xgmii import LazyEther
+from cocotb.xgmii import (XGMIICodec, XGMII_IDLE, XGMII_START,
+                          XGMII_TERMINATE, layer1)
+
+CODECS = [(nbytes, interleaved) for nbytes in (4, 8, 16)
+          for interleaved in (True, False)]
+
+
+def test_lazy_ether_compares_bytes():
+    frame = LazyEther(b"abc")
+    assert frame == b"abc"
+    assert frame != b"abd"
+    assert frame == LazyEther(b"abc")
+    assert len(frame) == 3
+    assert bytes(frame) == b"abc"
+
+
+def test_lazy_ether_copy_and_pickle():
+    frame = LazyEther(b"abc")
+    for clone in (copy.copy(frame), copy.deepcopy(frame),
+                  pickle.loads(pickle.dumps(frame, 2))):
+        assert clone == frame
+        assert clone._packet is None
+
+
+def test_lazy_ether_private_names():
+    frame = LazyEther(b"abc")
+    try:
+        frame._missing
+    except AttributeError:
+        pass
+    else:
+        assert False, "private names must not be forwarded to the packet"
+
+
+def reference_word(nbytes, interleaved, data, ctrl):
+    """Build a bus word lane by lane."""
+    value = 0
+    for i, byte in enumerate(bytearray(data)):
+        bit = (ctrl >> i) & 1
+        if interleaved:
+            value |= (byte | bit << 8) << (9 * i)
+        else:
+            value |= byte << (8 * i) | bit << (8 * nbytes + i)
+    return value
+
+
+@pytest.mark.parametrize("nbytes, interleaved", CODECS)
+def test_codec_words(nbytes, interleaved):
+    codec = XGMIICodec(nbytes, interleaved)
+    rng = random.Random(nbytes)
+    for _ in range(200):
+        data = bytes(bytearray(rng.getrandbits(8) for _ in range(nbytes)))
+        ctrl = rng.getrandbits(nbytes)
+        value = codec.encode_word(data, ctrl)
+        assert value == reference_word(nbytes, interleaved, data, ctrl)
+        assert codec.decode(value) == (data, ctrl)
+
+
+@pytest.mark.parametrize("nbytes, interleaved", CODECS)
+def test_codec_frames(nbytes, interleaved):
+    codec = XGMIICodec(nbytes, interleaved)
+    rng = random.Random(nbytes)
+    for length in range(1, 200):
+        packet = bytes(bytearray(rng.getrandbits(8) for _ in range(length)))
+        ifg = rng.randint(12, 40)
+        words = codec.encode(packet, ifg=ifg)
+
+        lanes = []
+        for word in words:
+            data, ctrl = codec.decode(word)
+            lanes.extend((byte, (ctrl >> i) & 1)
+                         for i, byte in enumerate(bytearray(data)))
+        assert codec.is_start(words[0])
+        assert lanes[0] == (XGMII_START, 1)
+        end = next(i for i, (_, c) in enumerate(lanes) if i and c)
+        assert lanes[end] == (XGMII_TERMINATE, 1)
+        assert bytes(bytearray(b for b, _ in lanes[1:end])) == layer1(packet)
+        assert all(lane == (XGMII_IDLE, 1) for lane in lanes[end + 1:])
+        # The gap is at least ifg lanes, and no longer than needed to end
+        # a word
+        assert ifg <= len(lanes) - end < ifg + nbytes
+        assert all(word == codec.idle for word in words[end // nbytes + 1:])
+
+
+def test_layer1_views():
+    packet = bytes(bytearray(range(70)))
+    for view in (memoryview(packet), bytearray(packet)):
+        assert layer1(view) == layer1(packet)
+        assert layer1(view[:3]) == layer1(packet[:3])
+
+
+def test_lazy_ether_compares_views():
+    frame = LazyEther(b"abc")
+    assert frame == memoryview(b"abc")
+    assert frame == bytearray(b"abc")
+    assert frame != memoryview(b"abd")
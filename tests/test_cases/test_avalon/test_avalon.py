@@ -53,7 +53,7 @@ class BurstAvlReadTest(object):
         clk_gen = cocotb.fork(Clock(dut.clk, 10).start())
 
         # Bytes aligned memory
-        self.memdict = {value: value for value in range(0x1000)}
+        self.memdict = {value: value & 0xFF for value in range(0x1000)}
 
         self.avl32 = AvalonMemory(dut, "master", dut.clk,
                                   memory=self.memdict,
@@ -0,0 +1,103 @@
+"""
+Tests of the pipelined AvalonMaster against AvalonMemory
+"""
+
+import random
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.drivers.avalon import AvalonMaster, AvalonMemory
+from cocotb.memory import SparseMemory
+from cocotb.result import TestFailure
+from cocotb.triggers import ReadOnly, RisingEdge
+
+
+@cocotb.coroutine
+def most_pending(master, result):
+    """Record the largest number of reads waiting for their data."""
+    while True:
+        yield ReadOnly()
+        result[0] = max(result[0], len(master._pending))
+        yield RisingEdge(master.clock)
+
+
+@cocotb.test()
+def test_pipelined_reads(dut):
+    """Outstanding reads get their own readdatavalid beats, in order"""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    memory = SparseMemory()
+    words = [random.getrandbits(32) for _ in range(32)]
+    for n, word in enumerate(words):
+        memory.write_word(0x100 + 4 * n, word, 4)
+    AvalonMemory(dut, "slave", dut.clk, readlatency_min=1, readlatency_max=4,
+                 memory=memory)
+    master = AvalonMaster(dut, "master", dut.clk, pipelined=True)
+    pending = [0]
+    counter = cocotb.fork(most_pending(master, pending))
+
+    block = cocotb.fork(master.read_block(0x100, 16))
+    singles = [cocotb.fork(master.read(0x100 + 4 * n)) for n in range(16, 32)]
+    got = yield block.join()
+    for thread in singles:
+        value = yield thread.join()
+        got.append(value)
+    counter.kill()
+
+    if [value.integer for value in got] != words:
+        raise TestFailure("Read data out of order: %r" %
+                          [hex(value.integer) for value in got])
+    if pending[0] < 2:
+        raise TestFailure("Only %d reads were outstanding at once" % pending[0])
+
+
+@cocotb.test()
+def test_burst_blocks(dut):
+    """write_block and read_block bursts reach the right addresses"""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    memory = SparseMemory()
+    memory.write(0x1fc, b"\xaa" * 0x58)
+    AvalonMemory(dut, "burst_slave", dut.clk, memory=memory)
+    master = AvalonMaster(dut, "burst_master", dut.clk, pipelined=True)
+
+    # 20 words are written and read as bursts of 8, 8 and 4 words
+    words = [0x01010101 * n for n in range(1, 21)]
+    yield master.write_block(0x200, words)
+    stored = [memory.read_word(0x200 + 4 * n, 4) for n in range(20)]
+    if stored != words:
+        raise TestFailure("Burst writes stored %r" % [hex(w) for w in stored])
+    if memory.read(0x1fc, 4) != b"\xaa" * 4 or \
+            memory.read(0x250, 4) != b"\xaa" * 4:
+        raise TestFailure("Burst writes went past the block")
+
+    first = cocotb.fork(master.read_block(0x200, 20))
+    second = cocotb.fork(master.read_block(0x220, 4))
+    got = yield first.join()
+    tail = yield second.join()
+    if [value.integer for value in got] != words or \
+            [value.integer for value in tail] != words[8:12]:
+        raise TestFailure("Burst reads returned the wrong data")
+
+
+@cocotb.test()
+def test_dict_memory(dut):
+    """Single and burst writes are stored in a dictionary passed as memory"""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    memdict = {0x100: 0xaa}
+    burstdict = {}
+    AvalonMemory(dut, "slave", dut.clk, memory=memdict)
+    AvalonMemory(dut, "burst_slave", dut.clk, memory=burstdict)
+    master = AvalonMaster(dut, "master", dut.clk)
+    burst_master = AvalonMaster(dut, "burst_master", dut.clk, pipelined=True)
+
+    yield master.write(0x104, 0x44332211)
+    yield burst_master.write_block(0x200, [0x0d0c0b0a, 0x1d1c1b1a])
+    value = yield master.read(0x104)
+    if value.integer != 0x44332211:
+        raise TestFailure("Read back 0x%x" % value.integer)
+
+    if memdict != {0x100: 0xaa, 0x104: 0x11, 0x105: 0x22, 0x106: 0x33,
+                   0x107: 0x44}:
+        raise TestFailure("Dictionary holds %r" % memdict)
+    if [burstdict.get(0x200 + i) for i in range(8)] != \
+            [0x0a, 0x0b, 0x0c, 0x0d, 0x1a, 0x1b, 0x1c, 0x1d]:
+        raise TestFailure("Burst writes not in dictionary %r" % burstdict)
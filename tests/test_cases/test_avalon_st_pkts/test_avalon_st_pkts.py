@@ -0,0 +1,91 @@
+"""
+Tests of the packetised Avalon-ST monitor against the packet driver
+"""
+
+import random
+
+import cocotb
+from cocotb.binary import BinaryValue
+from cocotb.clock import Clock
+from cocotb.drivers.avalon import AvalonSTPkts as AvalonSTDriver
+from cocotb.monitors.avalon import AvalonSTPkts as AvalonSTMonitor
+from cocotb.result import TestFailure
+from cocotb.triggers import RisingEdge
+
+
+@cocotb.coroutine
+def idle(dut, cycles):
+    for _ in range(cycles):
+        yield RisingEdge(dut.clk)
+
+
+@cocotb.test()
+def test_zero_copy_packets(dut):
+    """Zero-copy views stay intact while later and larger packets arrive"""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    driver = AvalonSTDriver(dut, "in", dut.clk)
+    views = []
+    copies = []
+    AvalonSTMonitor(dut, "out", dut.clk, callback=views.append,
+                    zero_copy=True)
+    AvalonSTMonitor(dut, "out", dut.clk, callback=copies.append)
+
+    # 400 and 1001 bytes take more beats than the initial buffer holds
+    sizes = [1, 3, 4, 5, 256, 400, 7, 1001, 2]
+    packets = [bytes(bytearray(random.getrandbits(8) for _ in range(size)))
+               for size in sizes]
+    for packet in packets:
+        yield driver.send(packet)
+    yield idle(dut, 5)
+
+    if [type(view) for view in views] != [memoryview] * len(sizes):
+        raise TestFailure("Zero-copy monitor passed %r" %
+                          [type(view) for view in views])
+    if [view.tobytes() for view in views] != packets:
+        raise TestFailure("Zero-copy packets were overwritten")
+    if copies != packets:
+        raise TestFailure("Copied packets differ")
+
+
+@cocotb.coroutine
+def send_with_x(dut, beats):
+    """Drive (startofpacket, endofpacket, empty, binstr) beats."""
+    edge = RisingEdge(dut.clk)
+    data = BinaryValue(n_bits=len(dut.in_data), bigEndian=False)
+    for sop, eop, empty, binstr in beats:
+        data.binstr = binstr
+        dut.in_valid <= 1
+        dut.in_startofpacket <= sop
+        dut.in_endofpacket <= eop
+        dut.in_empty <= empty
+        dut.in_data <= data
+        yield edge
+    dut.in_valid <= 0
+    yield idle(dut, 3)
+
+
+def symbols(text):
+    return "".join("{:08b}".format(ord(char)) for char in text)
+
+
+@cocotb.test()
+def test_x_in_empty_symbols(dut):
+    """X's in the empty symbols of the last beat are ignored"""
+    dut.in_valid <= 0
+    cocotb.fork(Clock(dut.clk, 10).start())
+    yield idle(dut, 2)
+
+    received = []
+    monitor = AvalonSTMonitor(dut, "out", dut.clk, callback=received.append)
+    yield send_with_x(dut, [(1, 0, 0, symbols("abcd")),
+                            (0, 1, 3, symbols("e") + "x" * 24)])
+    monitor.kill()
+
+    # With the first symbol in the low order bits the empty ones are high
+    little = AvalonSTMonitor(dut, "out", dut.clk, callback=received.append,
+                             config={"firstSymbolInHighOrderBits": False})
+    yield send_with_x(dut, [(1, 1, 2, "x" * 16 + symbols("gf"))])
+    little.kill()
+
+    if received != [b"abcde", b"fg"]:
+        raise TestFailure("Received %r" % received)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Test to demonstrate functionality of the avalon basic streaming interface"""
 
+import itertools
 import logging
 import random
 import struct
@@ -10,26 +11,31 @@ import cocotb
 from cocotb.drivers import BitDriver
 from cocotb.drivers.avalon import AvalonST as AvalonSTDriver
 from cocotb.monitors.avalon import AvalonST as AvalonSTMonitor
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import ReadOnly, RisingEdge, Timer
 from cocotb.clock import Clock
 from cocotb.scoreboard import Scoreboard
-from cocotb.generators.bit import wave
+from cocotb.result import ReturnValue, TestFailure
+from cocotb.utils import get_sim_steps, get_sim_time
+from cocotb.generators.bit import wave, random_50_percent
 
 class AvalonSTTB(object):
     """Testbench for avalon basic stream"""
-    def __init__(self, dut):
+    def __init__(self, dut, valid_generator=None, playback=False):
         self.dut = dut
 
         self.clkedge = RisingEdge(dut.clk)
 
-        self.stream_in = AvalonSTDriver(self.dut, "asi", dut.clk)
+        self.stream_in = AvalonSTDriver(self.dut, "asi", dut.clk,
+                                        valid_generator=valid_generator,
+                                        playback=playback)
         self.stream_out = AvalonSTMonitor(self.dut, "aso", dut.clk)
         self.scoreboard = Scoreboard(self.dut, fail_immediately=True)
 
         self.expected_output = []
         self.scoreboard.add_interface(self.stream_out, self.expected_output)
 
-        self.backpressure = BitDriver(self.dut.aso_ready, self.dut.clk)
+        self.backpressure = BitDriver(self.dut.aso_ready, self.dut.clk,
+                                      playback=playback)
 
     @cocotb.coroutine
     def initialise(self):
@@ -65,3 +71,127 @@ def test_avalon_stream(dut):
         yield tb.clkedge
 
     raise tb.scoreboard.result
+
+
+@cocotb.test(expect_fail=False)
+def test_avalon_stream_playback(dut):
+    """Test stream of avalon data with precomputed valid and ready patterns"""
+
+    tb = AvalonSTTB(dut, valid_generator=random_50_percent(mean=4),
+                    playback=True)
+    yield tb.initialise()
+    tb.backpressure.start(wave())
+
+    for _ in range(20):
+        data = random.randint(0, 2**7 - 1)
+        yield tb.send_data(data)
+        yield tb.clkedge
+
+    for _ in range(50):
+        yield tb.clkedge
+
+    # Stopping the backpressure must stop its playback too
+    tb.backpressure.stop()
+    yield tb.clkedge
+    ready = int(dut.aso_ready.value)
+    for _ in range(200):
+        yield tb.clkedge
+        if int(dut.aso_ready.value) != ready:
+            raise TestFailure("aso_ready kept toggling after stop()")
+
+    raise tb.scoreboard.result
+
+
+def fixed_pattern(seed, nruns=40):
+    """(on, off) runs long enough for playback to use timed waits, ending
+    with the signal low"""
+    rng = random.Random(seed)
+    return ([(rng.randint(0, 12), rng.randint(0, 12)) for _ in range(nruns)] +
+            [(1, 5)])
+
+
+@cocotb.coroutine
+def record_handshake(dut, ncycles, trace):
+    """Record valid and ready at each of *ncycles* clock edges."""
+    edge = RisingEdge(dut.clk)
+    for _ in range(ncycles):
+        yield edge
+        yield ReadOnly()
+        trace.append((int(dut.asi_valid.value), int(dut.aso_ready.value)))
+
+
+@cocotb.coroutine
+def send_forever(driver):
+    for data in itertools.count():
+        yield driver.send(data & 0x7f)
+
+
+@cocotb.coroutine
+def run_patterns(dut, playback, ncycles=400):
+    """Drive fixed valid and ready patterns from reset, returning the
+    handshake trace and the time of its last edge."""
+    dut.asi_valid <= 0
+    dut.aso_ready <= 0
+    dut.reset <= 0
+    for _ in range(3):
+        yield RisingEdge(dut.clk)
+    dut.reset <= 1
+
+    ready = iter(fixed_pattern(2))
+    if not playback:
+        # The per-edge BitDriver needs a never ending generator
+        ready = itertools.chain(ready, itertools.repeat((0, 1)))
+    stream_in = AvalonSTDriver(dut, "asi", dut.clk,
+                               valid_generator=iter(fixed_pattern(1)),
+                               playback=playback)
+    backpressure = BitDriver(dut.aso_ready, dut.clk, playback=playback)
+    backpressure.start(ready)
+    sender = cocotb.fork(send_forever(stream_in))
+
+    trace = []
+    start = get_sim_time()
+    yield record_handshake(dut, ncycles, trace)
+    end = get_sim_time()
+
+    sender.kill()
+    stream_in.kill()
+    backpressure.stop()
+    if end - start != get_sim_steps(10 * ncycles, 'ns'):
+        raise TestFailure("%d cycles took %d steps" % (ncycles, end - start))
+    if playback and stream_in._invalid_cycles.period != get_sim_steps(10, 'ns'):
+        raise TestFailure("Playback did not measure the clock period")
+    raise ReturnValue(trace)
+
+
+@cocotb.test()
+def test_playback_matches_per_edge(dut):
+    """Valid and ready from playback match the per-edge drivers cycle for cycle"""
+    cocotb.fork(Clock(dut.clk, 10, units='ns').start())
+    per_edge = yield run_patterns(dut, playback=False)
+    playback = yield run_patterns(dut, playback=True)
+
+    if len(set(per_edge)) != 4:
+        raise TestFailure("Patterns did not cover every handshake state")
+    for cycle, (expected, got) in enumerate(zip(per_edge, playback)):
+        if expected != got:
+            raise TestFailure("Cycle %d: (valid, ready) is %r with playback, "
+                              "%r per edge" % (cycle, got, expected))
+
+
+@cocotb.coroutine
+def changing_clock(clk, periods):
+    for period in periods:
+        clk <= 1
+        yield Timer(period // 2, units='ns')
+        clk <= 0
+        yield Timer(period // 2, units='ns')
+
+
+@cocotb.test(expect_error=True)
+def test_playback_clock_change(dut):
+    """Playback fails at the end of a timed wait if the clock period changed"""
+    cocotb.fork(changing_clock(dut.clk, [10] * 10 + [14] * 200))
+    backpressure = BitDriver(dut.aso_ready, dut.clk, playback=True)
+    # The first run measures the period, the long one spans the change
+    backpressure.start(iter([(3, 3), (60, 5)]))
+    yield Timer(2000, units='ns')
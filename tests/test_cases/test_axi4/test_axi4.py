@@ -0,0 +1,337 @@
+"""
+Tests of the AXI4 master and slave models, connected back to back
+"""
+
+import array
+import os
+import struct
+
+import cocotb
+from cocotb.binary import BinaryValue
+from cocotb.clock import Clock
+from cocotb.drivers.amba import AXI4Master, AXI4PipelinedSlave, AXIProtocolError
+from cocotb.memory import SparseMemory
+from cocotb.result import ReturnValue, TestFailure
+from cocotb.triggers import ReadOnly, RisingEdge
+
+FIXED, INCR, WRAP = 0, 1, 2
+
+_MASTER_INPUTS = ["AWVALID", "AWADDR", "AWLEN", "AWSIZE", "AWBURST", "AWPROT",
+                  "AWID", "WVALID", "WDATA", "WSTRB", "WLAST", "ARVALID",
+                  "ARADDR", "ARLEN", "ARSIZE", "ARBURST", "ARPROT", "ARID"]
+
+
+def setup(dut, **kwargs):
+    """Start the clock and connect an AXI4PipelinedSlave to the DUT."""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    for name in _MASTER_INPUTS:
+        getattr(dut, "m_axi_" + name).setimmediatevalue(0)
+    dut.m_axi_BREADY.setimmediatevalue(1)
+    dut.m_axi_RREADY.setimmediatevalue(1)
+    memory = SparseMemory(size=1 << 32)
+    slave = AXI4PipelinedSlave(dut, "s_axi", dut.clk, memory, **kwargs)
+    return slave, memory
+
+
+def signal(dut, name):
+    return getattr(dut, "m_axi_" + name)
+
+
+@cocotb.coroutine
+def handshake(dut, valid, ready):
+    """Assert *valid* until *ready* is seen at a clock edge."""
+    valid <= 1
+    while True:
+        yield ReadOnly()
+        if ready.value:
+            break
+        yield RisingEdge(dut.clk)
+    yield RisingEdge(dut.clk)
+    valid <= 0
+
+
+@cocotb.coroutine
+def send_address(dut, prefix, address, beats, size, burst=INCR, id=0):
+    signal(dut, prefix + "ADDR") <= address
+    signal(dut, prefix + "LEN") <= beats - 1
+    signal(dut, prefix + "SIZE") <= size
+    signal(dut, prefix + "BURST") <= burst
+    signal(dut, prefix + "ID") <= id
+    yield handshake(dut, signal(dut, prefix + "VALID"),
+                    signal(dut, prefix + "READY"))
+
+
+@cocotb.coroutine
+def send_data(dut, addresses, values, size):
+    """Send one beat per address, *values* placed in the beat's byte lanes."""
+    for n, (address, value) in enumerate(zip(addresses, values)):
+        lane = address % 4
+        dut.m_axi_WDATA <= value << (8 * lane)
+        dut.m_axi_WSTRB <= ((1 << size) - 1) << lane
+        dut.m_axi_WLAST <= int(n == len(addresses) - 1)
+        yield handshake(dut, dut.m_axi_WVALID, dut.m_axi_WREADY)
+
+
+@cocotb.coroutine
+def collect(dut, prefix, count):
+    """Return ``(ID, data, last)`` of *count* beats of the B or R channel."""
+    beats = []
+    while len(beats) < count:
+        yield ReadOnly()
+        if signal(dut, prefix + "VALID").value and \
+                signal(dut, prefix + "READY").value:
+            if prefix == "R":
+                beats.append((dut.m_axi_RID.value.integer,
+                               dut.m_axi_RDATA.value.integer,
+                               dut.m_axi_RLAST.value.integer))
+            else:
+                beats.append((dut.m_axi_BID.value.integer, None, 1))
+        yield RisingEdge(dut.clk)
+    raise ReturnValue(beats)
+
+
+@cocotb.coroutine
+def write_burst(dut, address, addresses, values, size, burst=INCR, id=0):
+    response = cocotb.fork(collect(dut, "B", 1))
+    yield send_address(dut, "AW", address, len(addresses), size.bit_length() - 1,
+                       burst, id)
+    yield send_data(dut, addresses, values, size)
+    yield response.join()
+
+
+@cocotb.coroutine
+def read_burst(dut, address, addresses, size, burst=INCR, id=0):
+    """Return the values of the beats read from *addresses*."""
+    response = cocotb.fork(collect(dut, "R", len(addresses)))
+    yield send_address(dut, "AR", address, len(addresses),
+                       size.bit_length() - 1, burst, id)
+    beats = yield response.join()
+    if [last for _, _, last in beats] != [0] * (len(beats) - 1) + [1]:
+        raise TestFailure("RLAST not on the last beat of %r" % (beats,))
+    mask = (1 << (8 * size)) - 1
+    raise ReturnValue([(data >> (8 * (a % 4))) & mask
+                       for a, (_, data, _) in zip(addresses, beats)])
+
+
+@cocotb.test()
+def test_burst_types(dut):
+    """FIXED, WRAP and narrow INCR bursts reach the right bytes"""
+    slave, memory = setup(dut)
+    memory.write(0x2000, b"\xaa" * 0x30)
+    yield RisingEdge(dut.clk)
+
+    yield write_burst(dut, 0x2001, [0x2001] * 4, [1, 2, 3, 4], 1, FIXED)
+    if memory.read(0x2000, 4) != b"\xaa\x04\xaa\xaa":
+        raise TestFailure("FIXED burst wrote %r" % memory.read(0x2000, 4))
+
+    wrapped = [0x2018, 0x201c, 0x2010, 0x2014]
+    yield write_burst(dut, 0x2018, wrapped,
+                      [0x11111111, 0x22222222, 0x33333333, 0x44444444], 4, WRAP)
+    expected = b"\x33" * 4 + b"\x44" * 4 + b"\x11" * 4 + b"\x22" * 4
+    if memory.read(0x2010, 16) != expected:
+        raise TestFailure("WRAP burst wrote %r" % memory.read(0x2010, 16))
+    values = yield read_burst(dut, 0x2018, wrapped, 4, WRAP)
+    if values != [0x11111111, 0x22222222, 0x33333333, 0x44444444]:
+        raise TestFailure("WRAP burst read %r" % values)
+
+    narrow = [0x2022, 0x2024, 0x2026, 0x2028]
+    yield write_burst(dut, 0x2022, narrow, [0x0102, 0x0304, 0x0506, 0x0708], 2)
+    expected = b"\xaa\xaa\x02\x01\x04\x03\x06\x05\x08\x07\xaa\xaa"
+    if memory.read(0x2020, 12) != expected:
+        raise TestFailure("Narrow burst wrote %r" % memory.read(0x2020, 12))
+    values = yield read_burst(dut, 0x2022, narrow, 2)
+    if values != [0x0102, 0x0304, 0x0506, 0x0708]:
+        raise TestFailure("Narrow burst read %r" % values)
+
+
+@cocotb.test()
+def test_reorder(dut):
+    """Responses are reordered between IDs but stay in order for each ID"""
+    slave, memory = setup(dut, latency=(1, 20), reorder=True)
+    for n in range(24):
+        memory.write_word(0x3000 + 4 * n, n, 4)
+    yield RisingEdge(dut.clk)
+
+    response = cocotb.fork(collect(dut, "R", 24))
+    for n in range(24):
+        yield send_address(dut, "AR", 0x3000 + 4 * n, 1, 2, id=n % 3)
+    beats = yield response.join()
+
+    order = [data for _, data, _ in beats]
+    if sorted(order) != list(range(24)):
+        raise TestFailure("Wrong data returned: %r" % order)
+    for id, data, _ in beats:
+        if data % 3 != id:
+            raise TestFailure("Data %d returned with ID %d" % (data, id))
+    for id in range(3):
+        if [d for d in order if d % 3 == id] != list(range(id, 24, 3)):
+            raise TestFailure("Responses to ID %d out of order: %r" %
+                              (id, order))
+    if order == list(range(24)):
+        raise TestFailure("Responses to different IDs were not reordered")
+
+
+@cocotb.test()
+def test_max_outstanding(dut):
+    """AWREADY and ARREADY drop while max_outstanding responses are pending"""
+    slave, memory = setup(dut, max_outstanding=2)
+    dut.m_axi_BREADY <= 0
+    dut.m_axi_RREADY <= 0
+    yield RisingEdge(dut.clk)
+
+    @cocotb.coroutine
+    def writes():
+        for n in range(3):
+            yield send_address(dut, "AW", 0x4000 + 4 * n, 1, 2)
+            yield send_data(dut, [0x4000 + 4 * n], [n + 1], 4)
+
+    @cocotb.coroutine
+    def reads():
+        for n in range(3):
+            yield send_address(dut, "AR", 0x4000 + 4 * n, 1, 2)
+
+    write_thread = cocotb.fork(writes())
+    read_thread = cocotb.fork(reads())
+    for _ in range(20):
+        yield RisingEdge(dut.clk)
+    if slave._writes_outstanding != 2 or slave._reads_outstanding != 2:
+        raise TestFailure("%d writes and %d reads accepted, expected 2 each" %
+                          (slave._writes_outstanding,
+                           slave._reads_outstanding))
+    yield ReadOnly()
+    if dut.m_axi_AWREADY.value or dut.m_axi_ARREADY.value:
+        raise TestFailure("Ready asserted with 2 responses outstanding")
+
+    yield RisingEdge(dut.clk)
+    dut.m_axi_BREADY <= 1
+    dut.m_axi_RREADY <= 1
+    yield write_thread.join()
+    yield read_thread.join()
+    for _ in range(10):
+        yield RisingEdge(dut.clk)
+    if slave._writes_outstanding or slave._reads_outstanding:
+        raise TestFailure("Responses still outstanding after they were taken")
+    if memory.read(0x4000, 12) != b"\x01\0\0\0\x02\0\0\0\x03\0\0\0":
+        raise TestFailure("Writes stored %r" % memory.read(0x4000, 12))
+
+
+@cocotb.test()
+def test_master_transfers(dut):
+    """AXI4Master writes and reads unaligned buffers across 4KB pages"""
+    slave, memory = setup(dut, latency=(1, 4))
+    master = AXI4Master(dut, "m_axi", dut.clk)
+    memory.write(0x5000 - 8, b"\xaa" * 0x1100)
+
+    data = os.urandom(0x1005)
+    yield master.write(0x5000 - 3, data)
+    if memory.read(0x5000 - 3, len(data)) != data:
+        raise TestFailure("Written data differs")
+    if memory.read(0x5000 - 8, 5) != b"\xaa" * 5 or \
+            memory.read(0x6002, 6) != b"\xaa" * 6:
+        raise TestFailure("Bytes outside the unaligned ends were written")
+    got = yield master.read(0x5000 - 3, len(data))
+    if got != data:
+        raise TestFailure("Read data differs")
+
+    words = array.array("I", range(100))
+    yield master.write(0x7002, words)
+    got = yield master.read(0x7002, 400)
+    if got != struct.pack("=100I", *range(100)):
+        raise TestFailure("array.array not written as its bytes")
+
+
+@cocotb.test()
+def test_master_max_outstanding(dut):
+    """AXI4Master keeps at most max_outstanding bursts in flight"""
+    slave, memory = setup(dut, latency=8)
+    master = AXI4Master(dut, "m_axi", dut.clk, max_outstanding=3, max_burst=4)
+    in_flight = {"AW": 0, "AR": 0}
+    most = {"AW": 0, "AR": 0}
+
+    @cocotb.coroutine
+    def count():
+        while True:
+            yield ReadOnly()
+            for prefix, response in (("AW", "B"), ("AR", "R")):
+                if signal(dut, prefix + "VALID").value and \
+                        signal(dut, prefix + "READY").value:
+                    in_flight[prefix] += 1
+                if signal(dut, response + "VALID").value and \
+                        signal(dut, response + "READY").value and \
+                        (response == "B" or dut.m_axi_RLAST.value):
+                    in_flight[prefix] -= 1
+                most[prefix] = max(most[prefix], in_flight[prefix])
+            yield RisingEdge(dut.clk)
+
+    counter = cocotb.fork(count())
+    data = os.urandom(256)
+    yield master.write(0x8000, data)
+    got = yield master.read(0x8000, len(data))
+    counter.kill()
+    if got != data:
+        raise TestFailure("Read data differs")
+    if most != {"AW": 3, "AR": 3}:
+        raise TestFailure("Expected 3 bursts in flight, saw %r" % most)
+
+
+@cocotb.coroutine
+def error_responder(dut, resp):
+    """Answer every burst on the slave port with *resp*."""
+    bus = dict((name, getattr(dut, "s_axi_" + name)) for name in
+               ["AWREADY", "WREADY", "ARREADY", "BVALID", "BRESP", "BID",
+                "RVALID", "RRESP", "RLAST", "RDATA", "RID"])
+    for name in ["AWREADY", "WREADY", "ARREADY"]:
+        bus[name] <= 1
+    for name in ["BVALID", "RVALID", "RLAST", "RDATA", "BID", "RID"]:
+        bus[name] <= 0
+    reads = []
+    while True:
+        yield ReadOnly()
+        wlast = dut.s_axi_WVALID.value and dut.s_axi_WLAST.value
+        if dut.s_axi_ARVALID.value:
+            reads.append(dut.s_axi_ARLEN.value.integer + 1)
+        yield RisingEdge(dut.clk)
+        bus["BVALID"] <= int(bool(wlast))
+        if resp is not None:
+            bus["BRESP"] <= resp
+            bus["RRESP"] <= resp
+        if reads:
+            reads[0] -= 1
+            bus["RVALID"] <= 1
+            bus["RLAST"] <= int(reads[0] == 0)
+            if not reads[0]:
+                reads.pop(0)
+        else:
+            bus["RVALID"] <= 0
+            bus["RLAST"] <= 0
+
+
+@cocotb.test()
+def test_master_errors(dut):
+    """AXI4Master raises on error responses and releases its locks"""
+    cocotb.fork(Clock(dut.clk, 10).start())
+    master = AXI4Master(dut, "m_axi", dut.clk)
+    responder = cocotb.fork(error_responder(dut, 2))    # SLVERR
+
+    for transfer in (master.write(0x9000, b"abcdefgh"),
+                     master.read(0x9000, 8)):
+        try:
+            yield transfer
+        except AXIProtocolError:
+            pass
+        else:
+            raise TestFailure("Error response did not raise")
+    responder.kill()
+
+    # A response which can't be decoded fails inside the transfer, which
+    # must still let the next one start
+    cocotb.fork(error_responder(dut, None))
+    dut.s_axi_BRESP <= BinaryValue("xx")
+    try:
+        yield master.write(0x9000, b"abcd")
+    except ValueError:
+        pass
+    else:
+        raise TestFailure("Undefined BRESP did not raise")
+    if master.write_busy.locked or master._writes_in_flight:
+        raise TestFailure("Failed write left the master busy")
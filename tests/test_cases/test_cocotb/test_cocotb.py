@@ -1064,5 +1064,52 @@ def test_writes_have_taken_effect_after_readwrite(dut):
     assert dut.stream_in_data.value == 2
 
 
+@cocotb.test(expect_fail=True, timeout=1, timeout_unit='us')
+def test_sim_timeout(dut):
+    """Test that a test exceeding its simulation timeout is failed"""
+    clk_gen = cocotb.fork(Clock(dut.clk, 100).start())
+    yield Timer(10, units='us')
+    raise TestError("Simulation timeout did not fire")
+
+
+@cocotb.test(expect_fail=True, wall_timeout=1.0)
+def test_wall_timeout(dut):
+    """Test that a test exceeding its wall-clock timeout is failed"""
+    clk_gen = cocotb.fork(Clock(dut.clk, 100).start())
+    never = Event("never")
+    yield never.wait()
+
+
+@cocotb.test(timeout=10, timeout_unit='us', wall_timeout=60.0)
+def test_timeout_not_reached(dut):
+    """Test that timeouts are disarmed when the test completes"""
+    yield Timer(1, units='us')
+
+
+@cocotb.test()
+def test_timeout_from_previous_test(dut):
+    """Test that the timeouts of the previous test do not fire"""
+    yield Timer(20, units='us')
+
+
+@cocotb.test()
+def test_lazy_log_message(dut):
+    """Test that lazy log messages are only built when they are emitted"""
+    from cocotb.log import SimLog, LazyMessage
+    calls = []
+
+    def build(text):
+        calls.append(text)
+        return text
+
+    log = SimLog("cocotb.test_lazy_log_message")
+    log.setLevel(logging.INFO)
+    log.debug("Not emitted: %s", LazyMessage(build, "debug"))
+    log.info("Emitted: %s", LazyMessage(build, "info"))
+    if calls != ["info"]:
+        raise TestFailure("Unexpected lazy message calls: %r" % calls)
+    yield Timer(1)
+
+
 if sys.version_info[:2] >= (3, 5):
     from test_cocotb_35 import *
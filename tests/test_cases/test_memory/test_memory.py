@@ -0,0 +1,73 @@
+"""
+Tests of the sparse memory model
+"""
+
+import array
+import os
+import time
+
+import cocotb
+from cocotb.memory import SparseMemory
+from cocotb.result import TestFailure
+from cocotb.triggers import Timer
+
+
+@cocotb.test()
+def test_sparse_access(dut):
+    """Accesses across pages, strobes and views"""
+    mem = SparseMemory(page_size=16)
+    data = bytes(bytearray(range(40)))
+    mem.write(10, data)
+    if mem.read(10, 40) != data or mem.allocated != 64:
+        raise TestFailure("Write across pages read back %r" % mem.read(10, 40))
+    if mem.read(1 << 40, 4) != b"\x00" * 4 or mem.is_initialised(1 << 40):
+        raise TestFailure("Unwritten memory does not read as the fill value")
+
+    mem.write_word(0x100, 0x44332211, 4, strobe=0b1010)
+    if mem.read_word(0x100, 4) != 0x44002200:
+        raise TestFailure("Strobe not honoured: 0x%x" % mem.read_word(0x100, 4))
+
+    view = mem.view(0x104, 4)
+    view[0:4] = b"abcd"
+    if mem.read(0x104, 4) != b"abcd":
+        raise TestFailure("View did not write through to the memory")
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_load_and_map(dut):
+    """Files are loaded into pages and buffers are accessed in place"""
+    filename = os.path.abspath("test_load_and_map.bin")
+    contents = os.urandom(10000)
+    with open(filename, "wb") as f:
+        f.write(contents)
+
+    mem = SparseMemory(size=1 << 32)
+    if mem.load(0xFFFF0000, filename) != len(contents):
+        raise TestFailure("Wrong number of bytes loaded")
+    if mem.read(0xFFFF0000, len(contents)) != contents:
+        raise TestFailure("Loaded contents differ")
+
+    backing = array.array('B', [0] * 8192)
+    mem.map(0x1000, backing)
+    mem.write(0x1ffe, b"\x01\x02\x03\x04")
+    if list(backing[0xffe:0x1002]) != [1, 2, 3, 4]:
+        raise TestFailure("Mapped buffer was not written in place")
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_benchmark(dut):
+    """Write and read back 64MB scattered over a 4GB address space"""
+    mem = SparseMemory(size=1 << 32)
+    block = os.urandom(1 << 16)
+    start = time.time()
+    for i in range(1024):
+        mem.write(i * 0x400000, block)
+    for i in range(1024):
+        if mem.read(i * 0x400000, len(block)) != block:
+            raise TestFailure("Block %d differs" % i)
+    elapsed = time.time() - start
+    dut._log.info("Wrote and read 64MB in %.2fs using %d bytes" %
+                  (elapsed, mem.allocated))
+    yield Timer(1)
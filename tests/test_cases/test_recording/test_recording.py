@@ -0,0 +1,138 @@
+"""
+Tests of recording transactions and replaying them through a driver
+"""
+
+import os
+
+import cocotb
+from cocotb.drivers import Driver
+from cocotb.monitors import Monitor
+from cocotb.recording import ReplayDriver, TransactionReader, TransactionRecorder
+from cocotb.result import TestFailure
+from cocotb.triggers import Event, Timer
+from cocotb.utils import get_sim_time, get_sim_steps
+
+
+class DirectMonitor(Monitor):
+    """Monitor the test feeds transactions to directly"""
+
+    @cocotb.coroutine
+    def _monitor_recv(self):
+        yield Event().wait()
+
+
+class TimestampDriver(Driver):
+    """Driver remembering when each transaction was sent"""
+
+    def __init__(self):
+        self.sent = []
+        Driver.__init__(self)
+
+    @cocotb.coroutine
+    def _driver_send(self, transaction, sync=True):
+        self.sent.append((get_sim_time(), transaction))
+        yield Timer(1)
+
+
+@cocotb.test()
+def test_record_and_replay(dut):
+    """Transactions are replayed at the times they were recorded"""
+    filename = os.path.abspath("test_record_and_replay.rec")
+    transactions = [b"\x00\x01\x02", u"text", {"addr": 4, "data": 0x55}, 42]
+
+    monitor = DirectMonitor()
+    driver = TimestampDriver()
+    recorder = TransactionRecorder(filename, chunk=2)
+    recorder.record_monitor(monitor, name="mon")
+    recorder.record_driver(driver, name="drv")
+    start = get_sim_time()
+    for transaction in transactions:
+        yield Timer(10, units='ns')
+        monitor._recv(transaction)
+    driver.append("stimulus")
+    yield Timer(10, units='ns')
+    recorder.close()
+
+    records = list(TransactionReader(filename))
+    if [r[2] for r in records] != transactions + ["stimulus"]:
+        raise TestFailure("Wrong transactions recorded: %r" % records)
+
+    replayed = TimestampDriver()
+    yield Timer(3, units='ns')
+    replay_start = get_sim_time()
+    yield ReplayDriver(replayed, filename, channel="mon").start().join()
+    yield Timer(10, units='ns')
+
+    offset = replay_start - start
+    for (time, transaction), (recorded, _, expected) in zip(replayed.sent,
+                                                             records):
+        if transaction != expected or time - offset - recorded > get_sim_steps(1):
+            raise TestFailure("Replayed %r at %d, recorded %r at %d" %
+                              (transaction, time - offset, expected, recorded))
+    if len(replayed.sent) != len(transactions):
+        raise TestFailure("Replayed %d transactions" % len(replayed.sent))
+
+
+@cocotb.test()
+def test_send_stream(dut):
+    """A generator is sent back to back and recorded lazily"""
+    filename = os.path.abspath("test_send_stream.rec")
+    pulled = []
+
+    def transactions(n):
+        for i in range(n):
+            pulled.append(i)
+            yield i
+
+    driver = TimestampDriver()
+    recorder = TransactionRecorder(filename)
+    recorder.record_driver(driver)
+    stream = driver.send_stream(transactions(1000), prefetch=8)
+    yield Timer(10)
+    if len(pulled) - len(driver.sent) > 8:
+        raise TestFailure("Pulled %d transactions ahead of the %d sent" %
+                          (len(pulled), len(driver.sent)))
+    sent = yield stream.join()
+    recorder.close()
+
+    if sent != 1000 or [t for _, t in driver.sent] != list(range(1000)):
+        raise TestFailure("Stream was not sent in order")
+    times = [time for time, _ in driver.sent]
+    if times[-1] - times[0] != 999 * get_sim_steps(1):
+        raise TestFailure("Stream was not sent back to back")
+    if [t for _, _, t in TransactionReader(filename)] != list(range(1000)):
+        raise TestFailure("Stream was not recorded")
+
+
+@cocotb.test()
+def test_clear_stream(dut):
+    """Joining a stream dropped by clear() returns"""
+    driver = TimestampDriver()
+    driver.append("first")
+    stream = driver.send_stream(range(10))
+    driver.clear()
+    sent = yield stream.join()
+    yield Timer(10)
+    if sent != 0 or driver.sent:
+        raise TestFailure("Cleared stream sent %d transactions" % sent)
+
+
+@cocotb.test()
+def test_flush_at_test_end(dut):
+    """Records still buffered when a test ends are written to the file"""
+    recorder = TransactionRecorder(os.path.abspath("test_flush_at_test_end.rec"))
+    monitor = DirectMonitor()
+    recorder.record_monitor(monitor, name="mon")
+    for transaction in [memoryview(b"view"), bytearray(b"array")]:
+        monitor._recv(transaction)
+        yield Timer(1)
+
+
+@cocotb.test()
+def test_flushed_records(dut):
+    """The records of the previous test were flushed, views as their bytes"""
+    records = TransactionReader(os.path.abspath("test_flush_at_test_end.rec"))
+    transactions = [t for _, _, t in records]
+    if transactions != [b"view", b"array"]:
+        raise TestFailure("Recorded %r" % transactions)
+    yield Timer(1)
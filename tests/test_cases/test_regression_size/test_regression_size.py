@@ -0,0 +1,52 @@
+"""
+Benchmark of the per-test overhead of a large TestFactory regression
+
+Every test logs a few messages; only the running test may capture them, so
+the cost of a log message must not grow with the number of queued tests.
+
+Only a few tests are generated by default, set REGRESSION_SIZE to run the
+benchmark, e.g. ``make REGRESSION_SIZE=2000``.
+"""
+
+import os
+import time
+
+import cocotb
+from cocotb.decorators import RunningTest
+from cocotb.regression import TestFactory
+from cocotb.result import TestFailure
+from cocotb.triggers import Timer
+
+NTESTS = int(os.getenv("REGRESSION_SIZE", "20"))
+
+_timing = {}
+
+
+@cocotb.coroutine
+def run_test(dut, index=0):
+    _timing.setdefault("start", time.time())
+    capturing = [h for h in cocotb.log.handlers
+                 if isinstance(h, RunningTest.ErrorLogHandler)]
+    if len(capturing) != 1:
+        raise TestFailure("%d tests are capturing log messages" %
+                          len(capturing))
+    for i in range(10):
+        cocotb.log.info("Test %d message %d", index, i)
+    yield Timer(1)
+
+
+factory = TestFactory(run_test)
+factory.add_option("index", range(NTESTS))
+factory.generate_tests()
+
+
+@cocotb.test()
+def test_report(dut):
+    """Report the average time taken per test of the regression"""
+    if "start" not in _timing:
+        dut._log.info("No generated tests were run")
+        return
+    elapsed = time.time() - _timing["start"]
+    dut._log.info("Ran %d tests in %.2fs, %.2fms per test" %
+                  (NTESTS, elapsed, 1000.0 * elapsed / NTESTS))
+    yield Timer(1)
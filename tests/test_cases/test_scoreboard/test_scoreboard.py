@@ -0,0 +1,317 @@
+"""
+Tests of the Scoreboard matching strategies
+"""
+
+import os
+import threading
+import time
+
+import cocotb
+from cocotb.monitors import Monitor
+from cocotb.result import TestError, TestFailure
+from cocotb.scoreboard import Scoreboard, KeyedExpectedQueue, ModelExpectedQueue
+from cocotb.triggers import Event, Timer
+from cocotb.utils import get_sim_steps, hexdiffs
+
+
+class DirectMonitor(Monitor):
+    """Monitor the test feeds transactions to directly"""
+
+    @cocotb.coroutine
+    def _monitor_recv(self):
+        yield Event().wait()
+
+
+class BlockingMonitor(DirectMonitor):
+    """DirectMonitor whose feeder waits for space on the queue"""
+    _can_block = True
+
+
+@cocotb.test()
+def test_keyed_in_order(dut):
+    """Transactions may be reordered between keys but not within one"""
+    monitor = DirectMonitor()
+    expected = KeyedExpectedQueue(key=lambda txn: txn[0], in_order=True)
+    expected.extend([(0, "a"), (1, "b"), (0, "c"), (1, "d")])
+    scoreboard = Scoreboard(dut, fail_immediately=False)
+    scoreboard.add_interface(monitor, expected)
+
+    for txn in [(1, "b"), (0, "a"), (1, "d"), (0, "c")]:
+        monitor._recv(txn)
+    if scoreboard.errors or len(expected):
+        raise TestFailure("Reordering between keys was not accepted")
+
+    expected.extend([(0, "a"), (0, "c")])
+    monitor._recv((0, "c"))
+    monitor._recv((0, "a"))
+    if scoreboard.errors != 2:
+        raise TestFailure("Reordering within a key was accepted")
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_keyed_unexpected_key(dut):
+    """A transaction with an unknown key is compared against the oldest one"""
+    monitor = DirectMonitor()
+    expected = KeyedExpectedQueue()
+    expected.extend(["first", "second"])
+    scoreboard = Scoreboard(dut, fail_immediately=False)
+    scoreboard.add_interface(monitor, expected)
+
+    monitor._recv("other")
+    if scoreboard.errors != 1 or list(expected) != ["second"]:
+        raise TestFailure("Unknown key was not compared against the oldest "
+                          "expected transaction")
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_statistics(dut):
+    """Latency, queue depth and throughput are recorded"""
+    monitor = DirectMonitor(timestamps=True)
+    untimed = DirectMonitor()
+    expected = KeyedExpectedQueue()
+    scoreboard = Scoreboard(dut)
+    scoreboard.add_interface(monitor, expected)
+
+    expected.extend(range(4))
+    for txn in range(4):
+        yield Timer(10, units='ns')
+        monitor._recv(txn)
+        untimed._recv(txn)
+
+    stats = scoreboard.stats["DirectMonitor"]
+    if stats.compared != 4 or stats.peak_depth != 4:
+        raise TestFailure("Wrong transaction counts %d and depth %d" %
+                          (stats.compared, stats.peak_depth))
+    if stats.latency.min != get_sim_steps(10, 'ns'):
+        raise TestFailure("Wrong minimum latency %r" % stats.latency.min)
+    if abs(monitor.stats.throughput - 1e8) > 1:
+        raise TestFailure("Wrong throughput %r" % monitor.stats.throughput)
+    if untimed.stats.throughput is not None:
+        raise TestFailure("Throughput recorded without timestamps")
+
+
+@cocotb.test()
+def test_list_latency(dut):
+    """Latency is recorded for a plain list of expected transactions"""
+    expected = []
+    stimulus = DirectMonitor(callback=expected.append)
+    stimulus.name = "stimulus"
+    monitor = DirectMonitor()
+    scoreboard = Scoreboard(dut)
+    scoreboard.add_interface(monitor, expected, reorder_depth=1)
+
+    # The model appends from a monitor callback, the test directly
+    stimulus._recv(0)
+    yield Timer(10, units='ns')
+    expected.append(1)
+    stimulus._recv(2)
+    yield Timer(20, units='ns')
+    for txn in (0, 2, 1):
+        monitor._recv(txn)
+
+    latency = scoreboard.stats["DirectMonitor"].latency
+    if latency.count != 3 or latency.max != get_sim_steps(30, 'ns') or \
+            latency.min != get_sim_steps(20, 'ns'):
+        raise TestFailure("Wrong latencies, min %r max %r of %d" %
+                          (latency.min, latency.max, latency.count))
+    if scoreboard.errors:
+        raise TestFailure("Transactions didn't match")
+
+
+@cocotb.test()
+def test_model_pool(dut):
+    """Expected output computed in a pool is compared in submission order"""
+    lock = threading.Lock()
+    active = [0]
+    concurrent = threading.Event()
+
+    def model(transaction):
+        # The model isn't picklable, so this also checks that the default
+        # pool runs threads
+        with lock:
+            active[0] += 1
+            if active[0] > 1:
+                concurrent.set()
+        # Wait for another job to run at the same time
+        concurrent.wait(5)
+        with lock:
+            active[0] -= 1
+        return transaction * 2
+
+    monitor = DirectMonitor()
+    expected = ModelExpectedQueue(model, workers=4, max_pending=8)
+    scoreboard = Scoreboard(dut)
+    scoreboard.add_interface(monitor, expected)
+
+    for txn in range(32):
+        expected.submit(txn)
+    for txn in range(32):
+        yield Timer(1)
+        monitor._recv(txn * 2)
+    expected.close()
+
+    if scoreboard.errors or len(expected):
+        raise TestFailure("Model results were not matched in order")
+    if not concurrent.is_set():
+        raise TestFailure("Model did not run concurrently")
+
+
+@cocotb.test()
+def test_model_pool_in_flight(dut):
+    """Submitting blocks while max_pending transactions are unfinished"""
+    gates = [threading.Event() for _ in range(6)]
+
+    def gated_model(transaction):
+        gates[transaction].wait()
+        return transaction
+
+    expected = ModelExpectedQueue(gated_model, workers=1, max_pending=2)
+    expected.submit(0)
+    expected.submit(1)
+
+    for txn in range(2, 6):
+        submitter = threading.Thread(target=expected.submit, args=(txn,))
+        submitter.start()
+        submitter.join(0.1)
+        if not submitter.is_alive():
+            raise TestFailure("Submitted %d with 2 transactions in flight" %
+                              txn)
+        # Finishing the oldest job makes room for exactly one more
+        gates[txn - 2].set()
+        submitter.join(5)
+        if submitter.is_alive():
+            raise TestFailure("Submit of %d didn't resume" % txn)
+
+    for gate in gates:
+        gate.set()
+    if [expected.pop_match(None) for _ in range(6)] != list(range(6)):
+        raise TestFailure("Model results were not returned in order")
+    expected.close()
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_large_mismatch_report(dut):
+    """A mismatching jumbo frame is reported quickly"""
+    monitor = DirectMonitor()
+    frame = "".join(chr(i % 251) for i in range(9000))
+    expected = [frame]
+    scoreboard = Scoreboard(dut, fail_immediately=False)
+    scoreboard.add_interface(monitor, expected, strict_type=False)
+
+    got = frame[:4000] + "X" + frame[4001:8000] + frame[8010:]
+    monitor._recv(got)
+
+    if scoreboard.errors != 1:
+        raise TestFailure("Mismatch was not detected")
+    # The report skips the identical start and is cut off
+    report = hexdiffs(frame, got).splitlines()
+    if not report[0].startswith("[... 3984 identical bytes") or \
+            not report[-1].startswith("[... diff truncated") or \
+            len(report) != 102:
+        raise TestFailure("Report is not bounded:\n%s" %
+                          "\n".join(report[:3] + report[-3:]))
+    yield Timer(1)
+
+
+@cocotb.test()
+def test_monitor_overflow(dut):
+    """Bounded monitor queues apply their overflow policy"""
+    monitor = DirectMonitor(max_queue=4)
+    for txn in range(10):
+        monitor._recv(txn)
+    if list(monitor) != [6, 7, 8, 9] or monitor.stats.dropped_transactions != 6:
+        raise TestFailure("Oldest transactions were not dropped")
+
+    monitor = DirectMonitor(max_queue=1, overflow="error")
+    monitor._recv(0)
+    try:
+        monitor._recv(1)
+    except TestError:
+        pass
+    else:
+        raise TestFailure("Overflow did not raise an error")
+
+    try:
+        DirectMonitor(max_queue=2, overflow="block")
+    except ValueError:
+        pass
+    else:
+        raise TestFailure("Monitor which does not wait accepted blocking")
+
+    monitor = BlockingMonitor(max_queue=2, overflow="block")
+
+    @cocotb.coroutine
+    def producer():
+        for txn in range(5):
+            yield monitor._wait_for_space()
+            monitor._recv(txn)
+
+    thread = cocotb.fork(producer())
+    received = []
+    while len(received) < 5:
+        yield Timer(1)
+        if len(monitor) > 2:
+            raise TestFailure("Producer was not blocked")
+        if len(monitor):
+            received.append(monitor.pop())
+    yield thread.join()
+    if received != list(range(5)):
+        raise TestFailure("Blocked producer lost transactions: %r" % received)
+
+
+@cocotb.test()
+def test_monitor_batches(dut):
+    """Callbacks receive lists of transactions per time step or every N"""
+    batches = []
+    monitor = DirectMonitor(callback=batches.append, batch="timestep")
+    for txn in range(3):
+        monitor._recv(txn)
+    if batches:
+        raise TestFailure("Batch was delivered within the time step")
+    yield Timer(1)
+    monitor._recv(3)
+    yield Timer(1)
+    if batches != [[0, 1, 2], [3]]:
+        raise TestFailure("Wrong batches per time step %r" % batches)
+
+    monitor = DirectMonitor(batch=4)
+    expected = list(range(10))
+    scoreboard = Scoreboard(dut)
+    scoreboard.add_interface(monitor, expected)
+    for txn in range(10):
+        monitor._recv(txn)
+    if len(expected) != 2:
+        raise TestFailure("Batches of 4 were not delivered")
+    result = scoreboard.result
+    if scoreboard.errors or len(expected):
+        raise TestFailure("Incomplete batch was not flushed")
+
+
+@cocotb.test(skip="SCOREBOARD_BENCHMARK" not in os.environ)
+def test_keyed_benchmark(dut):
+    """Match 1M transactions reordered in blocks of 1000
+
+    Only run when SCOREBOARD_BENCHMARK is set in the environment.
+    """
+    ntransactions = 1000000
+    block = 1000
+    monitor = DirectMonitor()
+    expected = KeyedExpectedQueue()
+    scoreboard = Scoreboard(dut)
+    scoreboard.add_interface(monitor, expected)
+
+    start = time.time()
+    expected.extend(range(ntransactions))
+    for base in range(0, ntransactions, block):
+        for txn in range(base + block - 1, base - 1, -1):
+            monitor._recv(txn)
+    elapsed = time.time() - start
+
+    if scoreboard.errors or len(expected):
+        raise TestFailure("Reordered transactions were not matched")
+    dut._log.info("Matched %d transactions in %.2fs (%.0f per second)" %
+                  (ntransactions, elapsed, ntransactions / elapsed))
+    yield Timer(1)